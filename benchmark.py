@@ -0,0 +1,1310 @@
+"""
+Live2DWidget 渲染/更新循环的无界面基准测试
+
+可以在 Linux 上以 QT_QPA_PLATFORM=offscreen 运行：
+    --backend gl    使用真实的 live2d 和 OpenGL（例如 Mesa llvmpipe 软件渲染）
+    --backend stub  使用记录调用的 LAppModel 替身，不需要 GPU 和 live2d，只测 Python 侧开销
+
+结果以 JSON 输出，可以用 --compare 对比两次运行：
+    python benchmark.py --backend stub --output before.json
+    python benchmark.py --backend stub --output after.json
+    python benchmark.py --compare before.json after.json
+"""
+import argparse
+import ctypes
+import errno
+import json
+import math
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import tracemalloc
+import types
+from collections import Counter
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+SCENARIOS = ('idle', 'cursor_motion', 'ctrl_held', 'resize_storm', 'resize_gesture')
+FRAME_DT = 1.0 / 60.0  # 每帧模拟经过的时间
+
+
+class RecordingModel:
+    """
+    记录调用次数的 LAppModel 替身
+    加载时仍然读取模型引用的文件，使启动时间包含真实的磁盘读取
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.param_ids = []
+
+    def LoadModelJson(self, path):
+        self.calls['LoadModelJson'] += 1
+        home = os.path.dirname(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            refs = json.load(f).get('FileReferences', {})
+        for name in [refs.get('Moc')] + list(refs.get('Textures', [])):
+            if name:
+                with open(os.path.join(home, name), 'rb') as f:
+                    f.read()
+        for key in ('Physics', 'DisplayInfo'):
+            if refs.get(key):
+                with open(os.path.join(home, refs[key]), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if key == 'DisplayInfo':
+                    self.param_ids = [param['Id'] for param in data.get('Parameters', [])]
+
+    def Resize(self, width, height):
+        self.calls['Resize'] += 1
+
+    def Update(self):
+        self.calls['Update'] += 1
+
+    def Draw(self):
+        self.calls['Draw'] += 1
+
+    def SetExpression(self, expression_id, fadeout=-1):
+        self.calls['SetExpression'] += 1
+
+    def SetParameterValue(self, param_id, value, weight=1.0):
+        self.calls['SetParameterValue'] += 1
+
+    def SetIndexParamValue(self, index, value, weight=1.0):
+        self.calls['SetIndexParamValue'] += 1
+
+    def AddParameterValue(self, param_id, value):
+        self.calls['AddParameterValue'] += 1
+
+    def GetParamIds(self):
+        return list(self.param_ids)
+
+
+class StubFramebuffer:
+    """
+    QOpenGLFramebufferObject 的替身，没有 GL 上下文时使用
+    """
+
+    def __init__(self, width, height, *args):
+        self._width = width
+        self._height = height
+
+    def bind(self):
+        return True
+
+    def release(self):
+        return True
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def handle(self):
+        return 0
+
+
+def install_stub_backend():
+    """
+    在导入 demo111 之前安装 live2d 替身模块
+    """
+    live2d_pkg = types.ModuleType('live2d')
+    v3 = types.ModuleType('live2d.v3')
+    v3.LAppModel = RecordingModel
+    v3.init = lambda: None
+    v3.glInit = lambda: None
+    v3.dispose = lambda: None
+    live2d_pkg.v3 = v3
+    sys.modules['live2d'] = live2d_pkg
+    sys.modules['live2d.v3'] = v3
+
+
+def stub_gl_calls(module, counter):
+    """
+    把模块里导入的 gl* 函数替换成只计数的空操作，同时替换帧缓冲对象
+    """
+    def make_stub(name):
+        def stub(*args, **kwargs):
+            counter[name] += 1
+        return stub
+
+    for name in dir(module):
+        if name.startswith('gl') and callable(getattr(module, name)):
+            setattr(module, name, make_stub(name))
+
+    # 异步读回：栅栏立即完成，映射返回一块全透明的像素，使命中掩码的 CPU 开销也能被测量
+    readback = bytearray(4096 * 4096 * 4)
+    readback_address = ctypes.addressof(ctypes.c_ubyte.from_buffer(readback))
+    stub_wait = module.glClientWaitSync
+    stub_map = module.glMapBuffer
+
+    def client_wait_sync(*args):
+        stub_wait(*args)
+        return module.GL_ALREADY_SIGNALED
+
+    def map_buffer(*args):
+        stub_map(*args)
+        return readback_address
+
+    map_buffer.readback = readback  # 保持缓冲区存活
+    module.glClientWaitSync = client_wait_sync
+    module.glMapBuffer = map_buffer
+    StubFramebuffer.CombinedDepthStencil = module.QOpenGLFramebufferObject.CombinedDepthStencil
+    module.QOpenGLFramebufferObject = StubFramebuffer
+
+
+class FakeEvdevDevice:
+    """
+    用管道模拟的 evdev 键盘设备，每次写入 3 字节（类型、编码、值）代表一个事件
+    """
+
+    def __init__(self):
+        self._read_fd, self._write_fd = os.pipe()
+        self.unplugged = False
+        self.reads = 0
+        self.closed = False
+
+    def fileno(self):
+        return self._read_fd
+
+    def read(self):
+        self.reads += 1
+        if self.unplugged:
+            raise OSError(errno.ENODEV, os.strerror(errno.ENODEV))
+        data = os.read(self._read_fd, 3 * 64)
+        for i in range(0, len(data) - 2, 3):
+            yield types.SimpleNamespace(type=data[i], code=data[i + 1], value=data[i + 2])
+
+    def emit(self, event_type, code, value):
+        os.write(self._write_fd, bytes((event_type, code, value)))
+
+    def unplug(self):
+        """
+        模拟设备被拔出：之后 fd 一直可读，read() 抛出 ENODEV
+        """
+        self.unplugged = True
+        os.write(self._write_fd, b'x')
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            os.close(self._read_fd)
+            os.close(self._write_fd)
+
+
+def measure_input_latency(demo, app, toggles=200):
+    """
+    通过假 evdev 设备测量 CTRL 键从按下/松开到 Qt 主线程收到事件的延迟
+    """
+    from PyQt5.QtCore import QObject
+
+    received = []
+
+    class Receiver(QObject):
+        def event(self, event):
+            if event.type() == demo.ModifierEvent.TYPE:
+                received.append(time.perf_counter())
+                return True
+            return super().event(event)
+
+    device = FakeEvdevDevice()
+    receiver = Receiver()
+    backend = demo.EvdevBackend(devices=[device])
+    backend.start(receiver)
+    samples = []
+    for i in range(toggles):
+        count = len(received)
+        sent = time.perf_counter()
+        device.emit(demo.EV_KEY, demo.KEY_LEFTCTRL, 1 if i % 2 == 0 else 0)
+        deadline = sent + 1.0
+        while len(received) == count and time.perf_counter() < deadline:
+            app.processEvents()
+        if len(received) > count:
+            samples.append((received[-1] - sent) * 1000.0)
+
+    # 拔出设备：读取线程应关闭设备并进入退避等待，而不是反复 read() 空转
+    reads = device.reads
+    device.unplug()
+    time.sleep(0.5)
+    reads_after_unplug = device.reads - reads
+    backend.stop()
+    device.close()
+    result = summarize(samples)
+    result['toggles'] = len(samples)
+    result['reads_after_unplug'] = reads_after_unplug
+    result['disconnects'] = backend.disconnects
+    return result
+
+
+def summarize(samples):
+    """
+    计算毫秒级耗时样本的统计值
+    """
+    if not samples:
+        return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+    ordered = sorted(samples)
+    return {
+        'mean': statistics.fmean(ordered),
+        'p50': ordered[len(ordered) // 2],
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'max': ordered[-1],
+    }
+
+
+class Harness:
+    """
+    直接驱动 Live2DWidget 的更新和绘制，不依赖事件循环的定时器
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.gl_calls = Counter()
+        self.startup = {}
+
+        if backend == 'stub':
+            install_stub_backend()
+
+        start = time.perf_counter()
+        import demo111
+        self.startup['import_ms'] = (time.perf_counter() - start) * 1000.0
+        self.demo = demo111
+
+        if backend == 'stub':
+            stub_gl_calls(demo111, self.gl_calls)
+
+        from PyQt5.QtWidgets import QApplication
+        if QApplication.instance() is None:
+            demo111.GLShareGroup.enable()
+        self.app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    def create_widget(self, width=800, height=800):
+        """
+        创建 Live2DWidget 并等待分阶段加载完成，第一次创建时记录加载各阶段耗时
+        """
+        start = time.perf_counter()
+        widget = self.demo.Live2DWidget()
+        widget.timer.stop()
+        # 使用模拟时钟：每帧固定经过 FRAME_DT，与实际执行速度无关
+        self.now = 0.0
+        widget.clock = lambda: self.now
+        widget.last_tick_time = self.now
+        widget.resize(width, height)
+        if self.backend == 'stub':
+            widget.initializeGL()
+            widget.resizeGL(width, height)
+            while widget.model_data is None and widget.loading:
+                self.app.processEvents()
+            widget.finish_model_load()
+        else:
+            widget.show()
+            while widget.loading:
+                self.app.processEvents()
+        widget.timer.stop()
+        if 'model_ready_ms' not in self.startup:
+            self.startup.update(widget.load_stats())
+            self.startup['model_ready_ms'] = (time.perf_counter() - start) * 1000.0
+        self.widget = widget
+        return widget
+
+    def tick(self):
+        """
+        模拟一次定时器触发，返回更新耗时（毫秒）
+        """
+        widget = self.widget
+        self.now += FRAME_DT
+        start = time.perf_counter()
+        widget.updateModelAngle()
+        elapsed = (time.perf_counter() - start) * 1000.0
+        widget.timer.stop()
+        widget.cursor_timer.stop()
+        widget.tier_timer.stop()
+        return elapsed
+
+    def draw(self):
+        """
+        绘制一帧，返回绘制耗时（毫秒）
+        """
+        widget = self.widget
+        start = time.perf_counter()
+        if self.backend == 'stub':
+            widget.paintGL()
+        else:
+            from OpenGL.GL import glFinish
+            widget.makeCurrent()
+            widget.paintGL()
+            glFinish()
+            widget.doneCurrent()
+        return (time.perf_counter() - start) * 1000.0
+
+    def resize(self, width, height):
+        self.widget.resize(width, height)
+        if self.backend == 'stub':
+            self.widget.resizeGL(width, height)
+
+    def param_calls(self):
+        model = self.widget.model
+        calls = getattr(model, 'calls', None)
+        if calls is None:
+            return None
+        return calls['SetParameterValue'] + calls['SetIndexParamValue'] + calls['AddParameterValue']
+
+
+def scripted_cursor(scenario, widget):
+    """
+    返回脚本化的全局光标位置来源
+    """
+    from PyQt5.QtCore import QPoint
+    state = {'frame': 0}
+    center = widget.mapToGlobal(QPoint(widget.width() // 2, widget.height() // 2))
+
+    def source():
+        frame = state['frame']
+        if scenario == 'cursor_motion':
+            # 以窗口中心为圆心匀速画圈
+            angle = frame * 0.05
+            radius = min(widget.width(), widget.height()) * 0.4
+            return QPoint(int(center.x() + math.cos(angle) * radius), int(center.y() + math.sin(angle) * radius))
+        return center
+
+    return state, source
+
+
+def tracking_lag(targets, rendered, max_shift=60):
+    """
+    估计渲染出的头部角度相对光标目标角度的滞后（毫秒）：
+    寻找使两条曲线平均误差最小的帧偏移
+    """
+    if len(targets) <= max_shift * 2:
+        return None
+    best_shift, best_error = 0, float('inf')
+    for shift in range(max_shift):
+        pairs = zip(targets[:len(targets) - shift], rendered[shift:])
+        error = statistics.fmean(abs(t - r) for t, r in pairs)
+        if error < best_error:
+            best_shift, best_error = shift, error
+    return best_shift * FRAME_DT * 1000.0
+
+
+def run_scenario(harness, scenario, frames, alloc_frames):
+    """
+    运行单个场景并返回其指标
+    """
+    if getattr(harness, 'widget', None) is not None:
+        harness.widget.unload_model()  # 上一个场景的窗口不再使用，释放它对常驻模型的引用
+    widget = harness.create_widget()
+    state, widget.cursor_source = scripted_cursor(scenario, widget)
+    if scenario == 'ctrl_held':
+        widget.anim.set_ctrl_mouse_pressed(True)
+        widget.wake()
+        widget.timer.stop()
+
+    base_width = widget.width()
+    base_height = widget.height()
+
+    def one_frame(i):
+        state['frame'] = i
+        if scenario in ('resize_storm', 'resize_gesture'):
+            # 模拟 Ctrl+滚轮 连续缩放：每帧 10px，来回往复
+            # resize_gesture 走缩放手势路径：每 120 帧中滚动 100 帧，停顿时结束手势
+            if scenario == 'resize_gesture' and i % 120 == 0:
+                widget.begin_live_resize()
+            offset = 10 * (i % 40 if (i // 40) % 2 == 0 else 40 - i % 40)
+            if scenario == 'resize_storm' or i % 120 < 100:
+                harness.resize(base_width + offset, base_height + offset)
+            if scenario == 'resize_gesture' and i % 120 == 100:
+                widget.end_live_resize()
+        update_ms = harness.tick()
+        calls_before = harness.param_calls()
+        draw_ms = harness.draw()
+        calls_after = harness.param_calls()
+        param_calls = None if calls_before is None else calls_after - calls_before
+        return update_ms, draw_ms, param_calls
+
+    update_samples = []
+    draw_samples = []
+    param_samples = []
+    scheduled_fps = []
+    target_angles = []
+    rendered_angles = []
+    origin = widget.mapToGlobal(harness.demo.QPoint(0, 0))
+    for i in range(frames):
+        update_ms, draw_ms, param_calls = one_frame(i)
+        # 记录光标对应的目标角度和实际写入的头部角度，用于估计跟随滞后
+        cursor_x = widget.cursor_source().x() - origin.x()
+        target_angles.append(cursor_x / widget.width() * 60.0 - 30.0)
+        rendered_angles.append(float(widget.anim.params.rendered[harness.demo.P_ANGLE_X]))
+        update_samples.append(update_ms)
+        draw_samples.append(draw_ms)
+        if param_calls is not None:
+            param_samples.append(param_calls)
+        scheduled_fps.append(1000.0 / max(1, widget.timer.interval()))
+
+    # 单独的分配统计阶段，避免 tracemalloc 影响计时
+    alloc_bytes = []
+    alloc_blocks = []
+    tracemalloc.start()
+    for i in range(frames, frames + alloc_frames):
+        blocks_before = sys.getallocatedblocks()
+        current_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        one_frame(i)
+        alloc_bytes.append(tracemalloc.get_traced_memory()[1] - current_before)
+        alloc_blocks.append(sys.getallocatedblocks() - blocks_before)
+    tracemalloc.stop()
+
+    result = {
+        'frames': frames,
+        'update_ms': summarize(update_samples),
+        'draw_ms': summarize(draw_samples),
+        'param_calls_per_frame': statistics.fmean(param_samples) if param_samples else None,
+        'alloc_peak_bytes_per_frame': statistics.fmean(alloc_bytes) if alloc_bytes else 0.0,
+        'alloc_net_blocks_per_frame': statistics.fmean(alloc_blocks) if alloc_blocks else 0.0,
+        'scheduled_fps_mean': statistics.fmean(scheduled_fps),
+        'cursor_tracking_lag_ms': tracking_lag(target_angles, rendered_angles) if scenario == 'cursor_motion' else None,
+        'frame_stats': widget.frame_stats(),
+    }
+    widget.deleteLater()
+    return result
+
+
+def measure_texture_tiers(harness):
+    """
+    每个纹理档位：生成缓存的耗时、命中缓存的耗时、模型加载耗时和纹理内存
+    生成耗时使用临时缓存目录测量，不影响程序自己的缓存
+    """
+    demo = harness.demo
+    widget = harness.widget
+    results = {}
+    cache_dir = tempfile.mkdtemp(prefix='deskpet-tiers-')
+    try:
+        cache = demo.TextureTierCache(cache_dir=cache_dir)
+        for tier in demo.TEXTURE_TIERS:
+            start = time.perf_counter()
+            cache.variant(tier)
+            generate_ms = (time.perf_counter() - start) * 1000.0
+            start = time.perf_counter()
+            cache.variant(tier)
+            cached_ms = (time.perf_counter() - start) * 1000.0
+
+            # 同步执行后台加载阶段，再在 GL 线程中完成加载
+            loaded = []
+            loader = demo.ModelLoader(demo.MODEL_JSON_PATH, tier, widget.load_generation)
+            loader.loaded.connect(loaded.append)
+            loader._run()
+            widget.model_data = loaded[0]
+            widget.finish_model_load()
+            widget.tier_timer.stop()
+            results[str(tier)] = dict(widget.texture_stats(), generate_ms=generate_ms, cached_ms=cached_ms)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def evict_page_cache(paths):
+    """
+    让系统丢弃这些文件的页缓存以模拟冷启动，不支持时返回 False
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def measure_model_bundle(harness, repeats=5):
+    """
+    分别从模型包和零散文件执行后台加载阶段，记录冷启动（丢弃页缓存后）和热启动的耗时
+    """
+    demo = harness.demo
+    tier = harness.widget.texture_tier
+    home = os.path.dirname(os.path.abspath(demo.MODEL_JSON_PATH))
+    with open(demo.MODEL_JSON_PATH, 'r', encoding='utf-8') as f:
+        setting = json.load(f)
+    sources = [os.path.join(home, name) for name in demo.model_source_files(demo.MODEL_JSON_PATH, setting)]
+
+    bundle_dir = tempfile.mkdtemp(prefix='deskpet-bundle-')
+    try:
+        bundle_path = os.path.join(bundle_dir, 'model.bundle')
+        start = time.perf_counter()
+        bundle_bytes = demo.build_model_bundle(demo.MODEL_JSON_PATH, bundle_path)
+        results = {'build_ms': (time.perf_counter() - start) * 1000.0, 'bundle_bytes': bundle_bytes}
+
+        def load(path):
+            loaded = []
+            loader = demo.ModelLoader(demo.MODEL_JSON_PATH, tier, bundle_path=path)
+            loader.loaded.connect(loaded.append)
+            start = time.perf_counter()
+            loader._run()
+            elapsed = (time.perf_counter() - start) * 1000.0
+            return elapsed, loaded[0]
+
+        for name, path in (('files', None), ('bundle', bundle_path)):
+            cold = []
+            for _ in range(repeats):
+                if not evict_page_cache(sources + [bundle_path]):
+                    break
+                cold.append(load(path)[0])
+            warm = [load(path)[0] for _ in range(repeats)]
+            _, data = load(path)
+            results[name] = {
+                'source': data.source,
+                'cold_ms': summarize(cold) if cold else None,
+                'warm_ms': summarize(warm),
+                'timings': data.timings,
+            }
+    finally:
+        shutil.rmtree(bundle_dir, ignore_errors=True)
+    return results
+
+
+def measure_pet_scaling(harness, counts, frames):
+    """
+    多宠物模式下帧耗时（批量更新 + 绘制）和内存随宠物数量的变化
+    光标在窗口上来回移动，使所有宠物每帧都有参数变化
+    """
+    demo = harness.demo
+    results = {}
+    for count in counts:
+        tracemalloc.start()
+        loads = demo.MODEL_REGISTRY.loads
+        widget = demo.MultiPetWidget(count)
+        widget.timer.stop()
+        now = [0.0]
+        widget.clock = lambda: now[0]
+        widget.last_tick_time = 0.0
+        widget.resize(widget.cell_size * min(count, 10), widget.cell_size * -(-count // 10))
+        if harness.backend == 'stub':
+            widget.initializeGL()
+            while widget.loading:
+                harness.app.processEvents()
+                widget.finish_model_load()
+        else:
+            widget.show()
+            while widget.loading:
+                harness.app.processEvents()
+        widget.timer.stop()
+
+        cursor = [0, 0]
+        widget.cursor_source = lambda: demo.QPoint(*cursor)
+        update_ms = []
+        draw_ms = []
+        for i in range(frames):
+            now[0] += FRAME_DT
+            cursor[0] = int(widget.width() * (0.5 + 0.5 * math.sin(i * 0.05)))
+            cursor[1] = int(widget.height() * 0.5)
+            start = time.perf_counter()
+            widget.tick()
+            update_ms.append((time.perf_counter() - start) * 1000.0)
+            widget.timer.stop()
+            start = time.perf_counter()
+            if harness.backend == 'stub':
+                widget.paintGL()
+            else:
+                from OpenGL.GL import glFinish
+                widget.makeCurrent()
+                widget.paintGL()
+                glFinish()
+                widget.doneCurrent()
+            draw_ms.append((time.perf_counter() - start) * 1000.0)
+        python_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        frame = [u + d for u, d in zip(update_ms, draw_ms)]
+        results[str(count)] = dict(
+            widget.memory_stats(),
+            update_ms=summarize(update_ms),
+            draw_ms=summarize(draw_ms),
+            frame_ms=summarize(frame),
+            frame_us_per_pet=statistics.fmean(frame) * 1000.0 / count,
+            python_bytes=python_bytes,
+            load_models_ms=widget.load_timings.get('load_models_ms'),
+            model_loads=demo.MODEL_REGISTRY.loads - loads,  # 所有宠物只加载一次
+        )
+        widget.release_model()
+        widget.deleteLater()
+        harness.app.processEvents()
+    return results
+
+
+def measure_shared_windows(harness, windows=3):
+    """
+    依次打开多个显示同一模型的窗口：记录每个窗口的模型加载耗时、是否复用了常驻资源和常驻显存估算
+    """
+    demo = harness.demo
+    main_widget = harness.widget
+    widgets = []
+    results = {'windows': []}
+    for _ in range(windows):
+        widget = harness.create_widget()
+        widgets.append(widget)
+        results['windows'].append(dict(widget.resident_memory(),
+                                       load_model_ms=widget.load_timings.get('load_model_ms')))
+    results['registry'] = demo.MODEL_REGISTRY.stats()
+    for widget in widgets:
+        widget.unload_model()
+        widget.deleteLater()
+    harness.app.processEvents()
+    results['registry_after_close'] = demo.MODEL_REGISTRY.stats()
+    harness.widget = main_widget
+    return results
+
+
+def pump_events(app, seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.002)
+
+
+def measure_fancy_menu(harness, repeats=20):
+    """
+    右键菜单：hover 动画期间和静止时的定时器唤醒次数，以及渐变背景缓存前后的绘制耗时
+    """
+    from PyQt5.QtWidgets import QAction
+
+    demo = harness.demo
+    menu = demo.FancyMenu()
+    actions = [QAction(text, menu) for text in ("切换表情", "使用说明", "再见")]
+    for action in actions:
+        menu.addAction(action)
+    menu.popup(menu.pos())
+    harness.app.processEvents()
+
+    demo.FancyMenu._background_cache.clear()
+    start = time.perf_counter()
+    menu.grab()
+    cold_ms = (time.perf_counter() - start) * 1000.0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        menu.grab()
+    warm_ms = (time.perf_counter() - start) * 1000.0 / repeats
+
+    menu._on_hovered(actions[0])
+    pump_events(harness.app, 0.5)
+    anim_ticks = menu.anim_ticks
+    pump_events(harness.app, 1.0)
+    idle_ticks = menu.anim_ticks - anim_ticks
+    menu.hide()
+    menu.deleteLater()
+    harness.app.processEvents()
+    return {
+        'paint_cold_ms': cold_ms,
+        'paint_cached_ms': warm_ms,
+        'cached_backgrounds': len(demo.FancyMenu._background_cache),
+        'hover_anim_ticks': anim_ticks,
+        'idle_wakeups_per_s': idle_ticks,
+    }
+
+
+def measure_leaving_animation(harness, path=None):
+    """
+    离开动画：后台解码耗时、帧数、时长和缓存内存；以及按下再见后开始播放的耗时
+    （对比旧做法在按下时同步创建 QMovie 并解码第一帧的耗时）
+    """
+    from PyQt5.QtGui import QMovie
+
+    demo = harness.demo
+    path = path or demo.LEAVING_GIF_PATH
+    animation = demo.decode_leaving_animation(path)
+    if animation.error is not None:
+        return {'path': path, 'error': animation.error}
+
+    start = time.perf_counter()
+    movie = QMovie(path)
+    movie.jumpToFrame(0)
+    sync_first_frame_ms = (time.perf_counter() - start) * 1000.0
+
+    widget = harness.widget
+    start = time.perf_counter()
+    widget.play_leaving(animation)
+    play_start_ms = (time.perf_counter() - start) * 1000.0
+    widget.leaving_timer.stop()
+    widget.leaving = None
+    return {
+        'path': path,
+        'frames': len(animation.frames),
+        'duration_ms': animation.duration_ms(),
+        'decode_ms': animation.decode_ms,
+        'memory_bytes': animation.memory_bytes(),
+        'sync_first_frame_ms': sync_first_frame_ms,
+        'play_start_ms': play_start_ms,
+    }
+
+
+def measure_expressions(harness, counts=(2, 20, 200), frames=600, params_per_expression=6):
+    """
+    表情合成：模型定义的表情数量不同（合成的 exp3.json）时，加载耗时和每帧合成耗时（过渡中 / 静止时），
+    以及一段贝塞尔曲线动作的加载耗时和每帧求值耗时
+    """
+    import numpy as np
+
+    demo = harness.demo
+    model = harness.widget.model
+    driven_ids = harness.widget.anim.params.ids
+    model_ids = demo.load_parameter_ids() or list(driven_ids)
+    blends = ('Add', 'Multiply', 'Overwrite')
+    rng = np.random.default_rng(1)
+    values = harness.widget.anim.params.current.copy()
+    tmp = tempfile.mkdtemp(prefix='deskpet-exp-')
+    results = {}
+    try:
+        for count in counts:
+            items = []
+            for i in range(count):
+                chosen = rng.choice(len(model_ids), size=min(params_per_expression, len(model_ids)), replace=False)
+                setting = {'Type': 'Live2D Expression', 'Parameters': [
+                    {'Id': model_ids[j], 'Value': float(rng.uniform(-1, 1)), 'Blend': blends[k % 3]}
+                    for k, j in enumerate(chosen)]}
+                name = f'exp_{i:03d}.exp3.json'
+                with open(os.path.join(tmp, name), 'w', encoding='utf-8') as f:
+                    json.dump(setting, f)
+                items.append({'Name': f'exp_{i:03d}', 'File': name})
+            start = time.perf_counter()
+            expressions = demo.ExpressionSet.load(tmp, items)
+            load_ms = (time.perf_counter() - start) * 1000.0
+
+            mixer = demo.ExpressionMixer(expressions)
+            mixer.bind(model, driven_ids)
+            mixer.select(expressions.names[0], 0.0)
+            fade = mixer.select(expressions.names[-1], 0.0)
+            start = time.perf_counter()
+            for frame in range(frames):
+                mixer.apply(values, fade * frame / frames)
+            crossfade_us = (time.perf_counter() - start) * 1e6 / frames
+            start = time.perf_counter()
+            for frame in range(frames):
+                mixer.apply(values, fade + 1.0)
+            static_us = (time.perf_counter() - start) * 1e6 / frames
+            results[str(count)] = {
+                'load_ms': load_ms,
+                'crossfade_apply_us': crossfade_us,
+                'static_apply_us': static_us,
+            }
+
+        curves = []
+        for pid in model_ids[:20]:
+            segments = [0.0, 0.0]
+            for k in range(40):
+                t = k * 0.25
+                segments += [1, t + 0.08, float(rng.uniform(-1, 1)), t + 0.17, float(rng.uniform(-1, 1)),
+                             t + 0.25, float(rng.uniform(-1, 1))]
+            curves.append({'Target': 'Parameter', 'Id': pid, 'Segments': segments})
+        path = os.path.join(tmp, 'motion.motion3.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'Meta': {'Duration': 10.0, 'Loop': True}, 'Curves': curves}, f)
+        start = time.perf_counter()
+        clip = demo.MotionClip.load(path)
+        motion_load_ms = (time.perf_counter() - start) * 1000.0
+        mixer = demo.ExpressionMixer(motions={'Idle': [clip]})
+        mixer.bind(model, driven_ids)
+        mixer.play_motion('Idle', 0, 0.0)
+        start = time.perf_counter()
+        for frame in range(frames):
+            mixer.apply(values, frame * FRAME_DT)
+        results['motion'] = {
+            'curves': len(clip.ids),
+            'samples': len(clip.samples),
+            'load_ms': motion_load_ms,
+            'apply_us': (time.perf_counter() - start) * 1e6 / frames,
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return results
+
+
+def measure_physics_lod(harness, sizes=(800, 400), move_frames=60, settle_frames=240):
+    """
+    物理细节层次：光标移动一秒后停下，统计头发物理收敛期间的模型更新次数和省下的更新时间，
+    并与关闭细节层次（收敛期间全速更新）对比
+    """
+    from PyQt5.QtCore import QPoint
+
+    results = {}
+    for size in sizes:
+        for lod in (True, False):
+            if getattr(harness, 'widget', None) is not None:
+                harness.widget.unload_model()
+            widget = harness.create_widget(size, size)
+            if not lod:
+                widget.dirty.physics_lod = None
+            center = widget.mapToGlobal(QPoint(size // 2, size // 2))
+            state = {'frame': 0}
+
+            def source():
+                frame = min(state['frame'], move_frames)
+                return QPoint(center.x() + int(math.sin(frame * 0.1) * size * 0.4), center.y())
+
+            widget.cursor_source = source
+            updates_before = widget.model.calls['Update'] if hasattr(widget.model, 'calls') else None
+            for i in range(move_frames + settle_frames):
+                state['frame'] = i
+                harness.tick()
+                harness.draw()
+            stats = widget.frame_stats()
+            entry = {
+                'rendered_frames': stats['rendered_frames'],
+                'model_updates': (widget.model.calls['Update'] - updates_before
+                                  if updates_before is not None else None),
+            }
+            if lod:
+                entry.update(stats['physics_lod'])
+            results[f"{size}{'' if lod else '_full_rate'}"] = entry
+            widget.deleteLater()
+    return results
+
+
+def measure_render_scale(harness, sizes=(800, 2200), frames=600, base_ms=2.0, ms_per_mpixel=4.0, noise=0.2):
+    """
+    动态渲染分辨率：用模拟的弱 GPU（帧耗时 = 固定开销 + 与渲染像素数成正比，带随机抖动）驱动分辨率调整，
+    统计最终比例、调整次数、后半段的调整次数（应为 0，不来回切换）以及超出帧预算的帧比例
+    """
+    import random
+
+    rng = random.Random(1)
+    results = {}
+    for size in sizes:
+        if getattr(harness, 'widget', None) is not None:
+            harness.widget.unload_model()
+        widget = harness.create_widget(size, size)
+        scaler = widget.render_scaler
+        # 帧耗时只来自模拟的 GPU，不混入替身后端几乎为零的 CPU 耗时
+        widget.gpu_timer.available = True
+        over_budget = 0
+        changes_first_half = 0
+        for i in range(frames):
+            widget.dirty.invalidate(now=harness.now)
+            harness.tick()
+            harness.draw()
+            pixels = widget.retained_fbo.width() * widget.retained_fbo.height()
+            frame_ms = (base_ms + pixels / 1e6 * ms_per_mpixel) * (1.0 + rng.uniform(-noise, noise))
+            over_budget += frame_ms > scaler.budget_ms
+            widget.adapt_render_scale(frame_ms, harness.now)
+            if i == frames // 2:
+                changes_first_half = scaler.changes
+        results[str(size)] = dict(
+            scaler.stats(),
+            changes_second_half=scaler.changes - changes_first_half,
+            over_budget_ratio=over_budget / frames,
+            fbo_size=(widget.retained_fbo.width(), widget.retained_fbo.height()),
+        )
+        widget.deleteLater()
+    return results
+
+
+def measure_profiler(harness, frames=600):
+    """
+    帧耗时记录：关闭和打开时每帧（更新 + 绘制）的耗时对比、生成 Prometheus 文本的耗时，
+    并通过本地 HTTP 接口实际读取一次指标
+    """
+    import urllib.request
+
+    demo = harness.demo
+    if getattr(harness, 'widget', None) is not None:
+        harness.widget.unload_model()
+    widget = harness.create_widget()
+    state, widget.cursor_source = scripted_cursor('cursor_motion', widget)
+    results = {}
+    for enabled in (False, True, False, True):
+        widget.profiler.enabled = enabled
+        start = time.perf_counter()
+        for i in range(frames):
+            state['frame'] = i
+            harness.tick()
+            harness.draw()
+        results['enabled_frame_us' if enabled else 'disabled_frame_us'] = \
+            (time.perf_counter() - start) * 1e6 / frames
+    window = types.SimpleNamespace(index=0, live2d_widget=widget)
+    start = time.perf_counter()
+    widget.refresh_metrics()
+    results['snapshot_ms'] = (time.perf_counter() - start) * 1000.0
+    start = time.perf_counter()
+    text = demo.render_metrics(demo.metric_sources([window]))
+    results['render_metrics_ms'] = (time.perf_counter() - start) * 1000.0
+    results['metric_lines'] = text.count('\n')
+    server = demo.MetricsServer(lambda: demo.metric_sources([window]), port=0)
+    try:
+        with urllib.request.urlopen(server.address, timeout=5) as response:
+            body = response.read().decode('utf-8')
+        results['endpoint_ok'] = 'deskpet_phase_ms' in body
+    finally:
+        server.stop()
+    results['phases_ms'] = {name: {str(q): entry.get(q) for q in demo.PROFILE_QUANTILES}
+                            for name, entry in widget.profiler.summary().items()}
+    widget.deleteLater()
+    return results
+
+
+def measure_power_states(harness, seconds=1.0, hidden_seconds=3600.0, wake_trials=10):
+    """
+    电源状态：在真实事件循环中运行宠物的定时器（以及轮询输入后端），
+    统计光标移动、空闲、被遮挡、隐藏和锁屏时每秒的定时器唤醒次数，
+    以及空闲时光标开始移动到请求绘制第一帧的延迟；
+    再用模拟时钟挂起一小时后恢复，记录恢复耗时和恢复后第一次更新执行的仿真步数（快进而不是补算）
+    """
+    from PyQt5.QtCore import QPoint
+
+    demo = harness.demo
+    if getattr(harness, 'widget', None) is not None:
+        harness.widget.unload_model()
+    widget = harness.create_widget()
+    widget.clock = time.perf_counter
+    widget.last_tick_time = widget.clock()
+    center = widget.mapToGlobal(QPoint(400, 400))
+    moving = {'on': True, 'offset': 0}
+
+    def source():
+        if not moving['on']:
+            return QPoint(center.x() + moving['offset'], center.y())
+        return QPoint(center.x() + int(math.sin(time.perf_counter() * 6.0) * 300), center.y())
+
+    widget.cursor_source = source
+    backend = demo.PollingBackend()
+    backend.start(widget)
+    widget.suspended_changed.connect(lambda suspended: backend.pause() if suspended else backend.resume())
+    widget.timer.start(0)
+
+    results = {}
+    phases = (('active_moving', None), ('active_idle', None), ('occluded', 'occluded'),
+              ('hidden', 'hidden'), ('locked', 'locked'))
+    for name, reason in phases:
+        moving['on'] = name == 'active_moving'
+        if reason is not None:
+            widget.set_power_reason(reason, True)
+        elif name == 'active_idle':
+            # 先等头发物理和动画收敛、进入空闲节奏再开始统计
+            pump_events(harness.app, demo.PHYSICS_SETTLE + demo.IDLE_DELAY + 0.5)
+        wakeups = sum(widget.power.wakeups.values())
+        polls = backend.polls
+        start = time.perf_counter()
+        pump_events(harness.app, seconds)
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            'timer_wakeups_per_s': (sum(widget.power.wakeups.values()) - wakeups) / elapsed,
+            'input_polls_per_s': (backend.polls - polls) / elapsed,
+        }
+        if reason is not None:
+            widget.set_power_reason(reason, False)
+
+    # 空闲时光标移动：从光标跳到新位置到窗口请求绘制第一帧的延迟（空闲轮询的相位每次不同）
+    requested = []
+    widget.update = lambda: requested.append(time.perf_counter())
+    wake_ms = []
+    for i in range(wake_trials):
+        deadline = time.perf_counter() + 10.0
+        while not widget.scheduler.is_idle() and time.perf_counter() < deadline:
+            pump_events(harness.app, 0.01)
+        pump_events(harness.app, (i * 0.037) % 0.1)
+        if not widget.scheduler.is_idle():
+            continue
+        requested.clear()
+        moving['offset'] = 40 if i % 2 == 0 else 0
+        moved = time.perf_counter()
+        while not requested and time.perf_counter() < moved + 1.0:
+            harness.app.processEvents()
+            time.sleep(0.0005)
+        if requested:
+            wake_ms.append((requested[0] - moved) * 1000.0)
+    del widget.update
+    results['idle_wake_latency_ms'] = dict(summarize(wake_ms), trials=len(wake_ms))
+    backend.stop()
+    widget.timer.stop()
+    widget.cursor_timer.stop()
+
+    # 快进：挂起一小时后恢复
+    widget = harness.create_widget()
+    for _ in range(30):
+        harness.tick()
+        harness.draw()
+    widget.set_power_reason('hidden', True)
+    harness.now += hidden_seconds
+    start = time.perf_counter()
+    widget.set_power_reason('hidden', False)
+    resume_ms = (time.perf_counter() - start) * 1000.0
+    widget.timer.stop()
+    sim_time = widget.anim.sim_time
+    harness.tick()
+    harness.draw()
+    results['resume'] = {
+        'hidden_seconds': hidden_seconds,
+        'resume_ms': resume_ms,
+        'sim_steps_first_tick': round((widget.anim.sim_time - sim_time) / widget.anim.sim_dt),
+        'suspends': widget.power.suspends,
+    }
+    widget.deleteLater()
+    return results
+
+
+def measure_control_api(harness, messages=20000, chunk=256, pings=200):
+    """
+    本地控制接口：GUI 线程按 60 FPS 运行更新和绘制，另一个线程作为本地客户端
+    先连续发送大量参数命令（每条一行），统计吞吐量、合并成的批次数以及期间 GUI 线程单帧的最长耗时；
+    再逐条发送带 id 的命令，测量从发送到生效的那一帧绘制完成、收到回复的端到端延迟；
+    最后确认宠物挂起时带 id 的命令也会立即得到回复
+    """
+    import socket
+
+    demo = harness.demo
+    if getattr(harness, 'widget', None) is not None:
+        harness.widget.unload_model()
+    widget = harness.create_widget()
+    use_unix = hasattr(socket, 'AF_UNIX')
+    socket_path = os.path.join(tempfile.mkdtemp(prefix='deskpet-'), 'control.sock') if use_unix else None
+    server = demo.ControlServer([widget.control], socket_path=socket_path)
+    result = {'transport': 'unix' if use_unix else 'tcp'}
+    done = threading.Event()
+
+    def client():
+        try:
+            if use_unix:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                sock.connect(socket_path)
+            else:
+                host, port = server.address.split(':')
+                sock = socket.create_connection((host, int(port)))
+            replies = sock.makefile('rb')
+            start = time.perf_counter()
+            for first in range(0, messages, chunk):
+                lines = []
+                for i in range(first, min(first + chunk, messages)):
+                    command = {'params': {'ParamAngleX': (i % 600) / 10.0 - 30.0, 'ParamMouthOpenY': (i % 100) / 100.0}}
+                    if i == messages - 1:
+                        command['id'] = 'flood'
+                    lines.append(json.dumps(command))
+                sock.sendall(('\n'.join(lines) + '\n').encode('utf-8'))
+            json.loads(replies.readline())
+            elapsed = time.perf_counter() - start
+            result['messages'] = messages
+            result['messages_per_s'] = messages / elapsed
+            result['flood_ms'] = elapsed * 1000.0
+            latency = []
+            for i in range(pings):
+                time.sleep(0.003 + (i % 7) * 0.001)  # 与帧节奏错开
+                sent = time.perf_counter()
+                command = {'id': i, 'params': {'ParamAngleX': float(i % 60 - 30)}}
+                sock.sendall(json.dumps(command).encode('utf-8') + b'\n')
+                json.loads(replies.readline())
+                latency.append((time.perf_counter() - sent) * 1000.0)
+            result['latency_ms'] = summarize(latency)
+            sock.close()
+        except Exception as e:
+            result['error'] = repr(e)
+        finally:
+            done.set()
+
+    batches = widget.control.batches
+    frame_ms = []
+    thread = threading.Thread(target=client, daemon=True)
+    thread.start()
+    deadline = time.perf_counter()
+    while not done.is_set():
+        start = time.perf_counter()
+        harness.app.processEvents()
+        harness.tick()
+        harness.draw()
+        frame_ms.append((time.perf_counter() - start) * 1000.0)
+        deadline += FRAME_DT
+        time.sleep(max(0.0, deadline - time.perf_counter()))
+    thread.join()
+    server.stop()
+    if socket_path is not None:
+        shutil.rmtree(os.path.dirname(socket_path), ignore_errors=True)
+    result['batches'] = widget.control.batches - batches
+    result['frames'] = len(frame_ms)
+    result['gui_frame_ms'] = summarize(frame_ms)
+    result['last_value_applied'] = widget.overrides.values.get('ParamAngleX') == float((pings - 1) % 60 - 30)
+
+    # 挂起期间不会绘制新帧，带 id 的命令应当立即得到 deferred 回复，而不是一直等待
+    acks = []
+    widget.set_power_reason('hidden', True)
+    widget.control.post(demo.ControlInbox.parse({'params': {'ParamAngleX': 5.0}}), acks.append)
+    harness.app.processEvents()
+    widget.set_power_reason('hidden', False)
+    result['suspended_ack'] = 'deferred' if acks == [True] else 'missing'
+    widget.deleteLater()
+    return result
+
+
+def measure_auto_crop(harness, seconds=60.0, mask_hz=30.0, canvas=(1000, 800)):
+    """
+    用合成的模型包围盒（左右摇摆，每 15 秒抬手一次）驱动裁剪控制器：
+    合成面积相对整个画布的变化、裁剪调整次数，以及内容超出裁剪区域的帧数
+    """
+    demo = harness.demo
+    controller = demo.CropController()
+    width, height = canvas
+    crop = (0, 0, width, height)
+    changes = 0
+    clipped = 0
+    area = []
+    steps = int(seconds * mask_hz)
+    for i in range(steps):
+        now = i / mask_hz
+        sway = 30.0 * math.sin(now * math.pi)
+        raised = 80.0 if (now % 15.0) < 3.0 else 0.0
+        bounds = (330 + sway - raised, 180 - raised, 670 + sway, 800)
+        if (bounds[0] < crop[0] or bounds[1] < crop[1] or
+                bounds[2] > crop[0] + crop[2] or bounds[3] > crop[1] + crop[3]):
+            clipped += 1
+        target = controller.update(bounds, crop, width, height, now)
+        if target is not None:
+            crop = target
+            changes += 1
+        area.append(crop[2] * crop[3])
+    return {
+        'canvas_px': width * height,
+        'mean_window_px': statistics.fmean(area),
+        'saved_ratio': 1.0 - statistics.fmean(area) / (width * height),
+        'crop_changes': changes,
+        'changes_per_minute': changes * 60.0 / seconds,
+        'clipped_updates': clipped,
+    }
+
+
+def run(args):
+    harness = Harness(args.backend)
+    results = {
+        'backend': args.backend,
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'qt_platform': os.environ.get('QT_QPA_PLATFORM'),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'scenarios': {},
+    }
+    for scenario in args.scenarios:
+        results['scenarios'][scenario] = run_scenario(harness, scenario, args.frames, args.alloc_frames)
+    results['startup'] = harness.startup
+    sections = [
+        ('model_bundle', measure_model_bundle, harness),
+        ('shared_windows', measure_shared_windows, harness),
+        ('pet_scaling', measure_pet_scaling, harness, args.pets, args.frames) if args.pets else None,
+        ('texture_tiers', measure_texture_tiers, harness),
+        ('auto_crop', measure_auto_crop, harness),
+        ('expressions', measure_expressions, harness),
+        ('physics_lod', measure_physics_lod, harness),
+        ('render_scale', measure_render_scale, harness),
+        ('profiler', measure_profiler, harness),
+        ('power_states', measure_power_states, harness),
+        ('control_api', measure_control_api, harness),
+        ('fancy_menu', measure_fancy_menu, harness),
+        ('leaving_animation', measure_leaving_animation, harness, args.leaving_gif),
+        ('input_latency_ms', measure_input_latency, harness.demo, harness.app)
+        if not sys.platform.startswith('win') else None,
+    ]
+    for section in filter(None, sections):
+        name, measure, *measure_args = section
+        # 某一节出错时记录错误并继续执行其余各节，最后由 check_results 判为失败
+        try:
+            results[name] = measure(*measure_args)
+        except Exception as e:
+            traceback.print_exc()
+            results[name] = {'error': repr(e)}
+    if args.backend == 'stub':
+        results['gl_calls'] = dict(harness.gl_calls)
+    return results
+
+
+def check_results(results):
+    """
+    检查结果中各节声称的行为是否成立，返回失败说明的列表（为空表示全部通过）
+    """
+    failures = []
+
+    def find_errors(data, path):
+        if isinstance(data, dict):
+            if 'error' in data:
+                failures.append(f"{path}: {data['error']}")
+            for key, value in data.items():
+                find_errors(value, f"{path}.{key}" if path else key)
+
+    find_errors(results, '')
+
+    def expect(section, condition, message):
+        data = results.get(section)
+        if isinstance(data, dict) and 'error' not in data and not condition(data):
+            failures.append(f"{section}: {message}")
+
+    expect('model_bundle', lambda d: d['bundle']['source'] == 'bundle' and d['files']['source'] == 'files',
+           "没有按预期分别从模型包和模型文件加载")
+    expect('pet_scaling', lambda d: all(v['model_loads'] == 1 for v in d.values()), "多个宠物没有共用同一个模型")
+    expect('render_scale', lambda d: all(v['changes_second_half'] == 0 for v in d.values()), "分辨率比例来回切换")
+    expect('profiler', lambda d: d['endpoint_ok'], "/metrics 没有返回帧耗时指标")
+    expect('power_states', lambda d: all(d[state]['timer_wakeups_per_s'] == 0
+                                         for state in ('occluded', 'hidden', 'locked')), "挂起期间定时器仍在唤醒")
+    expect('power_states', lambda d: d['idle_wake_latency_ms']['trials'] > 0, "没有测到空闲唤醒延迟")
+    expect('control_api', lambda d: d['last_value_applied'], "最后一次设置的参数值没有生效")
+    expect('control_api', lambda d: d['suspended_ack'] == 'deferred', "挂起期间的命令没有收到 deferred 回复")
+    expect('input_latency_ms', lambda d: d['toggles'] > 0 and d['reads_after_unplug'] <= 2, "设备拔出后读取线程空转")
+    return failures
+
+
+def flatten(data, prefix=''):
+    """
+    把嵌套结果展开成 {'a.b.c': 数值}，便于比较
+    """
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path, new_path):
+    """
+    打印两次运行的指标对比
+    """
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = flatten(json.load(f))
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = flatten(json.load(f))
+    print(f"{'metric':60} {'old':>12} {'new':>12} {'change':>9}")
+    for name in sorted(set(old) & set(new)):
+        before, after = old[name], new[name]
+        change = f"{(after - before) / before * 100:+.1f}%" if before else '-'
+        print(f"{name:60} {before:12.4f} {after:12.4f} {change:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live2DWidget 渲染/更新循环基准测试")
+    parser.add_argument('--backend', choices=('stub', 'gl'), default='stub')
+    parser.add_argument('--frames', type=int, default=600, help="每个场景的计时帧数")
+    parser.add_argument('--alloc-frames', type=int, default=120, help="每个场景的内存分配统计帧数")
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--pets', nargs='*', type=int, default=[1, 5, 10, 25, 50],
+                        help="多宠物扩展测试的宠物数量，不给数值则跳过")
+    parser.add_argument('--leaving-gif', help="离开动画 GIF 路径，默认使用 asset/leaving.gif")
+    parser.add_argument('--output', help="把 JSON 结果写入文件，默认输出到标准输出")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="对比两次运行的 JSON 结果")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    results = run(args)
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+    failures = check_results(results)
+    for failure in failures:
+        print(f"失败: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,171 @@
 import sys
 import os
+import time
+import bisect
+import ctypes
+import hashlib
+import json
+import random
+import select
+import stat
+import struct
+import threading
+import traceback
+from collections import deque
+import numpy as np
 import live2d.v3 as live2d
-from PyQt5.QtCore import Qt, QTimer, QPoint
-from PyQt5.QtGui import QKeyEvent, QCursor, QPainter, QRadialGradient, QColor, QIcon
+from PyQt5.QtCore import Qt, QTimer, QPoint, QRect, QEvent, QObject, QBuffer, QByteArray, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import (
+    QKeyEvent, QCursor, QPainter, QRadialGradient, QColor, QIcon, QPixmap, QGuiApplication,
+    QOpenGLFramebufferObject, QOpenGLFramebufferObjectFormat, QOpenGLContext, QImage, QImageReader)
 from PyQt5.QtWidgets import QApplication, QMainWindow, QOpenGLWidget, QMenu, QAction, QMessageBox, QSystemTrayIcon
-from OpenGL.GL import glClear, glClearColor, GL_POINTS, GL_COLOR_BUFFER_BIT
-from OpenGL.GL import GL_DEPTH_BUFFER_BIT, GL_DEPTH_TEST, glDepthFunc, glEnable, glViewport
-import random
-import keyboard
-import win32gui
-import win32con
+from OpenGL.GL import (
+    glClear, glClearColor, GL_POINTS, GL_COLOR_BUFFER_BIT,
+    GL_DEPTH_BUFFER_BIT, GL_DEPTH_TEST, glDepthFunc, glEnable, glViewport,
+    glBindFramebuffer, glBlitFramebuffer, GL_READ_FRAMEBUFFER, GL_DRAW_FRAMEBUFFER, GL_NEAREST, GL_LINEAR,
+    glGenBuffers, glDeleteBuffers, glBindBuffer, glBufferData, glMapBuffer, glUnmapBuffer,
+    glFenceSync, glClientWaitSync, glDeleteSync, GL_PIXEL_PACK_BUFFER, GL_STREAM_READ, GL_READ_ONLY,
+    GL_RGBA, GL_UNSIGNED_BYTE, GL_SYNC_GPU_COMMANDS_COMPLETE, GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED,
+    glGenQueries, glDeleteQueries, glBeginQuery, glEndQuery, glGetQueryObjectiv, glGetQueryObjectui64v,
+    GL_TIME_ELAPSED, GL_QUERY_RESULT, GL_QUERY_RESULT_AVAILABLE)
+from OpenGL.raw.GL.VERSION.GL_1_0 import glReadPixels  # 不经过 PyOpenGL 的数组包装，直接读入 PBO
+
+
+class StartupTimeline:
+    """
+    记录启动各阶段的时间点，使用 --profile-startup 启动时在启动完成后打印时间线
+    计时从本模块的导入语句全部执行完时算起；各个库的导入耗时用 python -X importtime 查看
+    """
+
+    def __init__(self, final=('first model frame presented', 'deferred init')):
+        self.start = time.perf_counter()
+        self.modules = len(sys.modules)  # 计时开始时已经导入的模块数
+        self.marks = []
+        self.enabled = False
+        self.final = final  # 全部出现后视为启动完成，之后不再记录
+        self.done = False
+
+    def mark(self, label):
+        if self.done:
+            return
+        self.marks.append((label, time.perf_counter()))
+        if all(self.elapsed_ms(name) is not None for name in self.final):
+            self.done = True
+            if self.enabled:
+                self.print()
+
+    def elapsed_ms(self, label):
+        for name, t in self.marks:
+            if name == label:
+                return (t - self.start) * 1000.0
+        return None
+
+    def print(self):
+        print(f"启动时间线（毫秒，从导入完成时算起，已导入 {self.modules} 个模块）:")
+        last = self.start
+        for label, t in self.marks:
+            print(f"  {(t - self.start) * 1000.0:9.1f}  +{(t - last) * 1000.0:8.1f}  {label}")
+            last = t
+        if 'importtime' not in sys._xoptions:
+            print("各个库的导入耗时: python -X importtime demo111.py --profile-startup")
+
+
+STARTUP = StartupTimeline()
 
 
 # 资源路径
 BASE_DIR = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
 MODEL_PATH = os.path.join(BASE_DIR, 'model')
+MODEL_JSON_PATH = os.path.join(MODEL_PATH, 'sef.model3.json')
+CDI_PATH = os.path.join(MODEL_PATH, 'sef.cdi3.json')
+PHYSICS_PATH = os.path.join(MODEL_PATH, 'sef.physics3.json')
+BUNDLE_PATH = os.path.join(MODEL_PATH, 'sef.bundle')  # 由 --build-bundle 生成的预编译模型包
+LEAVING_GIF_PATH = os.path.join(BASE_DIR, 'asset', 'leaving.gif')
+
+# 离开动画：解码时的最大高度（更大的 GIF 先缩小再缓存），以及没有写明帧时长的 GIF 使用的时长（与浏览器一致）
+LEAVING_MAX_HEIGHT = 1024
+LEAVING_DEFAULT_DELAY_MS = 100
+
+# 本地缓存目录（纹理档位等）
+CACHE_DIR = os.path.join(os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache'), 'Deskpet')
+TEXTURE_CACHE_DIR = os.path.join(CACHE_DIR, 'textures')
+TEXTURE_TIERS = (512, 1024, 2048)  # 纹理分辨率档位
+TIER_SETTLE_MS = 500               # 窗口大小停止变化多久后重新选择纹理档位
+
+# Ctrl+滚轮缩放：每格滚轮改变的像素数、最小窗口尺寸，以及停止滚动多久后视为缩放结束
+RESIZE_STEP = 10
+MIN_WINDOW_SIZE = 400
+RESIZE_SETTLE_MS = 150
+
+# 命中掩码：相对窗口的降采样倍数、视为不透明的 alpha 阈值、同时在途的异步读回数量
+HIT_MASK_SCALE = 8
+HIT_ALPHA_THRESHOLD = 16
+HIT_READBACK_SLOTS = 2
+
+# 动态渲染分辨率：按最近的帧耗时在最小和最大比例之间调整离屏渲染的分辨率，呈现时线性放大到窗口
+RENDER_SCALE_MIN = 0.5
+RENDER_SCALE_MAX = 1.0
+RENDER_SCALE_STEP = 0.1
+RENDER_SCALE_HIGH = 0.9      # 平均帧耗时超过预算的这个比例时降低分辨率
+RENDER_SCALE_LOW = 0.6       # 按像素数预估提高一档后的耗时仍低于预算的这个比例时才提高
+RENDER_SCALE_WINDOW = 30     # 计算平均耗时使用的帧数
+RENDER_SCALE_COOLDOWN = 1.0  # 两次调整之间至少间隔的时间（秒）
+GPU_TIMER_SLOTS = 4          # 同时在途的 GPU 计时查询数量
+
+# 帧耗时记录：环形缓冲保留的样本数，以及计算的分位数
+PROFILE_SAMPLES = 1024
+PROFILE_QUANTILES = (0.5, 0.95, 0.99)
+PROFILE_SNAPSHOT_INTERVAL = 1.0  # 记录帧耗时期间，指标接口读取的快照的刷新间隔（秒）
+
+# 本地控制接口
+CONTROL_MAX_LINE = 1 << 20  # 单行控制消息的最大长度（字节）
+
+# 自动裁剪：窗口只覆盖模型实际绘制的区域（逻辑像素 / 秒）
+CROP_MARGIN = 48          # 在模型包围盒外保留的边距
+CROP_EDGE = 8             # 内容距离裁剪边缘小于此值时立即扩大
+CROP_SHRINK_RATIO = 0.85  # 新的裁剪面积小于当前面积的这个比例才考虑缩小
+CROP_SETTLE = 1.0         # 需要缩小的状态持续多久才真正缩小
+
+# 多宠物模式下每个宠物占用的格子边长（逻辑像素）
+PET_CELL_SIZE = 300
+
+# 第一帧迟迟没有呈现时（例如 GL 初始化失败），最多等待这么久再初始化热键和托盘
+DEFERRED_INIT_TIMEOUT_MS = 3000
+
+# 动画仿真参数（以秒为单位，与渲染帧率解耦）
+SIM_HZ = 60.0             # 固定仿真步长的频率
+RENDER_INTERVAL_MS = 16   # 渲染/更新定时器的间隔
+REFERENCE_FPS = 60.0      # 原有平滑系数调参时对应的帧率
+MAX_SIM_STEPS = 8         # 单次推进最多执行的仿真步数，避免卡顿后追帧雪崩
+
+# 帧调度参数
+MAX_FPS = 60.0            # 最高帧率上限
+IDLE_FPS = 10.0           # 动画收敛后的空闲轮询频率
+IDLE_DELAY = 0.5          # 收敛后保持高帧率的时间（秒），之后才进入空闲
+
+# 光标输入参数
+CURSOR_SAMPLE_HZ = 120.0  # 动画活跃时的光标采样频率
+CURSOR_IDLE_HZ = 60.0     # 空闲时的光标轮询频率：只比较光标位置，移动后一帧之内唤醒
+CURSOR_HISTORY = 16       # 保留的光标采样数
+VELOCITY_WINDOW = 0.05    # 估计光标速度使用的历史时间窗口（秒）
+MAX_PREDICTION = 0.05     # 最多向前外推的时间（秒）
+CURSOR_STOP_TIME = 0.03   # 超过该时间没有移动视为光标已停下，不再外推
+
+# 脏标记参数
+DIRTY_EPSILON = 1e-3      # 参数变化小于该值视为未变化
+PHYSICS_SETTLE = 2.0      # 物理输入参数变化后，头发摆动完全静止所需的时间（秒）
+
+# 物理细节层次：物理输入停止变化后头发逐渐静止，这段时间内降低模型更新频率
+PHYSICS_FULL_TIME = 0.3     # 输入停止变化后保持全速的时间（秒）
+PHYSICS_LOD_FPS = (30.0, 15.0)  # 之后依次降低到的更新频率，收敛后冻结
+PHYSICS_SMALL_SIDE = 500    # 画布最长边（设备像素）小于该值时宠物很小，摆动细节看不清
+PHYSICS_SMALL_SETTLE = 1.0  # 宠物很小时提前冻结物理的时间（秒）
+
+# 表情与动作
+EXPRESSION_FADE = 0.5     # 表情切换的默认淡入淡出时间（秒），exp3.json 写明 FadeInTime 时以文件为准
+MOTION_FADE = 0.5         # 动作默认的淡入淡出时间（秒）
+MOTION_SAMPLE_HZ = 60.0   # 动作曲线预先采样的频率
+BEZIER_STEPS = 8          # 贝塞尔段展开成折线时的细分数
 
 
 # 自定义 FancyMenu，实现从中心向外的径向渐变（支持 hover 渐进动画）
@@ -48,361 +199,4002 @@ class FancyMenu(QMenu):
         self.setMouseTracking(True)
         self.hovered_action = None
         self._anim_progress = 1.0  # 动画进度
+        # 动画定时器只在 hover 动画进行中运行，动画结束或菜单关闭后停止，静止时没有任何唤醒
         self.anim_timer = QTimer(self)
         self.anim_timer.setInterval(16)
         self.anim_timer.timeout.connect(self._anim_step)
-        self.anim_timer.start()
+        self.anim_ticks = 0
 
         # 连接 hovered 信号，用于记录当前悬停的 action
         self.hovered.connect(self._on_hovered)
 
-    def _on_hovered(self, action):
-        # 记录当前悬停的 action 并重置动画进度
-        self.hovered_action = action
-        self._anim_progress = 0.0
-        self.update()
+    # 渐变背景按 (宽, 高, 是否 hover, 动画步数, 设备像素比) 缓存为 QPixmap，所有菜单实例共用
+    _background_cache = {}
+    BACKGROUND_CACHE_LIMIT = 256
+    ANIM_STEP = 0.08
+
+    def _on_hovered(self, action):
+        # 记录当前悬停的 action 并重置动画进度（悬停项没变时不重新开始动画）
+        if action is self.hovered_action:
+            return
+        self.hovered_action = action
+        self._anim_progress = 0.0
+        self.anim_timer.start()
+        self.update()
+
+    def _anim_step(self):
+        # 简单推进动画进度，到达终点后停止定时器
+        self.anim_ticks += 1
+        self._anim_progress = min(1.0, self._anim_progress + self.ANIM_STEP)
+        if self._anim_progress >= 1.0:
+            self.anim_timer.stop()
+        self.update()
+
+    def hideEvent(self, event):
+        # 菜单关闭后直接停在动画终点，下次弹出时复用同一个实例
+        self.anim_timer.stop()
+        self._anim_progress = 1.0
+        self.hovered_action = None
+        super().hideEvent(event)
+
+    @classmethod
+    def background_pixmap(cls, width, height, hovered, progress, ratio):
+        """
+        返回菜单项的径向渐变背景，相同尺寸和状态只渲染一次
+        """
+        step = int(round(progress / cls.ANIM_STEP))
+        key = (width, height, hovered, step, ratio)
+        pixmap = cls._background_cache.get(key)
+        if pixmap is not None:
+            return pixmap
+        if len(cls._background_cache) >= cls.BACKGROUND_CACHE_LIMIT:
+            cls._background_cache.clear()
+        t = min(1.0, step * cls.ANIM_STEP)
+
+        # 基础颜色（非 hover）
+        base_center_color = QColor(20, 25, 40, 220)
+        base_mid_color = QColor(20, 25, 40, 80)
+        base_edge_color = QColor(20, 25, 40, 0)
+
+        if hovered:
+            # hover 时颜色更亮，且使用 anim_progress 控制强度或半径
+            center_alpha = int(210 * t + 120 * (1 - t))
+            mid_alpha = int(140 * t + 50 * (1 - t))
+            base_center_color = QColor(66, 153, 225, center_alpha)
+            base_mid_color = QColor(66, 153, 225, mid_alpha)
+            base_edge_color = QColor(66, 153, 225, 0)
+
+        pixmap = QPixmap(int(width * ratio), int(height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # radial gradient 中心设在 item 的中心
+        cx = width / 2.0
+        cy = height / 2.0
+        radius = max(width, height) * (0.9 + 0.25 * t)
+
+        grad = QRadialGradient(cx, cy, radius, cx, cy)
+        grad.setColorAt(0.0, base_center_color)
+        grad.setColorAt(0.5, base_mid_color)
+        grad.setColorAt(1.0, base_edge_color)
+
+        # 绘制渐变背景，使用圆角矩形
+        painter.setBrush(grad)
+        painter.setPen(Qt.NoPen)  # 无边框
+        painter.drawRoundedRect(QRect(0, 0, width, height).adjusted(4, 2, -4, -2), 8, 8)
+        painter.end()
+        cls._background_cache[key] = pixmap
+        return pixmap
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        ratio = self.devicePixelRatioF()
+
+        # 为每个 action 绘制径向渐变背景（中心到外渐变透明），背景取自缓存
+        for action in self.actions():
+            rect = self.actionGeometry(action)
+            if rect.isValid() and not rect.isEmpty():
+                pixmap = self.background_pixmap(rect.width(), rect.height(), action == self.hovered_action,
+                                                self._anim_progress, ratio)
+                painter.drawPixmap(rect.topLeft(), pixmap)
+
+        painter.end()
+
+        # 让 QMenu 的默认绘制继续绘制文本/图标/选中框等
+        super().paintEvent(event)
+
+
+# 每帧驱动的模型参数：(参数ID, 60FPS下每帧平滑系数, 最小值, 最大值, 初始值, 肉眼可见的最小变化量)
+DRIVEN_PARAMETERS = (
+    ("ParamAngleX", 0.1, -30.0, 30.0, 0.0, 0.05),
+    ("ParamAngleY", 0.1, -30.0, 30.0, 0.0, 0.05),
+    ("ParamEyeBallX", 0.12, -1.0, 1.0, 0.0, 0.005),
+    ("ParamEyeBallY", 0.1, -0.9, 0.9, 0.0, 0.005),
+    ("ParamBodyAngleX", 0.1, -7.5, 7.5, 0.0, 0.05),
+    ("ParamBodyAngleY", 0.1, -6.0, 6.0, 0.0, 0.05),
+    ("ParamBodyAngleZ", 0.1, -6.0, 6.0, 0.0, 0.05),
+    ("ParamMouthOpenY", 0.008, 0.08, 0.2, 0.1, 0.005),
+    ("ParamEyeLOpen", 0.15, 0.0, 1.0, 1.0, 0.01),
+    ("ParamEyeROpen", 0.15, 0.0, 1.0, 1.0, 0.01),
+    ("ParamShoulderLRotation", 0.08, -15.0, 0.0, -10.0, 0.05),
+    ("ParamShoulderRRotation", 0.08, -15.0, 0.0, -10.0, 0.05),
+)
+
+# 驱动参数在参数块中的位置
+(P_ANGLE_X, P_ANGLE_Y, P_EYEBALL_X, P_EYEBALL_Y, P_BODY_X, P_BODY_Y, P_BODY_Z,
+ P_MOUTH, P_EYE_L, P_EYE_R, P_ARM_L, P_ARM_R) = range(len(DRIVEN_PARAMETERS))
+
+
+def smooth_factor(per_frame_factor, dt):
+    """
+    把按 60FPS 每帧调好的插值系数换算成与帧率无关的指数平滑系数
+    per_frame_factor: 原来每帧使用的插值系数（如 0.1），可以是 NumPy 数组
+    dt: 实际经过的时间（秒）
+    """
+    return 1.0 - (1.0 - per_frame_factor) ** (dt * REFERENCE_FPS)
+
+
+def load_parameter_ids(cdi_path=CDI_PATH):
+    """
+    从 cdi3.json 读取模型声明的参数ID列表
+    """
+    try:
+        with open(cdi_path, 'r', encoding='utf-8') as f:
+            return [param['Id'] for param in json.load(f).get('Parameters', [])]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"读取参数列表失败: {e}")
+        return []
+
+
+class ParameterBlock:
+    """
+    以 NumPy 数组保存所有每帧驱动的参数，一步向量化完成平滑和限幅，
+    并通过模型加载时解析好的参数索引写入模型，避免每帧按字符串查找参数
+    """
+
+    def __init__(self, specs=DRIVEN_PARAMETERS, rows=None):
+        """
+        rows: 可选的 (current, target, prev, rendered) 数组视图，
+              由 ParameterBatch 传入，使多个参数块共享一块堆叠的内存
+        """
+        self.ids = [spec[0] for spec in specs]
+        self.rates = np.array([spec[1] for spec in specs], dtype=np.float64)
+        self.lower = np.array([spec[2] for spec in specs], dtype=np.float64)
+        self.upper = np.array([spec[3] for spec in specs], dtype=np.float64)
+        self.visible_steps = np.array([spec[5] for spec in specs], dtype=np.float64)
+        if rows is None:
+            self.current = np.array([spec[4] for spec in specs], dtype=np.float64)
+            self.target = self.current.copy()
+            self.prev = self.current.copy()
+            self.rendered = self.current.copy()  # 渲染用的插值结果，复用同一块内存
+        else:
+            self.current, self.target, self.prev, self.rendered = rows
+
+        # 平滑系数只依赖步长，固定步长下只需计算一次
+        self._factor_dt = None
+        self._factor = None
+
+        # 模型加载后解析的写入方式：[(模型参数索引或ID, 参数块位置), ...]
+        self.bindings = []
+        self._set_value = None
+
+    def step(self, dt):
+        """
+        向量化推进一步：所有参数同时向目标值平滑并限制在范围内
+        """
+        if dt != self._factor_dt:
+            self._factor_dt = dt
+            self._factor = smooth_factor(self.rates, dt)
+        np.copyto(self.prev, self.current)
+        self.current += (self.target - self.current) * self._factor
+        np.clip(self.current, self.lower, self.upper, out=self.current)
+
+    def settle(self):
+        """
+        直接把所有参数置为目标值（限制在范围内），不再有待完成的平滑
+        """
+        np.clip(self.target, self.lower, self.upper, out=self.current)
+        np.copyto(self.prev, self.current)
+
+    def interpolate(self, alpha):
+        """
+        在上一步和当前步之间插值得到渲染值
+        """
+        np.subtract(self.current, self.prev, out=self.rendered)
+        self.rendered *= alpha
+        self.rendered += self.prev
+        return self.rendered
+
+    def required_fps(self, dt):
+        """
+        按最近一步的变化速度估算不丢失可见细节所需的帧率
+        """
+        return float(np.max(np.abs(self.current - self.prev) / self.visible_steps)) / dt
+
+    def bind(self, model, declared_ids=None):
+        """
+        模型加载后解析一次参数索引
+        只绑定 cdi3.json 中声明过的参数；模型支持按索引写入时使用模型自身的参数表解析索引
+        declared_ids: 已经读取的 cdi3.json 参数ID，未提供时从文件读取
+        """
+        declared = set(load_parameter_ids() if declared_ids is None else declared_ids)
+        slots = [(pid, i) for i, pid in enumerate(self.ids) if not declared or pid in declared]
+        if hasattr(model, 'GetParamIds') and hasattr(model, 'SetIndexParamValue'):
+            model_index = {pid: i for i, pid in enumerate(model.GetParamIds())}
+            self.bindings = [(model_index[pid], i) for pid, i in slots if pid in model_index]
+            self._set_value = model.SetIndexParamValue
+        else:
+            self.bindings = slots
+            self._set_value = model.SetParameterValue
+
+    def push(self, values):
+        """
+        把参数值写入已绑定的模型
+        """
+        set_value = self._set_value
+        if set_value is None:
+            return
+        values = values.tolist()
+        for key, i in self.bindings:
+            set_value(key, values[i], 1.0)
+
+
+class ParameterBatch(ParameterBlock):
+    """
+    多个宠物的参数按行堆叠成 (宠物数, 参数数) 的二维数组，
+    step/interpolate/required_fps 一次向量化处理所有宠物；
+    blocks 中每个参数块的数组都是对应行的视图，单个宠物照常读写自己的目标值和绑定的模型
+    """
+
+    def __init__(self, count, specs=DRIVEN_PARAMETERS):
+        super().__init__(specs)
+        self.current = np.tile(self.current, (count, 1))
+        self.target = self.current.copy()
+        self.prev = self.current.copy()
+        self.rendered = self.current.copy()
+        self.blocks = [ParameterBlock(specs, (self.current[i], self.target[i], self.prev[i], self.rendered[i]))
+                       for i in range(count)]
+
+
+class AnimationState:
+    """
+    基于真实时间推进的动画状态：光标跟随、瞳孔、手臂、眨眼和嘴巴呼吸
+    使用固定步长累加器推进，渲染频率和仿真频率可以分别调整而不改变动作快慢
+    """
+
+    def __init__(self, sim_hz=SIM_HZ, params=None):
+        self.sim_dt = 1.0 / sim_hz
+        self.accumulator = 0.0  # 尚未消化的真实时间
+        self.sim_time = 0.0     # 已仿真的总时间
+
+        # 所有驱动参数的当前值、目标值、平滑系数和范围（多宠物时是 ParameterBatch 中的一行）
+        self.params = ParameterBlock() if params is None else params
+
+        # 输入：光标在窗口内的归一化位置（0~1）和 CTRL+鼠标 状态
+        self.cursor_x = 0.5
+        self.cursor_y = 0.5
+        self.is_ctrl_mouse_pressed = False
+
+        # 嘴巴呼吸效果（间隔单位为秒）
+        self.target_mouth_open = 0.1
+        self.breath_timer = 0.0
+        self.breath_interval = 2.0
+        self.min_open_value = 0.08
+        self.max_open_value = 0.2
+
+        # 手臂目标角度
+        self.target_arm_left = -10.0
+        self.target_arm_right = -10.0
+
+        # 眨眼效果（间隔单位为秒）
+        self.target_eye_open = 1.0
+        self.blink_timer = 0.0
+        self.blink_interval = random.uniform(5.0, 10.0)
+        self.blink_close_duration = 0.25
+
+    def set_cursor(self, nx, ny):
+        """
+        设置光标在窗口内的归一化位置
+        """
+        self.cursor_x = nx
+        self.cursor_y = ny
+
+    def set_ctrl_mouse_pressed(self, pressed):
+        """
+        设置 CTRL+鼠标 按下状态，松开时恢复睁眼和嘴巴的正常状态
+        """
+        self.is_ctrl_mouse_pressed = pressed
+        if not pressed:
+            self.target_eye_open = 1.0
+            self.target_mouth_open = 0.1
+
+    def advance(self, real_dt):
+        """
+        用真实经过的时间推进动画，按固定步长执行若干次仿真
+        返回本次执行的仿真步数
+        """
+        self.accumulator += max(0.0, real_dt)
+        steps = 0
+        while self.accumulator >= self.sim_dt and steps < MAX_SIM_STEPS:
+            self.step(self.sim_dt)
+            self.accumulator -= self.sim_dt
+            steps += 1
+        if steps == MAX_SIM_STEPS:
+            # 卡顿太久时丢弃积压的时间，而不是一帧内补完
+            self.accumulator = min(self.accumulator, self.sim_dt)
+        return steps
+
+    def fast_forward(self, elapsed):
+        """
+        跳过一段没有仿真的时间（窗口挂起期间），不逐步补算：
+        眨眼和呼吸的节奏按经过的时间取余，参数直接到达当前目标值
+        """
+        self.accumulator = 0.0
+        self.sim_time += max(0.0, elapsed)
+        if not self.is_ctrl_mouse_pressed:
+            # 挂起期间的眨眼已经错过，恢复时保持睁眼
+            self.target_eye_open = 1.0
+            self.blink_timer = (self.blink_timer + elapsed) % self.blink_interval
+            self.breath_timer = (self.breath_timer + elapsed) % self.breath_interval
+        self.update_targets(0.0)
+        self.params.settle()
+
+    def render_values(self):
+        """
+        渲染用的参数值：在上一步和当前步之间按累加器剩余时间插值
+        """
+        return self.params.interpolate(self.accumulator / self.sim_dt)
+
+    def required_fps(self):
+        """
+        按最近一步的变化速度估算不丢失可见细节所需的帧率，完全静止时返回 0
+        """
+        return self.params.required_fps(self.sim_dt)
+
+    def time_to_next_event(self):
+        """
+        距离下一次眨眼、睁眼或呼吸变化的时间（秒），CTRL+鼠标按下时没有定时事件
+        """
+        if self.is_ctrl_mouse_pressed:
+            return None
+        remaining = min(self.blink_interval - self.blink_timer, self.breath_interval - self.breath_timer)
+        if self.target_eye_open == 0.0:
+            remaining = min(remaining, self.blink_close_duration - self.blink_timer)
+        return max(0.0, remaining)
+
+    def step(self, dt):
+        """
+        执行一次仿真步，dt 为步长（秒）
+        """
+        self.update_targets(dt)
+        self.params.step(dt)
+        self.update_timers(dt)
+
+    def update_targets(self, dt):
+        """
+        仿真步的前半部分：根据光标和状态写入所有驱动参数的目标值
+        """
+        self.sim_time += dt
+        nx = self.cursor_x
+        ny = self.cursor_y
+
+        # 将光标位置映射到 [-30.0, 30.0] 范围内
+        angle_x = round(nx * 60.0 - 30.0, 1)
+        angle_y = round(-ny * 60.0 + 30.0, 1)
+
+        # 瞳孔移动比头部转动更敏感，这里使用0.8的系数稍微降低敏感度
+        eyeball_x = round((nx * 2.0 - 1.0) * 0.8, 2)
+
+        # 手臂旋转幅度为头部的1/4，左臂方向与头部相反，右臂相同
+        arm_rotation_factor = 0.25
+        arm_left = -angle_x * arm_rotation_factor
+        arm_right = angle_x * arm_rotation_factor
+
+        if self.is_ctrl_mouse_pressed:
+            # CTRL+鼠标：闭眼、手臂取最小值、嘴巴闭合
+            self.target_eye_open = 0.0
+            self.target_arm_left = -15.0
+            self.target_arm_right = -15.0
+            self.target_mouth_open = self.min_open_value
+        elif abs(arm_left) > 0.1 or abs(arm_right) > 0.1:
+            self.target_arm_left = arm_left
+            self.target_arm_right = arm_right
+
+        # 一次性写入全部目标值：瞳孔Y、身体旋转由头部角度按比例派生
+        params = self.params
+        params.target[:] = (
+            angle_x, angle_y,
+            eyeball_x, angle_y * 0.03,
+            angle_x * 0.25, angle_y * 0.2, angle_x * 0.15 + angle_y * 0.05,
+            self.target_mouth_open,
+            self.target_eye_open, self.target_eye_open,
+            self.target_arm_left, self.target_arm_right,
+        )
+
+    def update_timers(self, dt):
+        """
+        仿真步的后半部分：参数推进之后更新眨眼和呼吸节奏
+        """
+        params = self.params
+        # 只有在非CTRL+鼠标按下状态时才执行正常眨眼和呼吸逻辑
+        if not self.is_ctrl_mouse_pressed:
+            self.blink_timer += dt
+            if self.blink_timer >= self.blink_interval:
+                self.blink_timer = 0.0
+                self.target_eye_open = 0.0
+                self.blink_interval = random.uniform(2.0, 8.0)
+                self.blink_close_duration = random.uniform(0.17, 0.33)
+
+            # 眨眼过程控制：闭眼保持一小段时间后再睁开
+            if self.target_eye_open == 0.0 and params.current[P_EYE_L] < 0.1 \
+                    and self.blink_timer >= self.blink_close_duration:
+                self.target_eye_open = 1.0
+
+            self.breath_timer += dt
+            if self.breath_timer >= self.breath_interval:
+                self.breath_timer = 0.0
+                self.target_mouth_open += random.uniform(-0.15, 0.15)
+                self.target_mouth_open = max(min(self.target_mouth_open, self.max_open_value), self.min_open_value)
+                self.breath_interval = random.uniform(1.5, 3.0)
+
+
+class PetGroup:
+    """
+    同一进程中的多个宠物：每个宠物有自己的动画状态，参数堆叠在一个 ParameterBatch 中，
+    所有宠物共用一个固定步长累加器，每一步先逐个写入目标值，再一次向量化推进全部参数
+    """
+
+    def __init__(self, count, sim_hz=SIM_HZ):
+        self.sim_dt = 1.0 / sim_hz
+        self.accumulator = 0.0
+        self.params = ParameterBatch(count)
+        self.anims = [AnimationState(sim_hz, block) for block in self.params.blocks]
+
+    def advance(self, real_dt):
+        """
+        用真实经过的时间推进所有宠物，返回执行的仿真步数
+        """
+        self.accumulator += max(0.0, real_dt)
+        steps = 0
+        while self.accumulator >= self.sim_dt and steps < MAX_SIM_STEPS:
+            self.step(self.sim_dt)
+            self.accumulator -= self.sim_dt
+            steps += 1
+        if steps == MAX_SIM_STEPS:
+            self.accumulator = min(self.accumulator, self.sim_dt)
+        return steps
+
+    def step(self, dt):
+        for anim in self.anims:
+            anim.update_targets(dt)
+        self.params.step(dt)
+        for anim in self.anims:
+            anim.update_timers(dt)
+
+    def render_values(self):
+        """
+        所有宠物的渲染参数值，形状为 (宠物数, 参数数)
+        """
+        return self.params.interpolate(self.accumulator / self.sim_dt)
+
+    def required_fps(self):
+        return self.params.required_fps(self.sim_dt)
+
+    def time_to_next_event(self):
+        times = [t for t in (anim.time_to_next_event() for anim in self.anims) if t is not None]
+        return min(times) if times else None
+
+
+class FrameScheduler:
+    """
+    自适应帧调度：动画收敛后降到低频空闲节奏，
+    光标移动、眨眼、呼吸或按下CTRL时立即恢复到最高帧率
+    """
+
+    def __init__(self, max_fps=MAX_FPS, idle_fps=IDLE_FPS, idle_delay=IDLE_DELAY, clock=time.perf_counter):
+        """
+        clock: 时间来源，与窗口使用同一个时钟（基准测试中为模拟时钟）
+        """
+        self.max_fps = max_fps
+        self.idle_fps = idle_fps
+        self.idle_delay = idle_delay
+        self.clock = clock
+        self.last_activity = None  # 第一次使用时才读取时钟，时钟可以在创建之后替换
+        self.frame_times = deque(maxlen=120)  # 最近绘制帧的时间戳
+
+    def wake(self):
+        """
+        外部输入（光标移动、CTRL键等）唤醒调度器
+        """
+        self.last_activity = self.clock()
+
+    def is_idle(self):
+        now = self.clock()
+        if self.last_activity is None:
+            self.last_activity = now
+        return now - self.last_activity >= self.idle_delay
+
+    def note_frame(self):
+        """
+        记录一帧已绘制
+        """
+        self.frame_times.append(self.clock())
+
+    def effective_fps(self):
+        """
+        最近一秒内实际绘制的帧率
+        """
+        if not self.frame_times:
+            return 0.0
+        now = self.clock()
+        recent = [t for t in self.frame_times if now - t <= 1.0]
+        return float(len(recent))
+
+    def plan(self, required_fps, time_to_event=None):
+        """
+        根据动画所需帧率和下一次定时事件安排下一次更新
+        返回 (下一次更新的间隔（秒）, 本次是否需要重绘)
+        """
+        if required_fps >= self.idle_fps:
+            self.wake()
+        if self.is_idle():
+            fps = self.idle_fps
+        else:
+            fps = self.max_fps
+        fps = min(max(fps, required_fps), self.max_fps)
+        interval = 1.0 / fps
+        if time_to_event is not None:
+            interval = min(interval, max(time_to_event, 1.0 / self.max_fps))
+        needs_frame = not self.is_idle() or required_fps >= 1.0
+        return interval, needs_frame
+
+
+def load_physics_inputs(physics_path=PHYSICS_PATH):
+    """
+    从 physics3.json 读取驱动物理的输入参数ID
+    """
+    try:
+        with open(physics_path, 'r', encoding='utf-8') as f:
+            settings = json.load(f).get('PhysicsSettings', [])
+    except (OSError, ValueError) as e:
+        print(f"读取物理设置失败: {e}")
+        return set()
+    return {item['Source']['Id'] for setting in settings for item in setting.get('Input', [])
+            if item.get('Source', {}).get('Target') == 'Parameter'}
+
+
+# exp3.json 中参数的混合方式
+BLEND_ADD, BLEND_MULTIPLY, BLEND_OVERWRITE = range(3)
+EXPRESSION_BLENDS = {'Add': BLEND_ADD, 'Multiply': BLEND_MULTIPLY, 'Overwrite': BLEND_OVERWRITE}
+
+
+class ExpressionSet:
+    """
+    模型的所有表情（exp3.json）预先整理成 (表情数, 参数数) 的数组：
+    add 为加法量，mul 为乘法系数，over 为覆盖值，over_mask 表示是否覆盖；
+    表情没有涉及的参数分别为 0、1、不覆盖，合成时不需要区分
+    """
+
+    def __init__(self, names=(), ids=()):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.ids = list(ids)
+        shape = (len(self.names), len(self.ids))
+        self.add = np.zeros(shape)
+        self.mul = np.ones(shape)
+        self.over = np.zeros(shape)
+        self.over_mask = np.zeros(shape)
+        self.fades = np.full(len(self.names), EXPRESSION_FADE)
+
+    @classmethod
+    def load(cls, home, items):
+        """
+        items: model3.json 中 FileReferences.Expressions 列表 [{'Name': ..., 'File': ...}]
+        """
+        entries = []
+        for item in items:
+            try:
+                with open(os.path.join(home, item['File']), 'r', encoding='utf-8') as f:
+                    setting = json.load(f)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"读取表情失败: {e}")
+                continue
+            name = item.get('Name') or os.path.basename(item['File']).split('.')[0]
+            entries.append((name, setting))
+        ids = sorted({param['Id'] for _, setting in entries for param in setting.get('Parameters', [])})
+        column = {pid: i for i, pid in enumerate(ids)}
+        result = cls([name for name, _ in entries], ids)
+        for row, (_, setting) in enumerate(entries):
+            if setting.get('FadeInTime') is not None:
+                result.fades[row] = float(setting['FadeInTime'])
+            for param in setting.get('Parameters', []):
+                col = column[param['Id']]
+                value = float(param.get('Value', 0.0))
+                blend = EXPRESSION_BLENDS.get(param.get('Blend', 'Add'), BLEND_ADD)
+                if blend == BLEND_ADD:
+                    result.add[row, col] = value
+                elif blend == BLEND_MULTIPLY:
+                    result.mul[row, col] = value
+                else:
+                    result.over[row, col] = value
+                    result.over_mask[row, col] = 1.0
+        return result
+
+
+def motion_keyframes(segments):
+    """
+    把 motion3.json 曲线的分段展开为折线关键帧 [(时间, 值)]
+    0 线性、1 贝塞尔（按 BEZIER_STEPS 细分）、2 阶梯、3 反向阶梯
+    """
+    points = [(segments[0], segments[1])]
+    i = 2
+    while i < len(segments):
+        kind = int(segments[i])
+        t0, v0 = points[-1]
+        if kind == 1:
+            (t1, v1), (t2, v2), (t3, v3) = zip(segments[i + 1:i + 7:2], segments[i + 2:i + 7:2])
+            for k in range(1, BEZIER_STEPS + 1):
+                u = k / BEZIER_STEPS
+                a, b, c, d = (1 - u) ** 3, 3 * u * (1 - u) ** 2, 3 * u * u * (1 - u), u ** 3
+                points.append((a * t0 + b * t1 + c * t2 + d * t3, a * v0 + b * v1 + c * v2 + d * v3))
+            i += 7
+            continue
+        t, v = segments[i + 1], segments[i + 2]
+        if kind == 2:
+            points.append((t, v0))
+        elif kind == 3:
+            points.append((t0, v))
+        points.append((t, v))
+        i += 3
+    return points
+
+
+class MotionClip:
+    """
+    motion3.json 的参数曲线预先按 MOTION_SAMPLE_HZ 采样成 (帧数, 曲线数) 的数组，
+    求值时只需在相邻两帧之间做一次向量化的线性插值，与曲线数量和分段数无关
+    """
+
+    def __init__(self, ids, samples, duration, loop=False, fade_in=MOTION_FADE, fade_out=MOTION_FADE,
+                 sample_hz=MOTION_SAMPLE_HZ):
+        self.ids = list(ids)
+        self.samples = samples
+        self.duration = duration
+        self.loop = loop
+        self.fade_in = fade_in
+        self.fade_out = fade_out
+        self.sample_hz = sample_hz
+        self.values = np.zeros(len(self.ids))  # 求值结果，复用同一块内存
+
+    @classmethod
+    def load(cls, path, sample_hz=MOTION_SAMPLE_HZ):
+        with open(path, 'r', encoding='utf-8') as f:
+            setting = json.load(f)
+        meta = setting.get('Meta', {})
+        curves = [curve for curve in setting.get('Curves', []) if curve.get('Target') == 'Parameter']
+        duration = float(meta.get('Duration', 0.0))
+        grid = np.arange(int(np.ceil(duration * sample_hz)) + 1) / sample_hz
+        samples = np.zeros((len(grid), len(curves)))
+        for col, curve in enumerate(curves):
+            times, values = zip(*motion_keyframes(curve['Segments']))
+            samples[:, col] = np.interp(grid, times, values)
+        return cls([curve['Id'] for curve in curves], samples, duration, bool(meta.get('Loop', False)),
+                   float(setting.get('FadeInTime', meta.get('FadeInTime', MOTION_FADE))),
+                   float(setting.get('FadeOutTime', meta.get('FadeOutTime', MOTION_FADE))), sample_hz)
+
+    def evaluate(self, t):
+        """
+        t 秒时所有曲线的值
+        """
+        if self.loop and self.duration > 0:
+            t %= self.duration
+        pos = min(max(t, 0.0) * self.sample_hz, len(self.samples) - 1)
+        i = min(int(pos), len(self.samples) - 2) if len(self.samples) > 1 else 0
+        frac = pos - i
+        np.subtract(self.samples[min(i + 1, len(self.samples) - 1)], self.samples[i], out=self.values)
+        self.values *= frac
+        self.values += self.samples[i]
+        return self.values
+
+    def weight(self, t):
+        """
+        t 秒时的淡入淡出权重
+        """
+        weight = 1.0
+        if self.fade_in > 0:
+            weight = min(weight, t / self.fade_in)
+        if not self.loop and self.fade_out > 0:
+            weight = min(weight, (self.duration - t) / self.fade_out)
+        return min(1.0, max(0.0, weight))
+
+
+def load_motions(home, groups):
+    """
+    预先加载 model3.json 中 FileReferences.Motions 引用的所有动作：{组名: [MotionClip, ...]}
+    """
+    motions = {}
+    for group, items in groups.items():
+        clips = []
+        for item in items:
+            try:
+                clip = MotionClip.load(os.path.join(home, item['File']))
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                print(f"读取动作失败: {e}")
+                continue
+            if item.get('FadeInTime') is not None:
+                clip.fade_in = float(item['FadeInTime'])
+            if item.get('FadeOutTime') is not None:
+                clip.fade_out = float(item['FadeOutTime'])
+            clips.append(clip)
+        motions[group] = clips
+    return motions
+
+
+class ParameterTargets:
+    """
+    一组参数ID的写入方式，在模型加载后解析一次：
+    本程序驱动的参数直接在渲染值上合成（driven_cols -> driven_slots），其余参数通过模型接口写入
+    """
+
+    def __init__(self, ids, model, driven_ids):
+        driven = {pid: i for i, pid in enumerate(driven_ids)}
+        cols = [col for col, pid in enumerate(ids) if pid in driven]
+        self.driven_cols = np.array(cols, dtype=np.intp)
+        self.driven_slots = np.array([driven[ids[col]] for col in cols], dtype=np.intp)
+        others = [(pid, col) for col, pid in enumerate(ids) if pid not in driven]
+        if hasattr(model, 'GetParamIds') and hasattr(model, 'SetIndexParamValue'):
+            model_index = {pid: i for i, pid in enumerate(model.GetParamIds())}
+            self.model_bindings = [(model_index[pid], col) for pid, col in others if pid in model_index]
+            self.set_value = model.SetIndexParamValue
+            self.add_value = getattr(model, 'AddIndexParamValue', None)
+        else:
+            self.model_bindings = others
+            self.set_value = model.SetParameterValue
+            self.add_value = getattr(model, 'AddParameterValue', None)
+
+
+class ExpressionMixer:
+    """
+    表情与动作的合成
+    表情只在切换时记录一次过渡，之后每帧按最多两个表情（当前的和正在淡出的上一个）的权重合成，
+    动作同一时间只播放一个，因此每帧的开销与模型定义的表情和动作数量无关
+    """
+
+    def __init__(self, expressions=None, motions=None):
+        self.set_definitions(expressions, motions)
+        self.transitions = 0
+
+    def set_definitions(self, expressions=None, motions=None):
+        self.expressions = expressions if expressions is not None else ExpressionSet()
+        self.motions = motions or {}
+        self.current = None    # 当前表情的行号
+        self.previous = None   # 正在淡出的表情的行号
+        self.start = 0.0
+        self.fade = 0.0
+        self.motion = None     # (MotionClip, 开始时间, 写入方式)
+        width = len(self.expressions.ids)
+        self.add = np.zeros(width)
+        self.mul = np.ones(width)
+        self.over = np.zeros(width)
+        self.over_weight = np.zeros(width)
+        self.targets = None
+        self.model = None
+        self.driven_ids = ()
+        self.values = None
+
+    def names(self):
+        return list(self.expressions.names)
+
+    def bind(self, model, driven_ids):
+        """
+        模型加载后解析一次表情参数的写入方式
+        """
+        self.model = model
+        self.driven_ids = list(driven_ids)
+        self.targets = ParameterTargets(self.expressions.ids, model, self.driven_ids)
+        self.values = np.zeros(len(self.driven_ids))
+
+    def select(self, name, now):
+        """
+        切换到名为 name 的表情（None 表示不使用表情），返回过渡时间；表情没有变化时返回 None
+        """
+        row = None if name is None else self.expressions.index.get(name)
+        if row == self.current or (name is not None and row is None):
+            return None
+        self.previous = self.current
+        self.current = row
+        self.start = now
+        fade_row = row if row is not None else self.previous
+        self.fade = float(self.expressions.fades[fade_row]) if fade_row is not None else 0.0
+        self.transitions += 1
+        return self.fade
+
+    def play_motion(self, group, index, now):
+        """
+        播放动作组 group 中的第 index 个动作，返回动作时长；没有该动作时返回 None
+        """
+        clips = self.motions.get(group, [])
+        if not 0 <= index < len(clips) or self.model is None:
+            return None
+        clip = clips[index]
+        self.motion = (clip, now, ParameterTargets(clip.ids, self.model, self.driven_ids))
+        return clip.duration
+
+    def weights(self, now):
+        """
+        当前参与合成的 [(表情行号, 权重)]
+        """
+        t = 1.0 if self.fade <= 0 else min(1.0, (now - self.start) / self.fade)
+        if t >= 1.0:
+            self.previous = None
+        result = []
+        if self.current is not None:
+            result.append((self.current, t))
+        if self.previous is not None:
+            result.append((self.previous, 1.0 - t))
+        return result
+
+    def evaluate(self, now):
+        """
+        合成参与的表情，结果在 add / mul / over / over_weight 中（over 为加权后的覆盖目标值）
+        """
+        e = self.expressions
+        self.add.fill(0.0)
+        self.mul.fill(1.0)
+        self.over.fill(0.0)
+        self.over_weight.fill(0.0)
+        for row, weight in self.weights(now):
+            self.add += e.add[row] * weight
+            self.mul *= 1.0 + (e.mul[row] - 1.0) * weight
+            self.over += e.over[row] * e.over_mask[row] * weight
+            self.over_weight += e.over_mask[row] * weight
+        np.divide(self.over, self.over_weight, out=self.over, where=self.over_weight > 0)
+
+    def apply(self, values, now):
+        """
+        在驱动参数的渲染值上合成表情和动作并返回合成后的值（不修改 values），
+        其余参数直接写入模型；乘法混合只作用于驱动参数，其余参数的当前值由 live2d 管理，无法读取
+        """
+        if self.targets is None or (self.current is None and self.previous is None and self.motion is None):
+            return values
+        out = self.values
+        np.copyto(out, values)
+        if self.current is not None or self.previous is not None:
+            self.evaluate(now)
+            targets = self.targets
+            cols, slots = targets.driven_cols, targets.driven_slots
+            if cols.size:
+                blended = (out[slots] + self.add[cols]) * self.mul[cols]
+                out[slots] = blended + (self.over[cols] - blended) * self.over_weight[cols]
+            add, over, over_weight = self.add.tolist(), self.over.tolist(), self.over_weight.tolist()
+            for key, col in targets.model_bindings:
+                if over_weight[col] > 0:
+                    targets.set_value(key, over[col], over_weight[col])
+                if add[col] and targets.add_value is not None:
+                    targets.add_value(key, add[col])
+        if self.motion is not None:
+            clip, start, targets = self.motion
+            t = now - start
+            if not clip.loop and t >= clip.duration:
+                self.motion = None
+                return out
+            weight = clip.weight(t)
+            curve = clip.evaluate(t)
+            cols, slots = targets.driven_cols, targets.driven_slots
+            if cols.size:
+                out[slots] += (curve[cols] - out[slots]) * weight
+            curve = curve.tolist()
+            for key, col in targets.model_bindings:
+                targets.set_value(key, curve[col], weight)
+        return out
+
+
+class CursorTracker:
+    """
+    光标输入阶段：合并重复采样，保存带时间戳的短历史，
+    并按估计的速度外推到预计的画面呈现时间，减少头部跟随的滞后
+    """
+
+    def __init__(self):
+        self.history = deque(maxlen=CURSOR_HISTORY)  # (时间, x, y)，全局坐标
+        self.last_change = None     # 最近一次位置变化的时间
+        self.pending_change = None  # 尚未反映到模型参数上的最早一次变化时间
+        self.latency = deque(maxlen=256)  # 光标到参数的延迟（毫秒）
+
+    def push(self, x, y, t):
+        """
+        记录一次光标位置，位置没有变化时合并掉，返回是否移动
+        """
+        if self.history and self.history[-1][1] == x and self.history[-1][2] == y:
+            return False
+        self.history.append((t, x, y))
+        self.last_change = t
+        if self.pending_change is None:
+            self.pending_change = t
+        return True
+
+    def velocity(self, now):
+        """
+        用最近一段时间窗口内的首尾采样估计速度（像素/秒），光标停下后为 0
+        """
+        if len(self.history) < 2 or now - self.last_change > CURSOR_STOP_TIME:
+            return 0.0, 0.0
+        t1, x1, y1 = self.history[-1]
+        t0, x0, y0 = t1, x1, y1
+        for t, x, y in reversed(self.history):
+            if t1 - t > VELOCITY_WINDOW:
+                break
+            t0, x0, y0 = t, x, y
+        if t1 <= t0:
+            return 0.0, 0.0
+        return (x1 - x0) / (t1 - t0), (y1 - y0) / (t1 - t0)
+
+    def predict(self, now, present_time):
+        """
+        外推光标在 present_time 时刻的位置
+        """
+        if not self.history:
+            return None
+        t, x, y = self.history[-1]
+        vx, vy = self.velocity(now)
+        lead = min(max(present_time - t, 0.0), MAX_PREDICTION)
+        return x + vx * lead, y + vy * lead
+
+    def consumed(self, now):
+        """
+        模型参数已经使用了最新的光标位置，记录光标到参数的延迟
+        """
+        if self.pending_change is not None:
+            self.latency.append((now - self.pending_change) * 1000.0)
+            self.pending_change = None
+
+    def latency_stats(self):
+        """
+        光标到参数的延迟统计（毫秒）
+        """
+        samples = sorted(self.latency)
+        if not samples:
+            return {'count': 0}
+        return {
+            'count': len(samples),
+            'mean': sum(samples) / len(samples),
+            'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            'max': samples[-1],
+        }
+
+
+class DirtyTracker:
+    """
+    跟踪驱动参数的变化，决定本帧是否需要重新执行模型更新和绘制
+    物理输入参数变化后的一段时间内头发仍在摆动，这段时间内也视为有变化
+    """
+
+    def __init__(self, param_ids, physics_inputs=(), epsilon=DIRTY_EPSILON, physics_settle=PHYSICS_SETTLE):
+        self.param_ids = list(param_ids)
+        self.set_physics_inputs(physics_inputs)
+        self.epsilon = epsilon
+        self.physics_settle = physics_settle
+        self.last = None          # 上一次真正绘制时的参数值
+        self.force_next = True    # 下一帧强制重绘
+        self.forced_until = 0.0   # 在此时间之前强制重绘（如表情过渡）
+        self.physics_until = 0.0  # 在此时间之前物理仍在收敛
+        self.physics_changed = -physics_settle  # 物理输入最近一次变化的时间
+        self.physics_lod = None   # 可选的 PhysicsLOD，物理收敛阶段按它降低更新频率
+        self.rendered_frames = 0
+        self.skipped_frames = 0
+
+    def set_physics_inputs(self, physics_inputs):
+        """
+        设置驱动物理的输入参数（来自 physics3.json）
+        """
+        self.physics_inputs = set(physics_inputs)
+        self.physics_mask = np.array([pid in physics_inputs for pid in self.param_ids], dtype=bool)
+
+    def invalidate(self, duration=0.0, now=None):
+        """
+        强制重绘，duration 为需要持续重绘的时间（秒）
+        """
+        now = time.perf_counter() if now is None else now
+        self.force_next = True
+        self.forced_until = max(self.forced_until, now + duration)
+
+    def physics_input_changed(self, now):
+        """
+        物理输入在参数比较之外被改变（例如外部设置的参数），之后的一段时间内物理仍在收敛
+        """
+        self.physics_changed = now
+        self.physics_until = now + self.physics_settle
+
+    def pending(self, now):
+        """
+        物理或强制重绘是否仍未结束
+        """
+        return now < self.physics_until or now < self.forced_until
+
+    def check(self, values, now):
+        """
+        判断本帧参数相对上次绘制是否有超过阈值的变化
+        """
+        if self.last is None:
+            self.last = values.copy()
+            self.force_next = True
+        changed = np.abs(values - self.last) > self.epsilon
+        if np.any(changed & self.physics_mask):
+            self.physics_changed = now
+            self.physics_until = now + self.physics_settle
+        dirty = self.force_next or bool(changed.any()) or now < self.forced_until
+        if not dirty and now < self.physics_until:
+            # 只剩头发物理在收敛
+            dirty = self.physics_lod is None or self.physics_lod.due(now, now - self.physics_changed)
+        elif self.physics_lod is not None:
+            self.physics_lod.leave()
+        if dirty:
+            np.copyto(self.last, values)
+            self.force_next = False
+        return dirty
+
+    def stats(self):
+        """
+        跳过帧与实际绘制帧的统计
+        """
+        total = self.rendered_frames + self.skipped_frames
+        return {
+            'rendered_frames': self.rendered_frames,
+            'skipped_frames': self.skipped_frames,
+            'skip_ratio': self.skipped_frames / total if total else 0.0,
+        }
+
+
+class PhysicsLOD:
+    """
+    物理细节层次：物理输入（ParamAngleX/ParamAngleZ 等）停止变化后头发摆动逐渐衰减，
+    先保持全速，然后依次降低 model.Update() 的频率，收敛后冻结（由 DirtyTracker 停止重绘）；
+    宠物在屏幕上很小时直接使用较低的频率并提前冻结。输入重新变化时 DirtyTracker 立即恢复全速，
+    live2d 按真实经过的时间推进物理，降频期间摆动的幅度和相位不变，只是更新得更稀
+    """
+
+    def __init__(self, max_fps=MAX_FPS, settle=PHYSICS_SETTLE, full_time=PHYSICS_FULL_TIME, rates=PHYSICS_LOD_FPS,
+                 small_side=PHYSICS_SMALL_SIDE, small_settle=PHYSICS_SMALL_SETTLE):
+        self.max_fps = max_fps
+        self.settle = settle
+        self.full_time = full_time
+        self.rates = rates
+        self.small_side = small_side
+        self.small_settle = small_settle
+        self.small = False
+        self.last_update = None
+        self.last_check = None
+        self.updates = 0               # 物理收敛阶段实际执行的模型更新次数
+        self.full_rate_updates = 0.0   # 同一时间内全速运行需要的更新次数
+        self.update_ms = deque(maxlen=120)  # 最近的 model.Update() 耗时
+
+    def set_screen_size(self, width, height):
+        """
+        画布在屏幕上的尺寸（设备像素）
+        """
+        self.small = max(width, height) < self.small_side
+
+    def settle_time(self):
+        return self.small_settle if self.small else self.settle
+
+    def rate(self, since_change):
+        """
+        物理输入最近一次变化 since_change 秒后需要的更新频率，0 表示已经收敛
+        """
+        settle = self.settle_time()
+        if since_change >= settle:
+            return 0.0
+        if since_change < self.full_time:
+            return self.rates[0] if self.small else self.max_fps
+        if self.small:
+            return self.rates[-1]
+        stage = int((since_change - self.full_time) / max(settle - self.full_time, 1e-6) * len(self.rates))
+        return self.rates[min(stage, len(self.rates) - 1)]
+
+    def due(self, now, since_change):
+        """
+        只剩物理在收敛时，本帧是否需要执行模型更新
+        """
+        if self.last_check is not None:
+            self.full_rate_updates += (now - self.last_check) * self.max_fps
+        self.last_check = now
+        rate = self.rate(since_change)
+        if rate <= 0:
+            return False
+        if rate < self.max_fps and self.last_update is not None and now - self.last_update < 1.0 / rate - 1e-3:
+            return False
+        self.last_update = now
+        self.updates += 1
+        return True
+
+    def leave(self):
+        """
+        离开物理收敛阶段（参数在变化或已经静止）
+        """
+        self.last_check = None
+
+    def note_update(self, ms):
+        self.update_ms.append(ms)
+
+    def stats(self, frames=0):
+        """
+        物理收敛阶段省下的模型更新次数和时间
+        """
+        update_ms = sum(self.update_ms) / len(self.update_ms) if self.update_ms else 0.0
+        saved = max(0.0, self.full_rate_updates - self.updates)
+        return {
+            'small': self.small,
+            'settle_updates': self.updates,
+            'full_rate_updates': self.full_rate_updates,
+            'saved_updates': saved,
+            'update_ms_mean': update_ms,
+            'saved_ms': saved * update_ms,
+            'saved_ms_per_frame': saved * update_ms / frames if frames else 0.0,
+        }
+
+
+def pick_texture_tier(width, height, ratio=1.0, tiers=TEXTURE_TIERS):
+    """
+    选出能覆盖窗口在屏幕上实际像素尺寸的最小纹理档位
+    """
+    needed = max(width, height) * ratio
+    for tier in tiers:
+        if tier >= needed:
+            return tier
+    return tiers[-1]
+
+
+class TextureTierCache:
+    """
+    纹理分辨率档位的磁盘缓存
+    按源纹理内容的哈希保存降采样后的纹理，以及引用这些纹理的 model3.json，
+    某个档位第一次被用到时才生成
+    """
+
+    def __init__(self, model_json_path=MODEL_JSON_PATH, cache_dir=TEXTURE_CACHE_DIR, bundle=None):
+        self.model_json_path = model_json_path
+        self.model_home = os.path.dirname(os.path.abspath(model_json_path))
+        self.cache_dir = cache_dir
+        self.bundle = bundle  # 有效的模型包可以直接提供纹理哈希和尺寸，不必读取并哈希纹理文件
+
+    def variant(self, tier):
+        """
+        返回 (要加载的 model3.json 路径, 实际纹理边长, 源纹理边长)
+        档位不小于源纹理或无法生成缓存时返回原始模型
+        """
+        setting, sources = self._sources()
+        if not sources:
+            return self.model_json_path, 0, 0
+        source_size = max(side for _, side, _ in sources)
+        if tier >= source_size:
+            return self.model_json_path, source_size, source_size
+
+        key = hashlib.sha1(''.join(digest for digest, _, _ in sources).encode()).hexdigest()[:16]
+        variant_path = os.path.join(self.cache_dir, f"{key}_{tier}.model3.json")
+        tier_names = [f"{digest}_{tier}.png" for digest, _, _ in sources]
+        try:
+            # 模型和缓存目录不在同一个驱动器上时无法用相对路径引用其余文件（relpath 抛出 ValueError），
+            # 这时不生成任何缓存，直接加载原始模型
+            variant = self._variant_setting(setting, tier_names)
+            if self._variant_current(variant, tier_names, variant_path):
+                return variant_path, tier, source_size
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for digest, _, load_image in sources:
+                self._write_tier(load_image, digest, tier)
+            self._write_model_json(variant, variant_path)
+        except (OSError, ValueError) as e:
+            print(f"生成纹理缓存失败: {e}")
+            return self.model_json_path, source_size, source_size
+        return variant_path, tier, source_size
+
+    def _sources(self):
+        """
+        返回 (model3.json 内容, [(纹理哈希, 边长, 解码函数)])
+        """
+        if self.bundle is not None:
+            sources = [(texture['sha1'][:16], max(texture['width'], texture['height']),
+                        lambda name=texture['name']: QImage(os.path.join(self.model_home, name)))
+                       for texture in self.bundle.textures]
+            return self.bundle.setting, sources
+
+        with open(self.model_json_path, 'r', encoding='utf-8') as f:
+            setting = json.load(f)
+        sources = []
+        for name in setting.get('FileReferences', {}).get('Textures', []):
+            with open(os.path.join(self.model_home, name), 'rb') as f:
+                data = f.read()
+            sources.append((hashlib.sha1(data).hexdigest()[:16], self._image_side(data),
+                            lambda data=data: QImage.fromData(data)))
+        return setting, sources
+
+    @staticmethod
+    def _image_side(data):
+        """
+        只读取图片头得到边长，不解码像素
+        """
+        buffer = QBuffer()
+        buffer.setData(QByteArray(data))
+        size = QImageReader(buffer).size()
+        return max(size.width(), size.height())
+
+    def _write_tier(self, load_image, digest, tier):
+        """
+        在预乘 alpha 空间中降采样，避免透明边缘出现色边；
+        保存时还原为非预乘，因为 live2d 加载纹理时会自行预乘
+        """
+        name = f"{digest}_{tier}.png"
+        path = os.path.join(self.cache_dir, name)
+        if os.path.exists(path):
+            return name
+        image = load_image().convertToFormat(QImage.Format_ARGB32_Premultiplied)
+        if image.isNull():
+            raise ValueError("无法解码纹理")
+        scaled = image.scaled(tier, tier, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        tmp_path = path + '.tmp'
+        if not scaled.convertToFormat(QImage.Format_ARGB32).save(tmp_path, 'PNG'):
+            raise OSError(f"无法写入 {tmp_path}")
+        os.replace(tmp_path, path)
+        return name
+
+    def _variant_current(self, variant, tier_names, variant_path):
+        """
+        已有的 model3.json 是否仍然可用：其余文件按相对路径指向生成时的模型目录，
+        模型目录移动后（例如打包程序每次启动解压到新的临时目录）需要重新生成
+        """
+        try:
+            with open(variant_path, 'r', encoding='utf-8') as f:
+                existing = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if existing != variant:
+            return False
+        return all(os.path.exists(os.path.join(self.cache_dir, name)) for name in tier_names)
+
+    def _write_model_json(self, variant, variant_path):
+        """
+        写入引用降采样纹理的 model3.json（内容由 _variant_setting 生成）
+        """
+        tmp_path = variant_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(variant, f, ensure_ascii=False, indent='\t')
+        os.replace(tmp_path, variant_path)
+
+    def _variant_setting(self, setting, tier_names):
+        """
+        引用降采样纹理的 model3.json 内容，其余文件仍指向当前的原模型目录
+        """
+        def rebase(name):
+            return os.path.relpath(os.path.join(self.model_home, name), self.cache_dir).replace(os.sep, '/')
+
+        refs = dict(setting.get('FileReferences', {}))
+        for key in ('Moc', 'Physics', 'Pose', 'DisplayInfo', 'UserData'):
+            if refs.get(key):
+                refs[key] = rebase(refs[key])
+        refs['Textures'] = tier_names
+        if refs.get('Expressions'):
+            refs['Expressions'] = [dict(item, File=rebase(item['File'])) for item in refs['Expressions']]
+        if refs.get('Motions'):
+            refs['Motions'] = {
+                group: [dict(item, **{key: rebase(item[key]) for key in ('File', 'Sound') if item.get(key)})
+                        for item in items]
+                for group, items in refs['Motions'].items()
+            }
+        return dict(setting, FileReferences=refs)
+
+
+BUNDLE_MAGIC = b'DPBUNDLE'
+BUNDLE_VERSION = 2
+BUNDLE_HEADER = struct.Struct('<8sII')  # 魔数、版本、元数据长度
+
+
+def model_source_files(model_json_path, setting):
+    """
+    模型包依赖的源文件（相对模型目录的路径），用于判断模型包是否过期
+    """
+    refs = setting.get('FileReferences', {})
+    names = [os.path.basename(model_json_path)]
+    names += [refs[key] for key in ('Moc', 'Physics', 'DisplayInfo') if refs.get(key)]
+    return names + list(refs.get('Textures', []))
+
+
+def build_model_bundle(model_json_path=MODEL_JSON_PATH, bundle_path=BUNDLE_PATH):
+    """
+    把加载时需要解析的元数据预先整理成一个文件：model3.json 内容、cdi3.json 的参数ID、
+    physics3.json 的输入参数，以及纹理的哈希和尺寸（选择和查找纹理档位用）
+    moc 和纹理仍由 live2d 从模型文件加载，不放进模型包
+    返回写入的字节数
+    """
+    home = os.path.dirname(os.path.abspath(model_json_path))
+    with open(model_json_path, 'r', encoding='utf-8') as f:
+        setting = json.load(f)
+    refs = setting.get('FileReferences', {})
+
+    textures = []
+    for name in refs.get('Textures', []):
+        with open(os.path.join(home, name), 'rb') as f:
+            data = f.read()
+        buffer = QBuffer()
+        buffer.setData(QByteArray(data))
+        size = QImageReader(buffer).size()
+        if not size.isValid():
+            raise ValueError(f"无法读取纹理 {name}")
+        textures.append({'name': name, 'sha1': hashlib.sha1(data).hexdigest(),
+                         'width': size.width(), 'height': size.height()})
+
+    sources = {}
+    for name in model_source_files(model_json_path, setting):
+        st = os.stat(os.path.join(home, name))
+        sources[name] = [st.st_size, st.st_mtime_ns]
+
+    header = {
+        'setting': setting,
+        'param_ids': load_parameter_ids(os.path.join(home, refs['DisplayInfo'])) if refs.get('DisplayInfo') else [],
+        'physics_inputs': sorted(load_physics_inputs(os.path.join(home, refs['Physics'])))
+        if refs.get('Physics') else [],
+        'sources': sources,
+        'textures': textures,
+    }
+    encoded = json.dumps(header, ensure_ascii=False).encode('utf-8')
+
+    tmp_path = bundle_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(encoded)))
+        f.write(encoded)
+        size = f.tell()
+    os.replace(tmp_path, bundle_path)
+    return size
+
+
+class ModelBundle:
+    """
+    预编译模型包：打开时一次读入并解析全部元数据
+    """
+
+    def __init__(self, bundle_path):
+        self.path = bundle_path
+        with open(bundle_path, 'rb') as f:
+            data = f.read()
+        magic, version, header_len = BUNDLE_HEADER.unpack_from(data, 0)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError("不是模型包文件")
+        if version != BUNDLE_VERSION:
+            raise ValueError(f"模型包版本 {version} 与程序版本 {BUNDLE_VERSION} 不一致")
+        start = BUNDLE_HEADER.size
+        header = json.loads(data[start:start + header_len].decode('utf-8'))
+        self.setting = header['setting']
+        self.param_ids = header['param_ids']
+        self.physics_inputs = set(header['physics_inputs'])
+        self.sources = header['sources']
+        self.textures = header['textures']
+
+    def stale_reason(self, model_home):
+        """
+        模型包与目录中的源文件不一致时返回原因，一致时返回 None
+        打包后的程序（PyInstaller）每次启动都会重新解压文件，修改时间不可靠，只比较大小
+        """
+        check_mtime = not getattr(sys, 'frozen', False)
+        for name, (size, mtime_ns) in self.sources.items():
+            try:
+                st = os.stat(os.path.join(model_home, name))
+            except OSError:
+                return f"缺少 {name}"
+            if st.st_size != size or (check_mtime and st.st_mtime_ns != mtime_ns):
+                return f"{name} 已修改"
+        return None
+
+
+def open_model_bundle(bundle_path=BUNDLE_PATH, model_json_path=MODEL_JSON_PATH):
+    """
+    打开模型包，不存在、损坏或过期时返回 None，调用方改为读取零散的模型文件
+    """
+    if not bundle_path or not os.path.exists(bundle_path):
+        return None
+    try:
+        bundle = ModelBundle(bundle_path)
+    except (OSError, ValueError, KeyError, struct.error) as e:
+        print(f"模型包无效，改为读取模型文件: {e}")
+        return None
+    reason = bundle.stale_reason(os.path.dirname(os.path.abspath(model_json_path)))
+    if reason is not None:
+        print(f"模型包已过期（{reason}），改为读取模型文件")
+        return None
+    return bundle
+
+
+class ModelData:
+    """
+    后台线程准备好的模型数据
+    """
+
+    def __init__(self, model_json_path, generation=0):
+        self.model_json_path = model_json_path
+        self.generation = generation  # 加载序号，用于丢弃过期的加载结果
+        self.texture_tier = 0         # 实际使用的纹理边长
+        self.source_texture_size = 0  # 源纹理边长
+        self.param_ids = []         # cdi3.json 中声明的参数ID
+        self.physics_inputs = set()  # 驱动物理的输入参数ID
+        self.expressions = ExpressionSet()  # 预先整理好的表情
+        self.motions = {}           # 预先采样的动作 {组名: [MotionClip, ...]}
+        self.source = 'files'       # 元数据来源：'bundle' 或 'files'
+        self.file_bytes = 0         # 读取的文件总大小
+        self.timings = {}           # 各阶段耗时（毫秒）
+        self.error = None
+
+
+class ModelLoader(QObject):
+    """
+    分阶段加载模型的后台部分：在工作线程中读取模型引用的所有文件并解析元数据，
+    完成后通过信号把 ModelData 送回 GUI 线程，GL 相关的部分由 Live2DWidget 在 GL 线程中完成
+    """
+    loaded = pyqtSignal(object)
+
+    def __init__(self, model_json_path=MODEL_JSON_PATH, tier=TEXTURE_TIERS[-1], generation=0, parent=None,
+                 bundle_path=BUNDLE_PATH):
+        super().__init__(parent)
+        self.model_json_path = model_json_path
+        self.bundle_path = bundle_path
+        self.tier = tier
+        self.generation = generation
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='model-loader', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        data = ModelData(self.model_json_path, self.generation)
+        try:
+            # 优先使用预编译的模型包，省去 cdi3/physics3 的解析和纹理文件的哈希；
+            # moc 和纹理仍由 live2d 在 GL 线程中从模型文件加载
+            start = time.perf_counter()
+            bundle = open_model_bundle(self.bundle_path, self.model_json_path)
+            data.timings['open_bundle_ms'] = (time.perf_counter() - start) * 1000.0
+
+            # 选择纹理档位，缺少的档位在这里生成（解码和降采样都在工作线程中）
+            start = time.perf_counter()
+            data.model_json_path, data.texture_tier, data.source_texture_size = \
+                TextureTierCache(self.model_json_path, bundle=bundle).variant(self.tier)
+            data.timings['texture_tier_ms'] = (time.perf_counter() - start) * 1000.0
+
+            start = time.perf_counter()
+            home = os.path.dirname(data.model_json_path)
+            with open(data.model_json_path, 'r', encoding='utf-8') as f:
+                refs = json.load(f).get('FileReferences', {})
+            paths = [refs.get('Moc'), refs.get('Physics'), refs.get('DisplayInfo')] + list(refs.get('Textures', []))
+            # 预先读取所有引用的文件，使之后 GL 线程中的加载只命中内存中的页缓存
+            for name in paths:
+                if name:
+                    with open(os.path.join(home, name), 'rb') as f:
+                        data.file_bytes += len(f.read())
+            mid = time.perf_counter()
+            data.timings['read_files_ms'] = (mid - start) * 1000.0
+
+            if bundle is not None:
+                data.source = 'bundle'
+                data.param_ids = bundle.param_ids
+                data.physics_inputs = bundle.physics_inputs
+            else:
+                if refs.get('DisplayInfo'):
+                    data.param_ids = load_parameter_ids(os.path.join(home, refs['DisplayInfo']))
+                if refs.get('Physics'):
+                    data.physics_inputs = load_physics_inputs(os.path.join(home, refs['Physics']))
+            data.expressions = ExpressionSet.load(home, refs.get('Expressions', []))
+            data.motions = load_motions(home, refs.get('Motions', {}))
+            data.timings['parse_metadata_ms'] = (time.perf_counter() - mid) * 1000.0
+        except (OSError, ValueError) as e:
+            data.error = e
+        except Exception as e:
+            # 模型文件结构不对（缺少字段、类型错误）等意外错误也要送回 GUI 线程，否则占位画面会一直显示
+            print(f"加载模型数据失败: {e!r}")
+            traceback.print_exc()
+            data.error = e
+        self.loaded.emit(data)
+
+
+class LeavingAnimation:
+    """
+    解码好的离开动画：所有帧（预乘 alpha 的 QImage，绘制时由 Qt 的 GL 绘制引擎按图像缓存为纹理）和每帧的显示时长
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.frames = []
+        self.delays_ms = []
+        self.ends_ms = []  # 每帧结束的时间点，用于按经过时间查找当前帧
+        self.error = None
+        self.decode_ms = 0.0
+
+    def append(self, image, delay_ms):
+        if delay_ms <= 10:
+            delay_ms = LEAVING_DEFAULT_DELAY_MS
+        self.frames.append(image.convertToFormat(QImage.Format_ARGB32_Premultiplied))
+        self.delays_ms.append(delay_ms)
+        self.ends_ms.append((self.ends_ms[-1] if self.ends_ms else 0) + delay_ms)
+
+    def duration_ms(self):
+        return self.ends_ms[-1] if self.ends_ms else 0
+
+    def frame_index(self, elapsed_ms):
+        """
+        经过 elapsed_ms 毫秒时应显示的帧，播放结束后停在最后一帧
+        """
+        return min(bisect.bisect_right(self.ends_ms, elapsed_ms), len(self.frames) - 1)
+
+    def next_change_ms(self, elapsed_ms):
+        """
+        距离下一次换帧（或播放结束）的毫秒数
+        """
+        return max(0, self.ends_ms[self.frame_index(elapsed_ms)] - elapsed_ms)
+
+    def aspect(self):
+        size = self.frames[0].size()
+        return size.width() / size.height() if size.height() > 0 else 1.0
+
+    def memory_bytes(self):
+        return sum(frame.sizeInBytes() for frame in self.frames)
+
+
+def decode_leaving_animation(path=LEAVING_GIF_PATH, max_height=LEAVING_MAX_HEIGHT):
+    """
+    解码 GIF 的所有帧（可以在工作线程中调用）
+    """
+    start = time.perf_counter()
+    animation = LeavingAnimation(path)
+    reader = QImageReader(path)
+    size = reader.size()
+    if size.isValid() and size.height() > max_height:
+        reader.setScaledSize(size.scaled(size.width(), max_height, Qt.KeepAspectRatio))
+    while True:
+        image = reader.read()
+        if image.isNull():
+            break
+        animation.append(image, reader.nextImageDelay())
+    if not animation.frames:
+        animation.error = reader.errorString()
+    animation.decode_ms = (time.perf_counter() - start) * 1000.0
+    return animation
+
+
+class LeavingAnimationLoader(QObject):
+    """
+    在工作线程中预先解码离开动画，完成后通过信号把 LeavingAnimation 送回 GUI 线程
+    """
+    loaded = pyqtSignal(object)
+
+    def __init__(self, path=LEAVING_GIF_PATH, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='leaving-loader', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        self.loaded.emit(decode_leaving_animation(self.path))
+
+
+class GLShareGroup:
+    """
+    管理所有宠物窗口的 OpenGL 上下文共享
+    启用 Qt 的全局共享上下文后，各窗口的 QOpenGLWidget 处于同一个 share group，
+    纹理等 GPU 资源可以跨窗口使用；live2d 的全局初始化和释放也在这里按窗口计数
+    """
+
+    def __init__(self):
+        self.widgets = set()
+        self.live2d_ready = False
+
+    @staticmethod
+    def enable():
+        """
+        必须在创建 QApplication 之前调用
+        """
+        QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+
+    def group_key(self, widget):
+        """
+        资源共享的范围：处于全局 share group 的上下文共用同一个键，否则每个上下文独立
+        """
+        context = widget.context()
+        share = QOpenGLContext.globalShareContext()
+        if context is None or (share is not None and QOpenGLContext.areSharing(context, share)):
+            return 'global'
+        return id(context)
+
+    def attach(self, widget):
+        """
+        在 widget 的 initializeGL 中调用：初始化当前上下文的 GL 函数，live2d 只初始化一次
+        """
+        live2d.glInit()
+        if not self.live2d_ready:
+            live2d.init()
+            self.live2d_ready = True
+        self.widgets.add(widget)
+
+    def detach(self, widget):
+        """
+        窗口关闭时调用，最后一个窗口关闭后才释放 live2d
+        """
+        self.widgets.discard(widget)
+        if not self.widgets and self.live2d_ready:
+            live2d.dispose()
+            self.live2d_ready = False
+
+
+class ModelResource:
+    """
+    注册表中的一个常驻模型（含其纹理）
+    """
+
+    def __init__(self, key, model, texture_bytes):
+        self.key = key
+        self.model = model
+        self.texture_bytes = texture_bytes
+        self.refs = 1
+        self.size = None  # 最近一次 Resize 的尺寸
+
+    def resize(self, width, height):
+        """
+        多个窗口共用模型时尺寸可能不同，绘制前按当前窗口调整，尺寸没变时不做任何操作
+        返回是否真正调用了 Resize
+        """
+        if self.size == (width, height):
+            return False
+        self.size = (width, height)
+        self.model.Resize(width, height)
+        return True
+
+
+class ModelRegistry:
+    """
+    按 (model3.json 路径, share group) 引用计数的模型资源表
+    同一个模型在共享上下文的窗口中只加载一次，纹理只上传一次；引用全部释放后才删除模型
+    """
+
+    def __init__(self):
+        self.resources = {}
+        self.loads = 0
+        self.reuses = 0
+
+    def acquire(self, key, create, texture_bytes=0):
+        """
+        取得常驻模型，不存在时调用 create() 在当前 GL 上下文中加载
+        """
+        resource = self.resources.get(key)
+        if resource is not None:
+            resource.refs += 1
+            self.reuses += 1
+            return resource
+        resource = ModelResource(key, create(), texture_bytes)
+        self.resources[key] = resource
+        self.loads += 1
+        return resource
+
+    def release(self, resource):
+        """
+        释放一个引用，调用时应使 GL 上下文处于当前状态，以便最后一个引用释放时删除纹理
+        """
+        resource.refs -= 1
+        if resource.refs <= 0:
+            self.resources.pop(resource.key, None)
+            resource.model = None
+
+    def stats(self):
+        return {
+            'resident_models': len(self.resources),
+            'resident_texture_bytes': sum(r.texture_bytes for r in self.resources.values()),
+            'refs': sum(r.refs for r in self.resources.values()),
+            'loads': self.loads,
+            'reuses': self.reuses,
+        }
+
+
+GL_SHARE = GLShareGroup()
+MODEL_REGISTRY = ModelRegistry()
+
+
+class HitMaskReader:
+    """
+    根据渲染结果的 alpha 生成降采样的命中掩码，用于只在宠物实际绘制的位置响应鼠标
+    先在 GPU 上把画面缩小到 1/HIT_MASK_SCALE，再用像素缓冲对象（PBO）异步读回；
+    读回在 GPU 完成（栅栏信号）之后才映射，通常落后一两帧，CPU 不会等待 GPU
+    """
+
+    def __init__(self, scale=HIT_MASK_SCALE, threshold=HIT_ALPHA_THRESHOLD, slots=HIT_READBACK_SLOTS):
+        self.scale = scale
+        self.threshold = threshold
+        self.slots = slots
+        self.fbo = None          # 降采样用的帧缓冲
+        self.pbos = []           # [(缓冲ID, 字节数)]
+        self.next_slot = 0
+        self.pending = deque()   # 在途的读回：(槽位, 栅栏, 宽, 高, 代数)
+        self.mask = None         # 布尔数组 (行, 列)，第 0 行是窗口顶部
+        self.generation = 0      # 窗口在画布中的位置变化后，之前发出的读回作废
+        self.requests = 0
+        self.completed = 0
+        self.skipped = 0         # 在途读回已满而跳过的请求
+        self.request_ms = deque(maxlen=120)
+        self.map_ms = deque(maxlen=120)
+
+    def request(self, source_fbo, default_fbo):
+        """
+        在绘制完成后调用：把 source_fbo 的内容缩小并发起异步读回
+        """
+        if len(self.pending) >= self.slots:
+            self.skipped += 1
+            return
+        start = time.perf_counter()
+        width = max(1, -(-source_fbo.width() // self.scale))
+        height = max(1, -(-source_fbo.height() // self.scale))
+        if self.fbo is None or (self.fbo.width(), self.fbo.height()) != (width, height):
+            self.fbo = QOpenGLFramebufferObject(width, height)
+
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, source_fbo.handle())
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self.fbo.handle())
+        glBlitFramebuffer(0, 0, source_fbo.width(), source_fbo.height(), 0, 0, width, height,
+                          GL_COLOR_BUFFER_BIT, GL_LINEAR)
+
+        slot = self.next_slot
+        self.next_slot = (slot + 1) % self.slots
+        size = width * height * 4
+        while len(self.pbos) <= slot:
+            self.pbos.append((glGenBuffers(1), 0))
+        pbo, capacity = self.pbos[slot]
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        if capacity < size:
+            glBufferData(GL_PIXEL_PACK_BUFFER, size, None, GL_STREAM_READ)
+            self.pbos[slot] = (pbo, size)
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbo.handle())
+        glReadPixels(0, 0, width, height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, default_fbo)
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, default_fbo)
+        self.pending.append((slot, glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0), width, height, self.generation))
+        self.requests += 1
+        self.request_ms.append((time.perf_counter() - start) * 1000.0)
+
+    def poll(self):
+        """
+        取回已经完成的读回并更新掩码，返回掩码是否更新（需要 GL 上下文处于当前状态）
+        """
+        updated = False
+        while self.pending:
+            slot, fence, width, height, generation = self.pending[0]
+            if glClientWaitSync(fence, 0, 0) not in (GL_ALREADY_SIGNALED, GL_CONDITION_SATISFIED):
+                break
+            self.pending.popleft()
+            glDeleteSync(fence)
+            if generation != self.generation:
+                continue
+            start = time.perf_counter()
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pbos[slot][0])
+            address = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+            if address:
+                size = width * height * 4
+                pixels = ctypes.cast(address, ctypes.POINTER(ctypes.c_ubyte * size)).contents
+                alpha = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width, 4)[::-1, :, 3]
+                self.mask = self.dilate(alpha > self.threshold)
+                glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+                self.completed += 1
+                updated = True
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+            self.map_ms.append((time.perf_counter() - start) * 1000.0)
+        return updated
+
+    def dispose(self):
+        """
+        删除像素缓冲、降采样帧缓冲和在途读回的栅栏（需要 GL 上下文处于当前状态），之后可以重新使用
+        """
+        for _, fence, _, _, _ in self.pending:
+            glDeleteSync(fence)
+        self.pending.clear()
+        if self.pbos:
+            glDeleteBuffers(len(self.pbos), [pbo for pbo, _ in self.pbos])
+        self.pbos = []
+        self.next_slot = 0
+        self.fbo = None  # 上下文处于当前状态时释放，QOpenGLFramebufferObject 随之删除帧缓冲
+        self.mask = None
+
+    def reset(self):
+        """
+        丢弃当前掩码和在途读回的结果（窗口显示的区域变了）
+        """
+        self.generation += 1
+        self.mask = None
+
+    @staticmethod
+    def dilate(mask):
+        """
+        向四周扩张一格，弥补读回落后于画面的一两帧以及降采样丢失的细节
+        """
+        grown = mask.copy()
+        grown[1:] |= mask[:-1]
+        grown[:-1] |= mask[1:]
+        grown[:, 1:] |= grown[:, :-1].copy()
+        grown[:, :-1] |= grown[:, 1:].copy()
+        return grown
+
+    def contains(self, x, y, width, height):
+        """
+        窗口坐标 (x, y) 处是否绘制了宠物；还没有掩码时视为命中，保持原来整个窗口可点击的行为
+        """
+        if self.mask is None:
+            return True
+        if not (0 <= x < width and 0 <= y < height):
+            return False
+        rows, cols = self.mask.shape
+        return bool(self.mask[int(y * rows / height), int(x * cols / width)])
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'completed': self.completed,
+            'skipped': self.skipped,
+            'pending': len(self.pending),
+            'mask_size': None if self.mask is None else list(self.mask.shape[::-1]),
+            'coverage': None if self.mask is None else float(self.mask.mean()),
+            'request_ms': sum(self.request_ms) / len(self.request_ms) if self.request_ms else 0.0,
+            'map_ms': sum(self.map_ms) / len(self.map_ms) if self.map_ms else 0.0,
+        }
+
+
+class GPUFrameTimer:
+    """
+    用 GL 计时查询（GL_TIME_ELAPSED）测量模型绘制在 GPU 上的耗时，结果在之后的帧中非阻塞地取回；
+    驱动不支持计时查询时 available 为 False，只能使用 CPU 耗时
+    """
+
+    def __init__(self, slots=GPU_TIMER_SLOTS):
+        self.slots = slots
+        self.available = None    # 第一次使用时检测
+        self.queries = []
+        self.free = deque()
+        self.pending = deque()   # 在途的查询：(查询ID, 同一帧的 CPU 耗时)
+        self.active = None
+
+    def begin(self):
+        """
+        开始计时，在途查询已满（GPU 落后太多）或不支持时返回 False
+        """
+        if self.available is None:
+            try:
+                ids = glGenQueries(self.slots)
+                self.queries = [int(q) for q in np.atleast_1d(ids)] if ids is not None else []
+            except Exception:
+                self.queries = []
+            self.available = bool(self.queries)
+            self.free.extend(self.queries)
+        if not self.available or not self.free:
+            return False
+        self.active = self.free.popleft()
+        glBeginQuery(GL_TIME_ELAPSED, self.active)
+        return True
+
+    def end(self, cpu_ms):
+        glEndQuery(GL_TIME_ELAPSED)
+        self.pending.append((self.active, cpu_ms))
+        self.active = None
+
+    def poll(self):
+        """
+        取回已完成的查询，返回每帧的耗时（毫秒，GPU 和 CPU 中较长的一个）
+        """
+        results = []
+        while self.pending:
+            query, cpu_ms = self.pending[0]
+            if not glGetQueryObjectiv(query, GL_QUERY_RESULT_AVAILABLE):
+                break
+            self.pending.popleft()
+            results.append(max(cpu_ms, glGetQueryObjectui64v(query, GL_QUERY_RESULT) / 1e6))
+            self.free.append(query)
+        return results
+
+    def dispose(self):
+        """
+        删除查询对象（需要 GL 上下文处于当前状态）
+        """
+        if self.queries:
+            glDeleteQueries(len(self.queries), self.queries)
+        self.queries = []
+        self.free.clear()
+        self.pending.clear()
+        self.available = None
+
+
+class RenderScaler:
+    """
+    根据滚动的帧耗时选择离屏渲染的分辨率比例
+    平均耗时超过预算的 high 比例时降低一档；按像素数预估提高一档后仍低于预算的 low 比例时才提高一档；
+    两个阈值之间留出余量，且每次调整后清空样本并等待 cooldown 秒，避免来回切换
+    """
+
+    def __init__(self, min_scale=None, max_scale=None, step=RENDER_SCALE_STEP, budget_ms=1000.0 / MAX_FPS,
+                 high=RENDER_SCALE_HIGH, low=RENDER_SCALE_LOW, window=RENDER_SCALE_WINDOW,
+                 cooldown=RENDER_SCALE_COOLDOWN):
+        # 命令行参数会修改模块级的默认比例范围，因此在这里读取
+        self.min_scale = RENDER_SCALE_MIN if min_scale is None else min_scale
+        self.max_scale = RENDER_SCALE_MAX if max_scale is None else max_scale
+        self.step = step
+        self.budget_ms = budget_ms
+        self.high = high
+        self.low = low
+        self.cooldown = cooldown
+        self.scale = self.max_scale
+        self.samples = deque(maxlen=window)
+        self.last_change = None
+        self.changes = 0
+
+    def add_sample(self, ms, now):
+        """
+        记录一帧的耗时，分辨率比例变化时返回 True
+        """
+        self.samples.append(ms)
+        if len(self.samples) < self.samples.maxlen:
+            return False
+        if self.last_change is not None and now - self.last_change < self.cooldown:
+            return False
+        mean = sum(self.samples) / len(self.samples)
+        scale = self.scale
+        if mean > self.budget_ms * self.high and scale > self.min_scale:
+            scale = max(self.min_scale, scale - self.step)
+        elif scale < self.max_scale:
+            up = min(self.max_scale, scale + self.step)
+            if mean * (up / scale) ** 2 < self.budget_ms * self.low:
+                scale = up
+        if scale == self.scale:
+            return False
+        self.scale = round(scale, 3)
+        self.samples.clear()
+        self.last_change = now
+        self.changes += 1
+        return True
+
+    def stats(self):
+        return {
+            'scale': self.scale,
+            'range': (self.min_scale, self.max_scale),
+            'changes': self.changes,
+            'mean_frame_ms': sum(self.samples) / len(self.samples) if self.samples else None,
+        }
+
+
+class FrameProfiler:
+    """
+    热路径的分阶段耗时记录：每个阶段一个固定大小的环形缓冲（NumPy 数组），另有若干计数器
+    关闭时热路径上只有一次属性判断；分位数按缓冲中的最近 PROFILE_SAMPLES 个样本计算
+    """
+    PHASES = ('tick', 'update', 'push', 'draw', 'present', 'swap')
+    TICK, UPDATE, PUSH, DRAW, PRESENT, SWAP = range(len(PHASES))
+
+    def __init__(self, size=PROFILE_SAMPLES, enabled=False):
+        self.enabled = enabled
+        self.size = size
+        self.samples = np.zeros((len(self.PHASES), size))
+        self.counts = [0] * len(self.PHASES)    # 每个阶段累计写入的样本数
+        self.totals = [0.0] * len(self.PHASES)  # 每个阶段累计的总耗时（毫秒）
+        self.counters = {'ticks': 0, 'frames_rendered': 0, 'frames_skipped': 0, 'frames_swapped': 0}
+        self.paint_end = None  # 最近一次 paintGL 结束的时间，用于计算交换耗时
+
+    def record(self, phase, seconds):
+        count = self.counts[phase]
+        ms = seconds * 1000.0
+        self.samples[phase, count % self.size] = ms
+        self.counts[phase] = count + 1
+        self.totals[phase] += ms
+
+    def count(self, name):
+        self.counters[name] += 1
+
+    def clear(self):
+        self.counts = [0] * len(self.PHASES)
+        self.totals = [0.0] * len(self.PHASES)
+        self.counters = dict.fromkeys(self.counters, 0)
+        self.paint_end = None
+
+    def summary(self, quantiles=PROFILE_QUANTILES):
+        """
+        {阶段: {'count': 累计样本数, 'sum': 累计总耗时, 'window': 窗口内样本数, 分位数: 耗时}}，耗时为毫秒
+        count 和 sum 从开始记录起单调增加，分位数只按窗口内的最近样本计算
+        """
+        result = {}
+        for phase, name in enumerate(self.PHASES):
+            window = min(self.counts[phase], self.size)
+            values = self.samples[phase, :window]
+            entry = {'count': self.counts[phase], 'window': window, 'sum': self.totals[phase]}
+            if window:
+                for q, value in zip(quantiles, np.percentile(values, [q * 100 for q in quantiles])):
+                    entry[q] = float(value)
+            result[name] = entry
+        return result
+
+    def snapshot(self, quantiles=PROFILE_QUANTILES):
+        """
+        分位数和计数器的一致副本，必须在写入记录的 GUI 线程中生成
+        """
+        return {'phases': self.summary(quantiles), 'counters': dict(self.counters)}
+
+
+def render_metrics(sources, quantiles=PROFILE_QUANTILES):
+    """
+    把各窗口的帧耗时快照输出为 Prometheus 文本格式
+    sources: [(窗口标签, 快照)]，快照为 FrameProfiler.snapshot() 的结果加上 'gauges'（瞬时指标字典）
+    """
+    lines = ['# HELP deskpet_phase_ms Per-phase frame time (milliseconds), '
+             'quantiles over the last samples, sum and count cumulative.',
+             '# TYPE deskpet_phase_ms summary']
+    counter_lines = ['# HELP deskpet_events_total Frame and tick counters.', '# TYPE deskpet_events_total counter']
+    gauge_lines = {}
+    for label, snapshot in sources:
+        for name, entry in snapshot.get('phases', {}).items():
+            base = f'window="{label}",phase="{name}"'
+            for q in quantiles:
+                if q in entry:
+                    lines.append(f'deskpet_phase_ms{{{base},quantile="{q}"}} {entry[q]:.6f}')
+            lines.append(f'deskpet_phase_ms_sum{{{base}}} {entry["sum"]:.6f}')
+            lines.append(f'deskpet_phase_ms_count{{{base}}} {entry["count"]}')
+        for name, value in snapshot.get('counters', {}).items():
+            counter_lines.append(f'deskpet_events_total{{window="{label}",event="{name}"}} {value}')
+        for name, value in snapshot.get('gauges', {}).items():
+            gauge_lines.setdefault(name, []).append(f'deskpet_{name}{{window="{label}"}} {float(value):.6f}')
+    for name, values in gauge_lines.items():
+        counter_lines += [f'# TYPE deskpet_{name} gauge'] + values
+    return '\n'.join(lines + counter_lines) + '\n'
+
+
+def metric_sources(windows):
+    """
+    各宠物窗口最近一次在 GUI 线程中生成的指标快照，供 render_metrics 使用
+    """
+    return [(str(window.index), window.live2d_widget.metrics) for window in windows]
+
+
+def remove_stale_socket(path):
+    """
+    删除上次运行留下的 Unix 套接字文件；路径上是其他类型的文件时报错而不删除，避免写错路径时删掉用户数据
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"{path} 已存在且不是套接字文件")
+    os.unlink(path)
+
+
+class MetricsServer:
+    """
+    本地指标接口：在后台线程中以 HTTP 提供 /metrics（Prometheus 文本格式），
+    可以监听 127.0.0.1 的端口，或（非 Windows）监听 Unix 套接字
+    collect: 返回 render_metrics 所需 sources 的函数，在 GUI 线程之外调用，
+             只能读取 GUI 线程整体替换的快照（最多晚 PROFILE_SNAPSHOT_INTERVAL 秒），不能读取正在写入的环形缓冲
+    """
+
+    def __init__(self, collect, port=None, socket_path=None):
+        # 只有打开指标接口时才导入，不增加默认启动的导入时间
+        import socketserver
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        self.collect = collect
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = render_metrics(server.collect()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        if socket_path is not None:
+            remove_stale_socket(socket_path)
+
+            class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+                daemon_threads = True
+
+                def get_request(self):
+                    request, _ = super().get_request()
+                    return request, ('local', 0)
+
+            self.httpd = UnixHTTPServer(socket_path, Handler)
+            self.address = socket_path
+        else:
+            class LocalHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+                daemon_threads = True
+
+            self.httpd = LocalHTTPServer(('127.0.0.1', port or 0), Handler)
+            self.address = f'http://127.0.0.1:{self.httpd.server_address[1]}/metrics'
+        self.socket_path = socket_path
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class ControlInbox:
+    """
+    外部控制命令的收件箱：控制接口线程写入，GUI 线程每帧最多取走一次
+    同一参数的多次设置只保留最新值，表情和动作只保留最后一次，取走的开销与收到的消息数量无关
+    notify: 收件箱从空变为非空时（在写入线程中）调用一次，用来唤醒 GUI 线程
+    """
+
+    def __init__(self, notify=None):
+        self.notify = notify
+        self.lock = threading.Lock()
+        self.messages = 0  # 收到的命令数
+        self.batches = 0   # GUI 线程取走的次数
+        self.clear()
+
+    def clear(self):
+        self.params = {}          # 参数ID -> 值，None 表示释放该参数
+        self.release = False      # 先释放之前设置的全部参数
+        self.expression = None    # (表情名或 None,)
+        self.motion = None        # (动作组, 序号)
+        self.acks = []            # 命令生效后调用的回调
+        self.pending = False
+
+    @staticmethod
+    def parse(command):
+        """
+        检查一条命令，返回 (参数, 是否释放全部, 表情, 动作)，格式错误时抛出 ValueError
+        """
+        if not isinstance(command, dict):
+            raise ValueError('命令必须是 JSON 对象')
+        params = command.get('params') or {}
+        if not isinstance(params, dict):
+            raise ValueError('params 必须是 {参数ID: 值} 对象')
+        for pid, value in params.items():
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f'参数 {pid} 的值必须是数字或 null')
+        expression = None
+        if 'expression' in command:
+            if command['expression'] is not None and not isinstance(command['expression'], str):
+                raise ValueError('expression 必须是表情名或 null')
+            expression = (command['expression'],)
+        motion = command.get('motion')
+        if motion is not None:
+            if isinstance(motion, str):
+                motion = [motion, 0]
+            if (not isinstance(motion, list) or len(motion) != 2 or not isinstance(motion[0], str)
+                    or not isinstance(motion[1], int)):
+                raise ValueError('motion 必须是动作组名或 [动作组, 序号]')
+            motion = tuple(motion)
+        return params, bool(command.get('release')), expression, motion
+
+    def post(self, command, ack=None):
+        """
+        合并一条已经检查过的命令（parse 的返回值），ack 在命令生效的那一帧之后调用
+        """
+        params, release, expression, motion = command
+        with self.lock:
+            if release:
+                self.params.clear()
+                self.release = True
+            self.params.update(params)
+            if expression is not None:
+                self.expression = expression
+            if motion is not None:
+                self.motion = motion
+            if ack is not None:
+                self.acks.append(ack)
+            self.messages += 1
+            wake = not self.pending
+            self.pending = True
+        if wake and self.notify is not None:
+            self.notify()
+
+    def take(self):
+        """
+        取走合并后的全部命令，没有新命令时返回 None
+        """
+        with self.lock:
+            if not self.pending:
+                return None
+            taken = (self.params, self.release, self.expression, self.motion, self.acks)
+            self.batches += 1
+            self.clear()
+        return taken
+
+    def stats(self):
+        return {'messages': self.messages, 'batches': self.batches}
+
+
+class ParameterOverrides:
+    """
+    外部设置的参数值，每帧在表情合成之后覆盖：本程序驱动的参数直接替换渲染值，
+    其余参数在 model.Update() 之后写入模型；写入方式在参数集合或模型变化后才重新解析
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.targets = None
+        self.slot_values = None
+        self.model_values = []
+        self.out = None
+
+    def __bool__(self):
+        return bool(self.values)
+
+    def update(self, params, release=False):
+        if release:
+            self.values.clear()
+        for pid, value in params.items():
+            if value is None:
+                self.values.pop(pid, None)
+            else:
+                self.values[pid] = float(value)
+        self.targets = None
+
+    def unbind(self):
+        self.targets = None
+
+    def apply(self, values, model, driven_ids):
+        """
+        返回覆盖后的驱动参数值（不修改 values），并把其余参数写入模型
+        """
+        if self.targets is None:
+            ids = list(self.values)
+            self.targets = ParameterTargets(ids, model, driven_ids)
+            column = [self.values[pid] for pid in ids]
+            self.slot_values = np.array([column[col] for col in self.targets.driven_cols], dtype=np.float64)
+            self.model_values = [(key, column[col]) for key, col in self.targets.model_bindings]
+        if self.out is None or self.out.shape != values.shape:
+            self.out = np.empty_like(values)
+        np.copyto(self.out, values)
+        self.out[self.targets.driven_slots] = self.slot_values
+        set_value = self.targets.set_value
+        for key, value in self.model_values:
+            set_value(key, value, 1.0)
+        return self.out
+
+
+class ControlServer:
+    """
+    本地控制接口：在后台线程中运行 asyncio 服务器，监听 127.0.0.1 的端口或（非 Windows）Unix 套接字
+    每行一个 JSON 命令或命令数组：
+        {"pet": 0, "params": {"ParamAngleX": 10, "ParamMouthOpenY": null}, "release": false,
+         "expression": "名称" 或 null, "motion": ["组", 0], "id": 1}
+    pet 省略时发给所有宠物；带 id 的命令在生效的那一帧绘制之后回复 {"id": ..., "ok": true}，
+    宠物挂起（隐藏、锁屏）或还没有模型时不会绘制新帧，命令记下后立即回复 {"id": ..., "ok": true, "deferred": true}，
+    格式错误时立即回复 {"id": ..., "error": "..."}
+    inboxes: 各宠物的 ControlInbox，命令只写入收件箱，不在这个线程中访问 Qt 或模型
+    """
+
+    def __init__(self, inboxes, port=None, socket_path=None):
+        self.inboxes = list(inboxes)
+        self.socket_path = socket_path
+        # 只有打开控制接口时才导入，不增加默认启动的导入时间
+        import asyncio
+        self.asyncio = asyncio
+        if socket_path is not None:
+            remove_stale_socket(socket_path)
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        self.clients = 0
+        self.errors = 0
+        self.writers = set()  # 当前连接的客户端
+        if socket_path is not None:
+            start = asyncio.start_unix_server(self.handle, socket_path, limit=CONTROL_MAX_LINE)
+        else:
+            start = asyncio.start_server(self.handle, '127.0.0.1', port or 0, limit=CONTROL_MAX_LINE)
+        self.server = self.loop.run_until_complete(start)
+        if socket_path is not None:
+            self.address = socket_path
+        else:
+            self.address = '127.0.0.1:%d' % self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, name='control-server', daemon=True)
+        self.thread.start()
+
+    async def handle(self, reader, writer):
+        self.clients += 1
+        self.writers.add(writer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    self.reply(writer, None, error='消息过长')
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    self.dispatch(line, writer)
+        except ConnectionError:
+            pass
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+    def dispatch(self, line, writer):
+        """
+        解析一行命令并写入对应宠物的收件箱
+        """
+        try:
+            commands = json.loads(line)
+        except ValueError as e:
+            self.reply(writer, None, error=f'JSON 格式错误: {e}')
+            return
+        for command in commands if isinstance(commands, list) else [commands]:
+            msg_id = command.get('id') if isinstance(command, dict) else None
+            try:
+                parsed = ControlInbox.parse(command)
+                pet = command.get('pet')
+                if pet is None:
+                    inboxes = self.inboxes
+                elif isinstance(pet, int) and 0 <= pet < len(self.inboxes):
+                    inboxes = [self.inboxes[pet]]
+                else:
+                    raise ValueError(f'没有序号为 {pet} 的宠物')
+            except ValueError as e:
+                self.reply(writer, msg_id, error=str(e))
+                continue
+            # 发给多个宠物时，所有宠物都生效（或已确认暂时不会绘制）后才回复
+            state = {'remaining': len(inboxes), 'deferred': False}
+
+            def _ack(deferred=False, msg_id=msg_id, state=state):
+                state['deferred'] = state['deferred'] or deferred
+                state['remaining'] -= 1
+                if state['remaining'] == 0:
+                    self.loop.call_soon_threadsafe(self.reply, writer, msg_id, None, state['deferred'])
+            for inbox in inboxes:
+                inbox.post(parsed, _ack if msg_id is not None else None)
+
+    def reply(self, writer, msg_id, error=None, deferred=False):
+        if error is not None:
+            self.errors += 1
+            message = {'id': msg_id, 'error': error}
+        else:
+            message = {'id': msg_id, 'ok': True}
+            if deferred:
+                message['deferred'] = True
+        if not writer.is_closing():
+            writer.write(json.dumps(message, ensure_ascii=False).encode('utf-8') + b'\n')
+
+    async def shutdown(self):
+        # 关闭监听和所有客户端连接，之后停止事件循环
+        self.server.close()
+        for writer in list(self.writers):
+            writer.close()
+        asyncio = self.asyncio
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=1.0)
+        self.loop.stop()
+
+    def stop(self):
+        self.asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop)
+        self.thread.join(timeout=5)
+        self.loop.close()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class CropController:
+    """
+    根据模型绘制内容的包围盒决定窗口裁剪到画布的哪一部分，减少合成器需要混合的透明像素
+    扩大立即生效（内容贴近裁剪边缘时不能被切掉）；缩小要等较小的区域持续 settle 秒，避免随摆动来回调整
+    """
+
+    def __init__(self, margin=CROP_MARGIN, edge=CROP_EDGE, shrink_ratio=CROP_SHRINK_RATIO, settle=CROP_SETTLE):
+        self.margin = margin
+        self.edge = edge
+        self.shrink_ratio = shrink_ratio
+        self.settle = settle
+        self.shrink_since = None  # 开始可以缩小的时间
+        self.shrink_bounds = None  # 等待期间内容覆盖过的区域
+
+    def reset(self):
+        self.shrink_since = None
+        self.shrink_bounds = None
+
+    def padded(self, bounds, canvas_width, canvas_height):
+        """
+        包围盒加上边距并限制在画布内，返回 (x, y, 宽, 高)
+        """
+        x0 = max(0, int(bounds[0] - self.margin))
+        y0 = max(0, int(bounds[1] - self.margin))
+        x1 = min(canvas_width, int(bounds[2] + self.margin + 1))
+        y1 = min(canvas_height, int(bounds[3] + self.margin + 1))
+        return x0, y0, x1 - x0, y1 - y0
+
+    def update(self, bounds, crop, canvas_width, canvas_height, now):
+        """
+        bounds: 画布坐标的内容包围盒 (x0, y0, x1, y1)，None 表示暂时不知道
+        crop: 当前裁剪 (x, y, 宽, 高)
+        返回新的裁剪，不需要改变时返回 None
+        """
+        if bounds is None:
+            return None
+        x, y, w, h = crop
+        # 内容贴近裁剪边缘（且该边不是画布边缘），说明可能已被切掉一部分，立即扩大
+        touching = ((x > 0 and bounds[0] < x + self.edge) or
+                    (y > 0 and bounds[1] < y + self.edge) or
+                    (x + w < canvas_width and bounds[2] > x + w - self.edge) or
+                    (y + h < canvas_height and bounds[3] > y + h - self.edge))
+        if touching:
+            self.reset()
+            merged = (min(x, bounds[0]), min(y, bounds[1]), max(x + w, bounds[2]), max(y + h, bounds[3]))
+            target = self.padded(merged, canvas_width, canvas_height)
+            return target if target != tuple(crop) else None
+
+        target = self.padded(bounds, canvas_width, canvas_height)
+        if target[2] * target[3] >= w * h * self.shrink_ratio:
+            self.reset()
+            return None
+        if self.shrink_since is None:
+            self.shrink_since = now
+            self.shrink_bounds = tuple(bounds)
+            return None
+        # 等待期间记录内容覆盖过的全部区域，缩小后不会马上又碰到边缘
+        b = self.shrink_bounds
+        self.shrink_bounds = (min(b[0], bounds[0]), min(b[1], bounds[1]), max(b[2], bounds[2]), max(b[3], bounds[3]))
+        if now - self.shrink_since < self.settle:
+            return None
+        target = self.padded(self.shrink_bounds, canvas_width, canvas_height)
+        self.reset()
+        return target if target[2] * target[3] < w * h * self.shrink_ratio else None
+
+
+class PowerState:
+    """
+    宠物窗口的电源状态：窗口被隐藏或最小化、被完全遮挡、屏幕锁定时挂起仿真、绘制和轮询，
+    并按状态分别统计定时器唤醒次数和停留时间
+    """
+    STATES = ('active', 'occluded', 'hidden', 'locked')  # 同时满足多个条件时取靠后的状态
+
+    def __init__(self, clock=time.perf_counter):
+        """
+        clock: 时间来源，与窗口使用同一个时钟（基准测试中为模拟时钟）
+        """
+        self.clock = clock
+        self.reasons = set()  # 当前成立的挂起原因（STATES 中除 active 以外的状态）
+        self.state = 'active'
+        self.since = None     # 进入当前状态的时间，第一次使用时才读取时钟，时钟可以在创建之后替换
+        self.seconds = dict.fromkeys(self.STATES, 0.0)
+        self.wakeups = dict.fromkeys(self.STATES, 0)
+        self.suspends = 0
+
+    @property
+    def suspended(self):
+        return bool(self.reasons)
+
+    def set_reason(self, reason, active):
+        """
+        设置一个挂起原因是否成立，返回挂起状态是否因此变化
+        """
+        was_suspended = self.suspended
+        if active:
+            self.reasons.add(reason)
+        else:
+            self.reasons.discard(reason)
+        state = next((s for s in reversed(self.STATES) if s in self.reasons), 'active')
+        if state != self.state:
+            now = self.clock()
+            self.seconds[self.state] += now - self.started(now)
+            self.since = now
+            self.state = state
+        if self.suspended == was_suspended:
+            return False
+        if self.suspended:
+            self.suspends += 1
+        return True
+
+    def started(self, now):
+        if self.since is None:
+            self.since = now
+        return self.since
+
+    def note_wakeup(self):
+        """
+        记录一次定时器唤醒
+        """
+        if self.since is None:
+            self.since = self.clock()
+        self.wakeups[self.state] += 1
+
+    def stats(self):
+        """
+        各状态的停留时间、唤醒次数和每秒唤醒次数
+        """
+        now = self.clock()
+        seconds = dict(self.seconds)
+        seconds[self.state] += now - self.started(now)
+        result = {'state': self.state, 'suspends': self.suspends}
+        for state in self.STATES:
+            result[state] = {
+                'seconds': seconds[state],
+                'wakeups': self.wakeups[state],
+                'wakeups_per_s': self.wakeups[state] / seconds[state] if seconds[state] > 0 else 0.0,
+            }
+        return result
+
+
+class Live2DWidget(QOpenGLWidget):
+    first_frame_presented = pyqtSignal()  # 第一帧（占位画面或模型）真正呈现到屏幕后发出一次
+    hit_changed = pyqtSignal(bool)        # 光标是否位于宠物实际绘制的区域上发生变化
+    mask_updated = pyqtSignal()           # 命中掩码（以及由它估计的模型包围盒）已更新
+    leaving_finished = pyqtSignal()       # 离开动画播放完毕
+    suspended_changed = pyqtSignal(bool)  # 窗口不可见而挂起（True）或恢复（False）
+    control_posted = pyqtSignal()         # 控制接口线程写入了新命令（排队送到 GUI 线程）
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.model = None  # Live2D 模型对象
+        self.resource = None  # 模型在 MODEL_REGISTRY 中的常驻资源
+        self.model_shared = False  # 模型是否复用了其他窗口已加载的资源
+        self.resize(800, 800)  # 设置窗口大小，扩大一倍
+
+        # 动画状态，按真实时间推进
+        self.clock = time.perf_counter  # 时间来源，基准测试可替换为模拟时钟
+        self.anim = AnimationState()
+        self.last_tick_time = self.clock()
+
+        # 光标输入：活跃时以较高频率采样，与绘制分离
+        self.cursor_source = QCursor.pos  # 全局光标位置来源，基准测试可替换为脚本轨迹
+        self.cursor = CursorTracker()
+        self.cursor_timer = QTimer(self)
+        self.cursor_timer.setInterval(int(1000 / CURSOR_SAMPLE_HZ))
+        self.cursor_timer.timeout.connect(self.cursor_tick)
+
+        # 表情与动作由本程序合成，只在切换时记录过渡，不再每帧调用 SetExpression
+        self.expression = ExpressionMixer()
+
+        # 帧调度器，动画静止时降低更新频率
+        self.scheduler = FrameScheduler(clock=lambda: self.clock())
+
+        # 参数没有变化时重新呈现保留的上一帧
+        self.dirty = DirtyTracker(self.anim.params.ids)
+        self.physics_lod = PhysicsLOD()
+        self.dirty.physics_lod = self.physics_lod
+        self.retained_fbo = None
+
+        # 分阶段加载：先显示占位画面，后台读取完成后再在 GL 线程中加载模型
+        self.created_time = time.perf_counter()
+        self.load_timings = {}
+        self.loading = True
+        self.model_data = None
+        self.load_generation = 0
+        self.texture_tier = 0
+        self.source_texture_size = 0
+        self.model_source = None
+        self.start_model_load(pick_texture_tier(self.width(), self.height(), self.devicePixelRatioF()))
+
+        # 窗口大小稳定后重新选择纹理档位
+        self.tier_timer = QTimer(self)
+        self.tier_timer.setSingleShot(True)
+        self.tier_timer.setInterval(TIER_SETTLE_MS)
+        self.tier_timer.timeout.connect(self.check_texture_tier)
+
+        # 定时器来周期性地更新模型角度，间隔由帧调度器每次重新安排
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.updateModelAngle)
+        self.timer.start(RENDER_INTERVAL_MS)  # 动画速度与实际触发频率无关
+
+        # 命中掩码：光标所在位置是否绘制了宠物
+        self.hit_mask = HitMaskReader()
+        self.cursor_hit = True
+        self.last_cursor_pos = None
+
+        # 自动裁剪：模型按整个画布布局，窗口只显示画布的一部分
+        self.canvas = None          # (画布宽, 画布高, 窗口在画布中的 x, y)，None 表示窗口就是整个画布
+        self.retained_view = None   # 保留帧绘制时的画布视图
+
+        # 动态渲染分辨率：模型按 render_scale 渲染到保留帧缓冲，呈现时放大到窗口
+        self.render_scaler = RenderScaler()
+        self.retained_scale = 1.0   # 保留帧绘制时使用的分辨率比例
+        self.gpu_timer = GPUFrameTimer()
+
+        # 分阶段耗时记录，默认关闭（由托盘菜单或 --metrics-port 打开）
+        self.profiler = FrameProfiler()
+        self.metrics = {}         # 指标接口读取的快照，只在 GUI 线程中生成并整体替换
+        self.metrics_time = None
+
+        # 本地控制接口：其他进程发来的命令合并到收件箱，在下一帧一次应用
+        self.control = ControlInbox(self.control_posted.emit)
+        self.control_posted.connect(self.apply_control)
+        self.overrides = ParameterOverrides()
+        self.control_acks = []  # 等待本帧绘制后回复的命令
+
+        # 窗口不可见时挂起所有定时器，恢复时直接快进动画状态
+        self.power = PowerState(clock=lambda: self.clock())
+        self.suspended_at = None
+
+        # 缩放手势进行中：只缩放上一帧画面，手势结束后才重新分配帧缓冲并调整模型
+        self.live_resize = False
+        self.resize_stats = {'resize_events': 0, 'scaled_frames': 0, 'fbo_allocations': 0, 'model_resizes': 0}
+
+        # 离开动画：预先解码的帧在本窗口中按各帧时长播放
+        self.leaving = None
+        self.leaving_start = 0.0
+        self.leaving_timer = QTimer(self)
+        self.leaving_timer.setSingleShot(True)
+        self.leaving_timer.timeout.connect(self.advance_leaving)
+
+        # 启动时间线：记录第一帧和第一帧模型画面的呈现时间
+        self.presented = set()
+        self.frameSwapped.connect(self.on_frame_swapped)
+
+    def initializeGL(self):
+        """
+        初始化 OpenGL 和 Live2D 环境，模型在后台数据准备好后再加载
+        """
+        start = time.perf_counter()
+        try:
+            GL_SHARE.attach(self)
+        except Exception as e:
+            QMessageBox.critical(self, "加载模型失败", f"Live2D 初始化失败: {e}")
+            self.loading = False
+            return
+        self.load_timings['gl_init_ms'] = (time.perf_counter() - start) * 1000.0
+        STARTUP.mark('GL init')
+
+    def on_frame_swapped(self):
+        """
+        合成后的帧已经交换到屏幕
+        """
+        profiler = self.profiler
+        if profiler.enabled and profiler.paint_end is not None:
+            profiler.record(FrameProfiler.SWAP, time.perf_counter() - profiler.paint_end)
+            profiler.count('frames_swapped')
+            profiler.paint_end = None
+        kind = 'model' if self.model is not None else 'placeholder'
+        if kind in self.presented:
+            return
+        if not self.presented:
+            self.first_frame_presented.emit()
+        self.presented.add(kind)
+        STARTUP.mark(f'first {kind} frame presented')
+
+    def start_model_load(self, tier):
+        """
+        启动后台加载阶段，tier 为希望使用的纹理档位
+        """
+        self.load_generation += 1
+        self.loader = ModelLoader(MODEL_JSON_PATH, tier, self.load_generation, self)
+        self.loader.loaded.connect(self.on_model_data_ready)
+        self.loader.start()
+
+    def check_texture_tier(self):
+        """
+        窗口大小稳定后，如果需要的纹理档位变化了，就在后台准备新档位并替换模型
+        """
+        if self.model is None:
+            return
+        width, height, _, _ = self.canvas_view()
+        tier = pick_texture_tier(width, height, self.devicePixelRatioF())
+        if min(tier, self.source_texture_size) != self.texture_tier:
+            self.start_model_load(tier)
+
+    def unload_model(self):
+        """
+        隐藏并释放模型，丢弃正在进行的加载
+        """
+        self.load_generation += 1
+        self.tier_timer.stop()
+        self.loading = False
+        self.model_data = None
+        self.release_model()
+        self.update()
+
+    def release_model(self):
+        """
+        释放对常驻模型的引用（在 GL 上下文中，使最后一个引用能同时删除纹理）
+        """
+        if self.resource is None:
+            return
+        self.makeCurrent()
+        MODEL_REGISTRY.release(self.resource)
+        self.gpu_timer.dispose()
+        self.hit_mask.dispose()
+        self.doneCurrent()
+        self.resource = None
+        self.model = None
+        self.overrides.unbind()
+
+    def on_model_data_ready(self, data):
+        """
+        后台阶段完成，在下一轮事件循环中完成 GL 线程上的加载
+        """
+        if data.generation != self.load_generation:
+            return  # 已经有更新的加载请求，或模型已被卸载
+        self.load_timings.update(data.timings)
+        if data.error is not None:
+            QMessageBox.critical(self, "加载模型失败", f"模型文件加载失败: {data.error}")
+            self.loading = False
+            return
+        self.model_data = data
+        self.dirty.set_physics_inputs(data.physics_inputs)
+        STARTUP.mark(f'model data ready ({data.source})')
+        # 保证占位画面已经呈现过一帧之后再执行阻塞的加载，否则等占位画面绘制后再继续
+        if 'first_frame_ms' in self.load_timings or self.model is not None:
+            QTimer.singleShot(0, self.finish_model_load)
+        else:
+            self.update()
+
+    def finish_model_load(self):
+        """
+        在 GL 线程中加载模型（纹理上传）并绑定参数索引，替换掉旧的模型
+        """
+        data = self.model_data
+        if data is None or data.generation != self.load_generation:
+            return
+        self.model_data = None
+        self.makeCurrent()
+        try:
+            start = time.perf_counter()
+            # 共享上下文中已经常驻的同一模型直接复用，不再重新加载和上传纹理
+            key = (os.path.abspath(data.model_json_path), GL_SHARE.group_key(self))
+            resource = MODEL_REGISTRY.acquire(key, lambda: self.create_model(data.model_json_path),
+                                              data.texture_tier ** 2 * 4)
+            mid = time.perf_counter()
+            resource.resize(*self.canvas_view()[:2])  # 设置模型的初始大小
+            self.anim.params.bind(resource.model, data.param_ids)  # 解析一次参数索引
+            self.expression.set_definitions(data.expressions, data.motions)
+            self.expression.bind(resource.model, self.anim.params.ids)
+            self.overrides.unbind()
+            end = time.perf_counter()
+            # 旧模型在 GL 上下文有效时释放，以便同时释放其纹理
+            if self.resource is not None:
+                MODEL_REGISTRY.release(self.resource)
+            self.resource = resource
+            self.model = resource.model
+        except Exception as e:
+            QMessageBox.critical(self, "加载模型失败", f"模型文件加载失败: {e}")
+            return
+        finally:
+            self.doneCurrent()
+            self.loading = False
+        self.texture_tier = data.texture_tier
+        self.source_texture_size = data.source_texture_size
+        self.model_source = data.source
+        self.load_timings['load_model_ms'] = (mid - start) * 1000.0
+        self.model_shared = resource.refs > 1
+        self.load_timings['bind_ms'] = (end - mid) * 1000.0
+        self.load_timings.setdefault('model_ready_ms', (end - self.created_time) * 1000.0)
+        STARTUP.mark('model loaded')
+        self.dirty.invalidate(now=self.clock())
+        self.wake()
+
+    @staticmethod
+    def create_model(model_json_path):
+        model = live2d.LAppModel()
+        model.LoadModelJson(model_json_path)
+        return model
+
+    def texture_stats(self):
+        """
+        当前纹理档位以及相对完整分辨率节省的纹理内存
+        """
+        full_bytes = self.source_texture_size ** 2 * 4
+        tier_bytes = self.texture_tier ** 2 * 4
+        return {
+            'texture_tier': self.texture_tier,
+            'source_texture_size': self.source_texture_size,
+            'texture_bytes': tier_bytes,
+            'texture_bytes_saved': full_bytes - tier_bytes,
+            'load_model_ms': self.load_timings.get('load_model_ms'),
+        }
+
+    def resident_memory(self):
+        """
+        本窗口常驻的显存估算（字节）
+        共用的模型纹理按引用数平摊；QOpenGLWidget 自身的帧缓冲和保留帧各按颜色 + 深度模板 8 字节/像素计
+        """
+        ratio = self.devicePixelRatioF()
+        pixels = int(self.width() * ratio) * int(self.height() * ratio)
+        framebuffer_bytes = pixels * 8
+        if self.retained_fbo is not None:
+            framebuffer_bytes += self.retained_fbo.width() * self.retained_fbo.height() * 8
+        texture_bytes = self.resource.texture_bytes if self.resource is not None else 0
+        refs = self.resource.refs if self.resource is not None else 1
+        return {
+            'texture_bytes': texture_bytes,
+            'texture_refs': refs,
+            'texture_bytes_attributed': texture_bytes // refs,
+            'framebuffer_bytes': framebuffer_bytes,
+            'resident_bytes': texture_bytes // refs + framebuffer_bytes,
+            'model_shared': self.model_shared,
+        }
+
+    def load_stats(self):
+        """
+        模型加载各阶段耗时（毫秒）
+        """
+        return dict(self.load_timings)
+
+    def play_leaving(self, animation):
+        """
+        播放离开动画，所有帧已经解码，播放期间只按帧时长重绘
+        """
+        self.leaving = animation
+        self.leaving_start = self.clock()
+        self.advance_leaving()
+
+    def advance_leaving(self):
+        elapsed = (self.clock() - self.leaving_start) * 1000.0
+        self.update()
+        if elapsed >= self.leaving.duration_ms():
+            self.leaving_finished.emit()
+            return
+        self.leaving_timer.start(max(1, int(self.leaving.next_change_ms(elapsed) + 0.5)))
+
+    def paint_leaving(self):
+        """
+        绘制离开动画的当前帧：高度比窗口少 50 像素，水平居中，顶部留出 28 像素
+        """
+        elapsed = (self.clock() - self.leaving_start) * 1000.0
+        frame = self.leaving.frames[self.leaving.frame_index(elapsed)]
+        height = self.height() - 50
+        width = int(self.leaving.aspect() * height)
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        painter.drawImage(QRect((self.width() - width) // 2 - 2, 28, width, height), frame)
+        painter.end()
+
+    def paint_placeholder(self):
+        """
+        模型加载完成前的占位画面：一个柔和的光晕
+        """
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        cx = self.width() / 2.0
+        cy = self.height() * 0.6
+        radius = min(self.width(), self.height()) * 0.25
+        grad = QRadialGradient(cx, cy, radius, cx, cy)
+        grad.setColorAt(0.0, QColor(66, 153, 225, 90))
+        grad.setColorAt(1.0, QColor(66, 153, 225, 0))
+        painter.setBrush(grad)
+        painter.setPen(Qt.NoPen)
+        painter.drawEllipse(QPoint(int(cx), int(cy)), int(radius), int(radius))
+        painter.end()
+        self.load_timings.setdefault('first_frame_ms', (time.perf_counter() - self.created_time) * 1000.0)
+        if self.model_data is not None:
+            QTimer.singleShot(0, self.finish_model_load)
+
+    def resizeGL(self, width, height):
+        """
+        窗口大小变化时，更新 OpenGL 视口
+        """
+        glViewport(0, 0, width, height)
+        self.resize_stats['resize_events'] += 1
+        self.update_physics_lod()
+        if self.live_resize and self.retained_fbo is not None:
+            # 缩放手势中保留上一帧，绘制时由 GPU 缩放到新尺寸
+            self.update()
+            return
+        if self.resource is not None and self.resource.resize(*self.canvas_view()[:2]):  # 确保模型已加载再调整大小
+            self.resize_stats['model_resizes'] += 1
+        # 保留帧的尺寸已失效，下次绘制时重新创建
+        self.retained_fbo = None
+        self.dirty.invalidate(now=self.clock())
+        self.tier_timer.start()
+
+    def canvas_view(self):
+        """
+        返回 (画布宽, 画布高, 窗口在画布中的 x, y)，逻辑像素
+        """
+        if self.canvas is None:
+            return self.width(), self.height(), 0, 0
+        return self.canvas
+
+    def set_canvas(self, width, height, x, y):
+        """
+        设置画布尺寸和窗口在画布中的位置
+        模型始终按整个画布布局（Resize 使用画布尺寸），绘制时平移视口，使宠物在屏幕上的位置不随裁剪变化
+        """
+        if (width, height, x, y) == self.canvas_view():
+            return
+        self.canvas = (width, height, x, y)
+        self.update_physics_lod()
+        self.hit_mask.reset()
+        self.dirty.invalidate(now=self.clock())
+        self.update()
+
+    def update_physics_lod(self):
+        """
+        按画布在屏幕上的尺寸调整物理细节层次和物理收敛时间
+        """
+        width, height, _, _ = self.canvas_view()
+        ratio = self.devicePixelRatioF()
+        self.physics_lod.set_screen_size(width * ratio, height * ratio)
+        self.dirty.physics_settle = self.physics_lod.settle_time()
+
+    def drawable_bounds(self):
+        """
+        根据命中掩码估计模型绘制内容的包围盒 (x0, y0, x1, y1)，画布坐标（逻辑像素），没有内容时返回 None
+        """
+        mask = self.hit_mask.mask
+        if mask is None or not mask.any():
+            return None
+        rows, cols = mask.shape
+        ys = np.flatnonzero(mask.any(axis=1))
+        xs = np.flatnonzero(mask.any(axis=0))
+        _, _, ox, oy = self.canvas_view()
+        sx = self.width() / cols
+        sy = self.height() / rows
+        return (ox + xs[0] * sx, oy + ys[0] * sy, ox + (xs[-1] + 1) * sx, oy + (ys[-1] + 1) * sy)
+
+    def begin_live_resize(self):
+        """
+        开始连续缩放（Ctrl+滚轮）：之后的尺寸变化只缩放上一帧画面
+        """
+        self.live_resize = True
+
+    def end_live_resize(self):
+        """
+        缩放结束：按最终尺寸调整模型、重新分配保留帧并重新绘制
+        """
+        if not self.live_resize:
+            return
+        self.live_resize = False
+        if self.resource is not None and self.resource.resize(*self.canvas_view()[:2]):
+            self.resize_stats['model_resizes'] += 1
+        self.retained_fbo = None
+        self.dirty.invalidate(now=self.clock())
+        self.tier_timer.start()
+        self.wake()
+
+    def paintGL(self):
+        """
+        每帧绘制模型
+        参数没有变化时直接重新呈现保留的上一帧，跳过 model.Update() 和 model.Draw()
+        """
+        if not self.model:
+            glClearColor(0, 0, 0, 0)  # 设置清除颜色为透明
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            if self.leaving is not None:
+                self.paint_leaving()
+            elif self.loading:
+                self.paint_placeholder()
+            return
+
+        if self.live_resize and self.retained_fbo is not None:
+            self.present_retained_frame()
+            self.resize_stats['scaled_frames'] += 1
+            self.scheduler.note_frame()
+            return
+
+        now = self.clock()
+        values = self.anim.render_values()
+        self.cursor.consumed(now)
+        dirty = self.dirty.check(values, now)
+        self.poll_hit_mask()
+        profiler = self.profiler
+        if dirty or self.retained_fbo is None:
+            start = time.perf_counter()
+            timed = self.gpu_timer.begin()
+            self.render_model(values)
+            cpu_ms = (time.perf_counter() - start) * 1000.0
+            if timed:
+                self.gpu_timer.end(cpu_ms)
+            elif not self.gpu_timer.available:
+                self.adapt_render_scale(cpu_ms, now)
+            self.dirty.rendered_frames += 1
+            # 画面变化后才重新读回命中掩码
+            self.hit_mask.request(self.retained_fbo, self.defaultFramebufferObject())
+        else:
+            self.dirty.skipped_frames += 1
+        if profiler.enabled:
+            profiler.count('frames_rendered' if dirty else 'frames_skipped')
+            start = time.perf_counter()
+            self.present_retained_frame()
+            profiler.paint_end = time.perf_counter()
+            profiler.record(FrameProfiler.PRESENT, profiler.paint_end - start)
+        else:
+            self.present_retained_frame()
+        if self.control_acks:
+            self.flush_control_acks()
+        for frame_ms in self.gpu_timer.poll():
+            self.adapt_render_scale(frame_ms, now)
+        self.scheduler.note_frame()
+
+    def adapt_render_scale(self, frame_ms, now):
+        """
+        送入一帧的绘制耗时，分辨率比例变化后重新绘制
+        """
+        if self.render_scaler.add_sample(frame_ms, now):
+            self.dirty.invalidate(now=now)
+            self.update()
+
+    def render_model(self, values):
+        """
+        更新模型并绘制到保留帧缓冲中
+        """
+        # 保留帧缓冲按当前的分辨率比例分配，比例或窗口大小变化后重新分配
+        scale = self.render_scaler.scale
+        ratio = self.devicePixelRatioF() * scale
+        size = (max(1, int(self.width() * ratio)), max(1, int(self.height() * ratio)))
+        if self.retained_fbo is None or (self.retained_fbo.width(), self.retained_fbo.height()) != size:
+            fbo_format = QOpenGLFramebufferObjectFormat()
+            fbo_format.setAttachment(QOpenGLFramebufferObject.CombinedDepthStencil)
+            self.retained_fbo = QOpenGLFramebufferObject(size[0], size[1], fbo_format)
+            self.resize_stats['fbo_allocations'] += 1
+
+        # 视口覆盖整个画布，并按窗口在画布中的位置平移（GL 的视口原点在左下角）
+        view = self.canvas_view()
+        canvas_width, canvas_height, x, y = view
+        self.retained_fbo.bind()
+        glViewport(-int(x * ratio), self.retained_fbo.height() + int(y * ratio) - int(canvas_height * ratio),
+                   int(canvas_width * ratio), int(canvas_height * ratio))
+        glClearColor(0, 0, 0, 0)  # 设置清除颜色为透明
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+        # 模型可能与其他窗口共用，绘制前按本窗口的画布尺寸调整
+        if self.resource.resize(canvas_width, canvas_height):
+            self.resize_stats['model_resizes'] += 1
+        start = time.perf_counter()
+        self.model.Update()  # 更新模型（基于参数）
+        updated = time.perf_counter()
+        self.physics_lod.note_update((updated - start) * 1000.0)
+        # 合成表情和动作、再用外部设置的参数覆盖后，通过加载时解析好的参数索引一次写入所有驱动参数
+        composed = self.expression.apply(values, self.clock())
+        if self.overrides:
+            composed = self.overrides.apply(composed, self.model, self.anim.params.ids)
+        self.anim.params.push(composed)
+
+        profiler = self.profiler
+        if profiler.enabled:
+            pushed = time.perf_counter()
+            self.model.Draw()  # 绘制模型
+            profiler.record(FrameProfiler.UPDATE, updated - start)
+            profiler.record(FrameProfiler.PUSH, pushed - updated)
+            profiler.record(FrameProfiler.DRAW, time.perf_counter() - pushed)
+        else:
+            self.model.Draw()  # 绘制模型
+        self.retained_fbo.release()
+        self.retained_view = view
+        self.retained_scale = scale
+
+    def present_retained_frame(self):
+        """
+        把保留帧缓冲的内容复制到窗口的帧缓冲
+        以较低分辨率绘制，或画布、裁剪在绘制之后变了（缩放手势中）时，
+        按分辨率比例、画布的缩放和窗口位置由 GPU 线性缩放到对应位置
+        """
+        w = self.retained_fbo.width()
+        h = self.retained_fbo.height()
+        ratio = self.devicePixelRatioF()
+        dw = int(self.width() * ratio)
+        dh = int(self.height() * ratio)
+        view = self.canvas_view()
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.retained_fbo.handle())
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self.defaultFramebufferObject())
+        if (dw, dh) == (w, h) and view == self.retained_view:
+            glBlitFramebuffer(0, 0, w, h, 0, 0, w, h, GL_COLOR_BUFFER_BIT, GL_NEAREST)
+        else:
+            old_width, old_height, old_x, old_y = self.retained_view
+            sx = view[0] / old_width / self.retained_scale
+            sy = view[1] / old_height / self.retained_scale
+            left = (old_x * view[0] / old_width - view[2]) * ratio
+            top = (old_y * view[1] / old_height - view[3]) * ratio
+            glClearColor(0, 0, 0, 0)
+            glClear(GL_COLOR_BUFFER_BIT)
+            glBlitFramebuffer(0, 0, w, h, int(left), dh - int(top + h * sy), int(left + w * sx), dh - int(top),
+                              GL_COLOR_BUFFER_BIT, GL_LINEAR)
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.defaultFramebufferObject())
+
+    def set_expression(self, expression):
+        """
+        切换表情（None 表示不使用表情），只在表情变化时开始过渡，过渡过程中持续重绘
+        """
+        now = self.clock()
+        fade = self.expression.select(expression, now)
+        if fade is None:
+            return
+        self.dirty.invalidate(fade, now)
+        self.wake()
+
+    def play_motion(self, group, index=0):
+        """
+        播放预先加载的动作，播放过程中持续重绘
+        """
+        now = self.clock()
+        duration = self.expression.play_motion(group, index, now)
+        if duration is None:
+            return
+        self.dirty.invalidate(duration, now)
+        self.wake()
+
+    def apply_control(self):
+        """
+        取走控制接口收到的全部命令（已经合并），在下一帧中生效
+        """
+        taken = self.control.take()
+        if taken is None:
+            return
+        params, release, expression, motion, acks = taken
+        now = self.clock()
+        if params or release:
+            if release or not self.dirty.physics_inputs.isdisjoint(params):
+                self.dirty.physics_input_changed(now)
+            self.overrides.update(params, release)
+        if expression is not None:
+            self.set_expression(expression[0])
+        if motion is not None:
+            self.play_motion(*motion)
+        self.control_acks.extend(acks)
+        if self.power.suspended or self.model is None:
+            self.flush_control_acks(deferred=True)
+        self.dirty.invalidate(now=now)
+        self.wake()
+
+    def flush_control_acks(self, deferred=False):
+        """
+        回复等待中的控制命令；deferred 表示命令已经记下，但要等恢复绘制后才会出现在画面上
+        """
+        acks, self.control_acks = self.control_acks, []
+        for ack in acks:
+            ack(deferred)
+
+    def frame_stats(self):
+        """
+        当前帧率、跳过帧和实际绘制帧以及光标到参数延迟的统计
+        """
+        stats = self.dirty.stats()
+        stats['effective_fps'] = self.effective_fps()
+        stats['cursor_latency_ms'] = self.cursor.latency_stats()
+        stats['resize'] = dict(self.resize_stats)
+        stats['hit_mask'] = self.hit_mask.stats()
+        stats['physics_lod'] = self.physics_lod.stats(self.dirty.rendered_frames + self.dirty.skipped_frames)
+        stats['render_scale'] = dict(self.render_scaler.stats(), gpu_timer=self.gpu_timer.available)
+        stats['power'] = self.power.stats()
+        stats['control'] = self.control.stats()
+        if self.profiler.enabled:
+            stats['phases_ms'] = self.profiler.summary()
+        return stats
+
+    def updateModelAngle(self):
+        """
+        根据光标位置和真实经过的时间推进动画状态
+        角度、瞳孔、手臂的平滑以及眨眼、呼吸节奏都与定时器实际触发频率无关
+        """
+        self.power.note_wakeup()
+        if self.power.suspended:
+            return
+        tick_start = time.perf_counter() if self.profiler.enabled else None
+        now = self.clock()
+        dt = now - self.last_tick_time
+        self.last_tick_time = now
+        needs_frame = False
+        interval = 1.0 / self.scheduler.max_fps
+        if self.model:
+            self.sample_cursor()
+
+            # 把光标外推到预计的画面呈现时间，再换算成窗口内的相对位置
+            predicted = self.cursor.predict(now, now + interval)
+            if predicted is not None:
+                canvas_width, canvas_height, x, y = self.canvas_view()
+                origin = self.mapToGlobal(QPoint(0, 0))
+                self.anim.set_cursor((predicted[0] - origin.x() + x) / canvas_width,
+                                     (predicted[1] - origin.y() + y) / canvas_height)
+            self.anim.advance(dt)
+            required_fps = self.anim.required_fps()
+            if now < self.dirty.forced_until:
+                # 表情过渡尚未结束，保持全速
+                required_fps = self.scheduler.max_fps
+            elif now < self.dirty.physics_until:
+                # 头发物理尚未收敛，按物理细节层次选择频率
+                required_fps = max(required_fps, self.physics_lod.rate(now - self.dirty.physics_changed))
+            interval, needs_frame = self.scheduler.plan(required_fps, self.anim.time_to_next_event())
+
+            # 不绘制新帧时也要取回在途的命中掩码读回
+            if self.hit_mask.pending and not needs_frame:
+                self.makeCurrent()
+                self.poll_hit_mask()
+                self.doneCurrent()
+
+            # 空闲时光标采样降为低频轮询（只读取光标位置，不推进动画），光标一动就立即唤醒；
+            # 窗口鼠标穿透，收不到鼠标移动事件，不能依赖事件唤醒
+            cursor_interval = int(1000 / (CURSOR_IDLE_HZ if self.scheduler.is_idle() else CURSOR_SAMPLE_HZ))
+            if not self.cursor_timer.isActive() or self.cursor_timer.interval() != cursor_interval:
+                self.cursor_timer.start(cursor_interval)
+
+        if needs_frame:
+            self.update()
+        if tick_start is not None:
+            self.profiler.record(FrameProfiler.TICK, time.perf_counter() - tick_start)
+            self.profiler.count('ticks')
+            if self.metrics_time is None or now - self.metrics_time >= PROFILE_SNAPSHOT_INTERVAL:
+                self.refresh_metrics(now)
+        self.timer.start(max(1, int(interval * 1000)))
+
+    def cursor_tick(self):
+        """
+        光标采样定时器触发
+        """
+        self.power.note_wakeup()
+        self.sample_cursor()
+
+    def sample_cursor(self):
+        """
+        采样一次全局光标位置，光标移动时立即唤醒
+        """
+        pos = self.cursor_source()
+        self.feed_cursor(pos.x(), pos.y())
+
+    def feed_cursor(self, x, y):
+        """
+        送入一个全局光标位置（采样或鼠标移动事件），与历史合并
+        """
+        if self.cursor.push(x, y, self.clock()):
+            self.wake()  # 空闲时下一次更新可能还要等一个空闲周期，立即重新安排
+            self.last_cursor_pos = (x, y)
+            self.refresh_cursor_hit()
+
+    def poll_hit_mask(self):
+        """
+        取回已完成的掩码读回（需要 GL 上下文处于当前状态）
+        """
+        if self.hit_mask.poll():
+            self.refresh_cursor_hit()
+            self.mask_updated.emit()
+
+    def refresh_cursor_hit(self):
+        """
+        用最新的命中掩码重新判断光标是否位于宠物上，变化时发出 hit_changed
+        """
+        if self.last_cursor_pos is None:
+            return
+        local = self.mapFromGlobal(QPoint(*self.last_cursor_pos))
+        hit = self.hit_mask.contains(local.x(), local.y(), self.width(), self.height())
+        if hit != self.cursor_hit:
+            self.cursor_hit = hit
+            self.hit_changed.emit(hit)
+
+    def wake(self):
+        """
+        立即唤醒动画和绘制（例如按下CTRL键或切换表情时）
+        """
+        self.scheduler.wake()
+        if self.power.suspended:
+            return
+        if not self.timer.isActive() or self.timer.remainingTime() > RENDER_INTERVAL_MS:
+            self.timer.start(0)
+
+    def set_power_reason(self, reason, active):
+        """
+        设置一个挂起原因（'occluded'、'hidden'、'locked'）是否成立，挂起状态变化时挂起或恢复
+        """
+        if not self.power.set_reason(reason, active):
+            return
+        if self.power.suspended:
+            self.suspend()
+        else:
+            self.resume()
+        self.suspended_changed.emit(self.power.suspended)
+
+    def suspend(self):
+        """
+        停止仿真、绘制和光标采样的定时器，窗口不可见期间不再唤醒
+        """
+        self.suspended_at = self.clock()
+        self.timer.stop()
+        self.cursor_timer.stop()
+        self.physics_lod.leave()
+        # 挂起期间不会再绘制，不让控制接口的客户端一直等待
+        self.flush_control_acks(deferred=True)
+
+    def resume(self):
+        """
+        恢复定时器：不补算挂起期间错过的仿真步，而是把动画直接快进到当前时间，再强制绘制一帧
+        """
+        now = self.clock()
+        if self.suspended_at is not None:
+            self.anim.fast_forward(now - self.suspended_at)
+            self.suspended_at = None
+        self.last_tick_time = now
+        self.dirty.invalidate(now=now)
+        self.update()
+        self.wake()
+
+    def effective_fps(self):
+        """
+        当前实际绘制帧率
+        """
+        return self.scheduler.effective_fps()
+
+    def refresh_metrics(self, now=None):
+        """
+        在 GUI 线程中重新生成帧耗时分位数、计数器和瞬时指标的快照，指标接口的线程只读取快照
+        """
+        self.metrics = dict(self.profiler.snapshot(), gauges=self.metric_gauges())
+        self.metrics_time = self.clock() if now is None else now
+
+    def metric_gauges(self):
+        """
+        随帧耗时一起导出的瞬时指标
+        """
+        return {
+            'effective_fps': self.effective_fps(),
+            'render_scale': self.render_scaler.scale,
+            'skip_ratio': self.dirty.stats()['skip_ratio'],
+        }
+
+
+class MultiPetWidget(QOpenGLWidget):
+    """
+    在一个 GL 上下文中绘制多个宠物，按网格排列，每个宠物一个格子
+    每帧先一次插值得到所有宠物的参数（堆叠的参数数组），再逐个写入参数并绘制到各自的格子；
+    同一个模型只通过 MODEL_REGISTRY 加载一次、纹理只上传一次，各宠物的状态都在自己的参数块中，
+    只有模型内部的物理模拟（头发摆动）由所有宠物共用
+    """
+
+    def __init__(self, count, cell_size=PET_CELL_SIZE, parent=None):
+        super().__init__(parent)
+        self.count = count
+        self.cell_size = cell_size
+        self.resource = None  # 所有宠物共用的常驻模型
+        self.model = None
+        self.group = PetGroup(count)
+        self.clock = time.perf_counter
+        self.last_tick_time = self.clock()
+        self.cursor_source = QCursor.pos
+        self.scheduler = FrameScheduler(clock=lambda: self.clock())
+        self.texture_tier = 0
+        self.load_timings = {}
+        self.created_time = time.perf_counter()
+        self.loading = True
+
+        # 所有宠物共享一次后台加载，纹理档位按单个格子的大小选择
+        self.loader = ModelLoader(MODEL_JSON_PATH, pick_texture_tier(cell_size, cell_size, self.devicePixelRatioF()),
+                                  parent=self)
+        self.loader.loaded.connect(self.on_model_data_ready)
+        self.loader.start()
+        self.model_data = None
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.tick)
+        self.timer.start(RENDER_INTERVAL_MS)
+
+    def columns(self):
+        return max(1, self.width() // self.cell_size)
+
+    def cells(self):
+        """
+        每个宠物格子的位置 (x, y, 边长)，逻辑像素，原点在左上角
+        """
+        columns = self.columns()
+        return [((i % columns) * self.cell_size, (i // columns) * self.cell_size, self.cell_size)
+                for i in range(self.count)]
+
+    def initializeGL(self):
+        try:
+            GL_SHARE.attach(self)
+        except Exception as e:
+            QMessageBox.critical(self, "加载模型失败", f"Live2D 初始化失败: {e}")
+            self.loading = False
+            return
+        if self.model_data is not None:
+            QTimer.singleShot(0, self.finish_model_load)
+
+    def on_model_data_ready(self, data):
+        if data.error is not None:
+            QMessageBox.critical(self, "加载模型失败", f"模型文件加载失败: {data.error}")
+            self.loading = False
+            return
+        self.load_timings.update(data.timings)
+        self.model_data = data
+        if self.context() is not None:
+            QTimer.singleShot(0, self.finish_model_load)
+
+    def finish_model_load(self):
+        """
+        在 GL 线程中取得共用的常驻模型，并为每个宠物的参数块绑定参数索引
+        """
+        data = self.model_data
+        if data is None:
+            return
+        self.model_data = None
+        self.makeCurrent()
+        try:
+            start = time.perf_counter()
+            key = (os.path.abspath(data.model_json_path), GL_SHARE.group_key(self))
+            resource = MODEL_REGISTRY.acquire(key, lambda: Live2DWidget.create_model(data.model_json_path),
+                                              data.texture_tier ** 2 * 4)
+            side = int(self.cell_size * self.devicePixelRatioF())
+            resource.resize(side, side)
+            for block in self.group.params.blocks:
+                block.bind(resource.model, data.param_ids)
+        except Exception as e:
+            QMessageBox.critical(self, "加载模型失败", f"模型文件加载失败: {e}")
+            return
+        finally:
+            self.doneCurrent()
+            self.loading = False
+        self.resource = resource
+        self.model = resource.model
+        self.texture_tier = data.texture_tier
+        self.load_timings['load_models_ms'] = (time.perf_counter() - start) * 1000.0
+        self.scheduler.wake()
+
+    def release_model(self):
+        """
+        释放对常驻模型的引用（在 GL 上下文中，使最后一个引用能同时删除纹理）
+        """
+        if self.resource is None:
+            return
+        self.makeCurrent()
+        MODEL_REGISTRY.release(self.resource)
+        self.doneCurrent()
+        self.resource = None
+        self.model = None
+
+    def paintGL(self):
+        glClearColor(0, 0, 0, 0)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        if self.model is None:
+            return
+
+        # 一次插值得到所有宠物的参数，然后每个宠物依次更新共用的模型、写入自己的参数并绘制到自己的格子中
+        # （GL 视口原点在左下角）；模型可能与其他窗口共用，绘制前按格子大小调整
+        values = self.group.render_values()
+        model = self.model
+        ratio = self.devicePixelRatioF()
+        self.resource.resize(int(self.cell_size * ratio), int(self.cell_size * ratio))
+        height = int(self.height() * ratio)
+        for block, row, (x, y, side) in zip(self.group.params.blocks, values, self.cells()):
+            model.Update()
+            block.push(row)
+            px = int(side * ratio)
+            glViewport(int(x * ratio), height - int(y * ratio) - px, px, px)
+            model.Draw()
+        glViewport(0, 0, int(self.width() * ratio), height)
+        self.scheduler.note_frame()
+
+    def tick(self):
+        """
+        推进所有宠物的动画并安排下一次更新，光标位置按各自的格子换算
+        """
+        now = self.clock()
+        dt = now - self.last_tick_time
+        self.last_tick_time = now
+        interval = 1.0 / self.scheduler.max_fps
+        needs_frame = False
+        if self.model is not None:
+            pos = self.cursor_source()
+            origin = self.mapToGlobal(QPoint(0, 0))
+            gx = pos.x() - origin.x()
+            gy = pos.y() - origin.y()
+            for anim, (x, y, side) in zip(self.group.anims, self.cells()):
+                anim.set_cursor((gx - x) / side, (gy - y) / side)
+            self.group.advance(dt)
+            interval, needs_frame = self.scheduler.plan(self.group.required_fps(), self.group.time_to_next_event())
+        if needs_frame:
+            self.update()
+        self.timer.start(max(1, int(interval * 1000)))
+
+    def memory_stats(self):
+        """
+        参数数组和纹理占用的内存（字节）
+        所有宠物共用一份常驻纹理，纹理内存不随宠物数量增加
+        """
+        params = self.group.params
+        texture_bytes = self.resource.texture_bytes if self.resource is not None else 0
+        return {
+            'pets': self.count,
+            'texture_tier': self.texture_tier,
+            'param_bytes': sum(a.nbytes for a in (params.current, params.target, params.prev, params.rendered)),
+            'texture_bytes': texture_bytes,
+            'texture_bytes_per_pet': texture_bytes / self.count,
+            'resident_models': MODEL_REGISTRY.stats()['resident_models'],
+        }
+
+    def effective_fps(self):
+        return self.scheduler.effective_fps()
+
+
+class WindowIntegration:
+    """
+    窗口鼠标穿透的平台集成基类
+    缓存当前穿透状态，重复设置相同状态时不产生任何系统调用
+    基类本身不做任何平台操作，可作为测试或不支持平台上的空实现
+    """
+    name = 'null'
+
+    def __init__(self, window):
+        self.window = window
+        self.transparent = None
+        self.changes = 0  # 实际生效的切换次数
+
+    def set_click_through(self, transparent):
+        """
+        设置鼠标穿透，状态确实变化时返回 True
+        """
+        if transparent == self.transparent:
+            return False
+        self._apply(transparent)
+        self.transparent = transparent
+        self.changes += 1
+        return True
+
+    def _apply(self, transparent):
+        pass
+
+
+class Win32Integration(WindowIntegration):
+    """
+    使用Win32 API设置窗口的 WS_EX_TRANSPARENT 扩展样式
+    扩展样式只在创建时读取一次，之后在本地维护
+    """
+    name = 'win32'
+
+    def __init__(self, window):
+        super().__init__(window)
+        import win32gui
+        import win32con
+        self.win32gui = win32gui
+        self.win32con = win32con
+        self.hwnd = int(window.winId())
+        self.style = win32gui.GetWindowLong(self.hwnd, win32con.GWL_EXSTYLE)
+        # 使用SetWindowLongPtr替代SetWindowLong，以支持64位系统
+        if hasattr(win32gui, 'SetWindowLongPtr'):
+            self.set_window_long = win32gui.SetWindowLongPtr
+        else:
+            self.set_window_long = win32gui.SetWindowLong
+
+    def _apply(self, transparent):
+        win32con = self.win32con
+        if transparent:
+            style = self.style | win32con.WS_EX_TRANSPARENT
+        else:
+            style = self.style & ~win32con.WS_EX_TRANSPARENT
+        if style == self.style:
+            return
+        try:
+            self.set_window_long(self.hwnd, win32con.GWL_EXSTYLE, style)
+            self.style = style
+            # 强制重绘窗口以确保样式变更生效
+            self.win32gui.SetWindowPos(self.hwnd, None, 0, 0, 0, 0,
+                                       win32con.SWP_NOMOVE | win32con.SWP_NOSIZE |
+                                       win32con.SWP_NOZORDER | win32con.SWP_FRAMECHANGED)
+        except Exception as e:
+            print(f"设置鼠标穿透失败: {e}")
+
+
+class X11Integration(WindowIntegration):
+    """
+    X11 下通过 Qt.WindowTransparentForInput 设置窗口的输入区域（XShape），
+    直接作用于原生窗口，不会重新创建窗口
+    """
+    name = 'x11'
+
+    def _apply(self, transparent):
+        handle = self.window.windowHandle()
+        if handle is not None:
+            handle.setFlag(Qt.WindowTransparentForInput, transparent)
+
+
+def create_window_integration(window):
+    """
+    按 Qt 平台插件选择窗口集成，不支持的平台只使用 Qt 自身的鼠标穿透属性
+    """
+    platform_name = QGuiApplication.platformName()
+    try:
+        if platform_name == 'windows':
+            return Win32Integration(window)
+        if platform_name == 'xcb':
+            return X11Integration(window)
+    except Exception as e:
+        print(f"窗口集成不可用: {e}")
+    return WindowIntegration(window)
+
+
+class SessionLockMonitor(QObject):
+    """
+    屏幕锁定监视的基类，锁定状态变化时发出 locked_changed
+    基类本身不监视任何东西，用于不支持的平台
+    """
+    name = 'null'
+    locked_changed = pyqtSignal(bool)
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.locked = False
+
+    def set_locked(self, locked):
+        if locked != self.locked:
+            self.locked = locked
+            self.locked_changed.emit(locked)
+
+    def native_event(self, event_type, message):
+        """
+        窗口收到的原生消息，由 Live2DWindow.nativeEvent 转发
+        """
+
+    def stop(self):
+        pass
+
+
+class Win32SessionLockMonitor(SessionLockMonitor):
+    """
+    Windows 下注册会话通知，通过窗口收到的 WM_WTSSESSION_CHANGE 得知锁屏和解锁
+    """
+    name = 'wts'
+    WM_WTSSESSION_CHANGE = 0x02B1
+    WTS_SESSION_LOCK = 0x7
+    WTS_SESSION_UNLOCK = 0x8
+
+    def __init__(self, window):
+        super().__init__(window)
+        import win32ts
+        from ctypes import wintypes
+        self.win32ts = win32ts
+        self.msg_type = wintypes.MSG
+        self.hwnd = int(window.winId())
+        win32ts.WTSRegisterSessionNotification(self.hwnd, win32ts.NOTIFY_FOR_THIS_SESSION)
+
+    def native_event(self, event_type, message):
+        if event_type != b'windows_generic_MSG':
+            return
+        msg = self.msg_type.from_address(int(message))
+        if msg.message == self.WM_WTSSESSION_CHANGE:
+            if msg.wParam == self.WTS_SESSION_LOCK:
+                self.set_locked(True)
+            elif msg.wParam == self.WTS_SESSION_UNLOCK:
+                self.set_locked(False)
+
+    def stop(self):
+        try:
+            self.win32ts.WTSUnRegisterSessionNotification(self.hwnd)
+        except Exception as e:
+            print(f"注销会话通知失败: {e}")
+
+
+class DBusSessionLockMonitor(SessionLockMonitor):
+    """
+    Linux 桌面下监听会话总线上屏幕保护程序的 ActiveChanged 信号（锁屏时屏幕保护程序处于激活状态）
+    """
+    name = 'dbus'
+    SERVICES = (
+        ('org.freedesktop.ScreenSaver', '/org/freedesktop/ScreenSaver'),
+        ('org.gnome.ScreenSaver', '/org/gnome/ScreenSaver'),
+    )
+
+    def __init__(self, window):
+        super().__init__(window)
+        from PyQt5.QtDBus import QDBusConnection
+        bus = QDBusConnection.sessionBus()
+        if not bus.isConnected():
+            raise RuntimeError('无法连接会话总线')
+        connected = [bus.connect(service, path, service, 'ActiveChanged', self.on_active_changed)
+                     for service, path in self.SERVICES]
+        if not any(connected):
+            raise RuntimeError('没有可用的屏幕保护程序服务')
+
+    @pyqtSlot(bool)
+    def on_active_changed(self, active):
+        self.set_locked(active)
+
+
+def create_session_lock_monitor(window):
+    """
+    按 Qt 平台插件选择屏幕锁定监视，不支持的平台不监视锁屏（仍然按窗口可见性挂起）
+    """
+    platform_name = QGuiApplication.platformName()
+    try:
+        if platform_name == 'windows':
+            return Win32SessionLockMonitor(window)
+        if platform_name in ('xcb', 'wayland'):
+            return DBusSessionLockMonitor(window)
+    except Exception as e:
+        print(f"屏幕锁定监视不可用: {e}")
+    return SessionLockMonitor(window)
+
+
+# Linux 输入事件编码（linux/input-event-codes.h）
+EV_KEY = 0x01
+KEY_LEFTCTRL = 29
+KEY_RIGHTCTRL = 97
+KEY_SPACE = 57
+EVDEV_KEY_CODES = {'space': KEY_SPACE}
+EVDEV_RESCAN_DELAY = 1.0  # 键盘全部断开后重新查找设备的初始间隔（秒），每次找不到时加倍
+EVDEV_RESCAN_MAX_DELAY = 30.0
+
+
+class ModifierEvent(QEvent):
+    """
+    CTRL 键状态变化事件，timestamp 为检测到按键变化的时间（perf_counter）
+    """
+    TYPE = QEvent.Type(QEvent.registerEventType())
+
+    def __init__(self, pressed, timestamp):
+        super().__init__(ModifierEvent.TYPE)
+        self.pressed = pressed
+        self.timestamp = timestamp
+
+
+class HotkeyEvent(QEvent):
+    """
+    全局热键触发事件，callback 在 Qt 主线程中执行
+    """
+    TYPE = QEvent.Type(QEvent.registerEventType())
+
+    def __init__(self, callback):
+        super().__init__(HotkeyEvent.TYPE)
+        self.callback = callback
+
+
+class InputBackend:
+    """
+    全局修饰键/热键输入后端基类
+    子类在钩子回调或后台线程中检测按键变化，以事件形式投递到 Qt 事件循环
+    """
+    name = 'base'
+
+    def __init__(self):
+        self.receiver = None
+        self.ctrl_pressed = False
+        self.hotkeys = {}  # 组合键 -> 回调
+
+    def start(self, receiver):
+        self.receiver = receiver
+
+    def stop(self):
+        self.receiver = None
+
+    def pause(self):
+        """
+        窗口挂起期间暂停；钩子和后台线程由按键事件驱动，空闲时本来就不唤醒，不需要做任何事
+        """
+
+    def resume(self):
+        pass
+
+    def add_hotkey(self, combo, callback):
+        self.hotkeys[combo] = callback
 
-    def _anim_step(self):
-        # 简单推进动画进度
-        if self._anim_progress < 1.0:
-            self._anim_progress = min(1.0, self._anim_progress + 0.08)
-            self.update()
+    def _emit_modifier(self, pressed):
+        # 只在状态真正变化时投递事件
+        if pressed == self.ctrl_pressed or self.receiver is None:
+            return
+        self.ctrl_pressed = pressed
+        QApplication.postEvent(self.receiver, ModifierEvent(pressed, time.perf_counter()))
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+    def _emit_hotkey(self, combo):
+        callback = self.hotkeys.get(combo)
+        if callback is not None and self.receiver is not None:
+            QApplication.postEvent(self.receiver, HotkeyEvent(callback))
 
-        # 为每个 action 绘制径向渐变背景（中心到外渐变透明）
-        for action in self.actions():
-            rect = self.actionGeometry(action)
-            if rect.isValid() and not rect.isEmpty():
-                # 基础颜色（非 hover）
-                base_center_color = QColor(20, 25, 40, 220)
-                base_mid_color = QColor(20, 25, 40, 80)
-                base_edge_color = QColor(20, 25, 40, 0)
-
-                if action == self.hovered_action:
-                    # hover 时颜色更亮，且使用 anim_progress 控制强度或半径
-                    t = self._anim_progress
-                    center_alpha = int(210 * t + 120 * (1 - t))
-                    mid_alpha = int(140 * t + 50 * (1 - t))
-                    base_center_color = QColor(66, 153, 225, center_alpha)
-                    base_mid_color = QColor(66, 153, 225, mid_alpha)
-                    base_edge_color = QColor(66, 153, 225, 0)
-
-                # radial gradient 中心设在 item 的中心
-                cx = rect.x() + rect.width() / 2.0
-                cy = rect.y() + rect.height() / 2.0
-                radius = max(rect.width(), rect.height()) * (0.9 + 0.25 * self._anim_progress)
-
-                grad = QRadialGradient(cx, cy, radius, cx, cy)
-                grad.setColorAt(0.0, base_center_color)
-                grad.setColorAt(0.5, base_mid_color)
-                grad.setColorAt(1.0, base_edge_color)
-
-                # 绘制渐变背景，使用圆角矩形
-                painter.setBrush(grad)
-                painter.setPen(Qt.NoPen)  # 无边框
-                painter.drawRoundedRect(rect.adjusted(4, 2, -4, -2), 8, 8)
 
-        painter.end()
+class KeyboardHookBackend(InputBackend):
+    """
+    Windows 下使用 keyboard 库的全局键盘钩子，按键变化时立即回调
+    """
+    name = 'keyboard'
 
-        # 让 QMenu 的默认绘制继续绘制文本/图标/选中框等
-        super().paintEvent(event)
+    def __init__(self):
+        super().__init__()
+        import keyboard
+        self.keyboard = keyboard
+        self._hook = None
+        self._ctrl_keys = set()  # 当前按下的左右CTRL键
 
+    def start(self, receiver):
+        super().start(receiver)
+        self._hook = self.keyboard.hook(self._on_key)
 
+    def stop(self):
+        try:
+            if self._hook is not None:
+                self.keyboard.unhook(self._hook)
+                self._hook = None
+            self.keyboard.unhook_all_hotkeys()
+        except Exception as e:
+            print(f"注销热键失败: {e}")
+        super().stop()
 
-class Live2DWidget(QOpenGLWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.model = None  # Live2D 模型对象
-        self.resize(800, 800)  # 设置窗口大小，扩大一倍
+    def add_hotkey(self, combo, callback):
+        super().add_hotkey(combo, callback)
+        self.keyboard.add_hotkey(combo, lambda: self._emit_hotkey(combo))
 
-        # 定时器来周期性地更新模型角度
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.updateModelAngle)
-        self.timer.start(16)  # 每16毫秒更新一次，大约60FPS
+    def _on_key(self, event):
+        if event.name and 'ctrl' in event.name:
+            if event.event_type == self.keyboard.KEY_DOWN:
+                self._ctrl_keys.add(event.name)
+            else:
+                self._ctrl_keys.discard(event.name)
+            self._emit_modifier(bool(self._ctrl_keys))
 
-        # 状态变量初始化
-        self.last_cursor_pos = None
-        self.target_angle_x = 0.0
-        self.target_angle_y = 0.0
-        self.current_angle_x = 0.0
-        self.current_angle_y = 0.0
-        self.angle_smooth_speed = 0.1
 
-        self.current_expression = None  # 不使用表情避免日志输出
-        
-        # 嘴巴呼吸效果
-        self.target_mouth_open = 0.1
-        self.current_mouth_open = 0.1
-        self.mouth_smooth_speed = 0.008
-        self.breath_timer = 0
-        self.breath_interval = 120
-        self.min_open_value = 0.08
-        self.max_open_value = 0.2
-        
-        # 手臂参数
-        self.target_arm_left = -10.0
-        self.current_arm_left = -10.0
-        self.target_arm_right = -10.0
-        self.current_arm_right = -10.0
-        
-        # 眨眼效果
-        self.eye_open = 1.0
-        self.target_eye_open = 1.0
-        self.eye_smooth_speed = 0.15
-        self.blink_timer = 0
-        self.blink_interval = random.randint(300, 600)
-        
-        # 手臂固定相关变量
-        self.current_arm_left = -10.0  # 当前左手臂旋转角度（初始为-10）
-        self.current_arm_right = -10.0  # 当前右手臂旋转角度（初始为-10）
-        
-        # CTRL+鼠标按下状态标志
-        self.is_ctrl_mouse_pressed = False
+class EvdevBackend(InputBackend):
+    """
+    Linux 下直接读取 evdev 键盘设备，在后台线程中等待按键事件
+    devices: 可选的设备列表（需提供 fileno()、read() 和 close()），默认自动查找所有键盘；
+    只有自动查找时才会在键盘全部断开后重新查找
+    """
+    name = 'evdev'
 
+    def __init__(self, devices=None):
+        super().__init__()
+        self.scan = self.find_keyboards if devices is None else None
+        self.devices = devices if devices is not None else self.find_keyboards()
+        if not self.devices:
+            raise OSError("没有可读取的键盘设备")
+        self.disconnects = 0
+        self._ctrl_keys = set()
+        self._hotkey_codes = {}  # 按键编码 -> 组合键
+        self._thread = None
+        self._wake_r, self._wake_w = os.pipe()
 
+    @staticmethod
+    def find_keyboards():
+        import evdev
+        keyboards = []
+        for path in evdev.list_devices():
+            try:
+                device = evdev.InputDevice(path)
+            except OSError:
+                continue
+            if KEY_LEFTCTRL in device.capabilities().get(EV_KEY, []):
+                keyboards.append(device)
+            else:
+                device.close()
+        return keyboards
 
-    def initializeGL(self):
-        """
-        初始化 OpenGL 和 Live2D 环境
-        """
-        try:
-            live2d.glInit()
-            live2d.init()
+    def start(self, receiver):
+        super().start(receiver)
+        self._thread = threading.Thread(target=self._run, name='evdev-input', daemon=True)
+        self._thread.start()
 
-            # 加载模型
-            self.model = live2d.LAppModel()
-            model_path = os.path.join(MODEL_PATH, 'sef.model3.json')
-            self.model.LoadModelJson(model_path)
-            self.model.Resize(self.width(), self.height())  # 设置模型的初始大小
+    def stop(self):
+        if self._thread is not None:
+            os.write(self._wake_w, b'x')
+            self._thread.join(1.0)
+            self._thread = None
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+        super().stop()
 
-        except Exception as e:
-            QMessageBox.critical(self, "加载模型失败", f"模型文件加载失败: {e}")
+    def add_hotkey(self, combo, callback):
+        # 只支持 ctrl+<键> 形式的组合键
+        modifier, _, key = combo.partition('+')
+        if modifier != 'ctrl' or key not in EVDEV_KEY_CODES:
+            print(f"注册热键失败: 不支持的组合键 {combo}")
             return
+        super().add_hotkey(combo, callback)
+        self._hotkey_codes[EVDEV_KEY_CODES[key]] = combo
 
-    def resizeGL(self, width, height):
-        """
-        窗口大小变化时，更新 OpenGL 视口
-        """
-        glViewport(0, 0, width, height)
-        if self.model:
-            self.model.Resize(width, height)  # 确保模型已加载再调整大小
-
-    def paintGL(self):
-        """
-        每帧绘制模型
-        """
-        glClearColor(0, 0, 0, 0)  # 设置清除颜色为透明
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        if self.model:  # 确保模型已加载后才执行更新和绘制
-
-            if self.current_expression is not None:
-                self.model.SetExpression(self.current_expression)
-            self.model.Update()  # 更新模型（基于参数）
-            # 确保在每帧渲染之前重设模型的角度
-            self.model.SetParameterValue("ParamAngleX", self.current_angle_x, 1.0)
-            self.model.SetParameterValue("ParamAngleY", self.current_angle_y, 1.0)
-            
-            # 设置瞳孔左右移动参数
-            if hasattr(self, 'current_eyeball_x'):
-                self.model.SetParameterValue("ParamEyeBallX", self.current_eyeball_x, 1.0)
-                # 大多数Live2D模型也有垂直瞳孔移动参数，这里一并设置
-                # 垂直移动通常较水平移动幅度小
-                if hasattr(self, 'current_angle_y'):
-                    # 将头部Y角度转换为瞳孔Y移动，使用较小的系数
-                    eyeball_y = self.current_angle_y * 0.03
-                    self.model.SetParameterValue("ParamEyeBallY", eyeball_y, 1.0)
-            
-            # 添加身体旋转参数绑定，优化参数比例使效果更自然
-            body_angle_x = self.current_angle_x * 0.25  # 身体X轴旋转（较小幅度）
-            body_angle_y = self.current_angle_y * 0.2   # 身体Y轴旋转（更小幅度）
-            # 改进Z轴旋转计算，结合X和Y角度，创造更自然的扭转效果
-            body_angle_z = (self.current_angle_x * 0.15) + (self.current_angle_y * 0.05)
-            
-            self.model.SetParameterValue("ParamBodyAngleX", body_angle_x, 1.0)
-            self.model.SetParameterValue("ParamBodyAngleY", body_angle_y, 1.0)
-            self.model.SetParameterValue("ParamBodyAngleZ", body_angle_z, 1.0)
-            
-            # 设置嘴巴开闭参数
-            self.model.SetParameterValue("ParamMouthOpenY", self.current_mouth_open, 1.0)
-            
-            # 设置眼睛开闭参数 - 左右眼使用相同的值
-            self.model.SetParameterValue("ParamEyeLOpen", self.eye_open, 1.0)
-            self.model.SetParameterValue("ParamEyeROpen", self.eye_open, 1.0)
-            
-            # 设置手臂旋转参数
-            self.model.SetParameterValue("ParamShoulderLRotation", self.current_arm_left, 1.0)
-            self.model.SetParameterValue("ParamShoulderRRotation", self.current_arm_right, 1.0)
+    def _run(self):
+        devices = {device.fileno(): device for device in self.devices}
+        delay = EVDEV_RESCAN_DELAY
+        while True:
+            if not devices:
+                # 键盘全部断开：按退避间隔重新查找，等待期间只被停止信号唤醒
+                readable, _, _ = select.select([self._wake_r], [], [], delay)
+                if readable:
+                    return
+                devices = {device.fileno(): device for device in self._rescan()}
+                delay = EVDEV_RESCAN_DELAY if devices else min(delay * 2, EVDEV_RESCAN_MAX_DELAY)
+                self.devices = list(devices.values())
+                continue
+            readable, _, _ = select.select(list(devices) + [self._wake_r], [], [])
+            if self._wake_r in readable:
+                return
+            for fd in readable:
+                try:
+                    events = list(devices[fd].read())
+                except BlockingIOError:
+                    continue
+                except OSError as e:
+                    # 设备拔出后（ENODEV）select 会一直报告可读，必须关闭并移除，否则线程会空转
+                    print(f"键盘设备已断开: {e}")
+                    self._drop_device(devices.pop(fd))
+                    self.devices = list(devices.values())
+                    continue
+                for event in events:
+                    self.handle_event(event)
 
-            self.model.Draw()  # 绘制模型
-            self.update()
+    def _drop_device(self, device):
+        self.disconnects += 1
+        try:
+            device.close()
+        except OSError:
+            pass
+        # 断开时可能正按着 CTRL，之后再也收不到松开事件
+        if self._ctrl_keys:
+            self._ctrl_keys.clear()
+            self._emit_modifier(False)
 
+    def _rescan(self):
+        if self.scan is None:
+            return []
+        try:
+            return self.scan()
+        except OSError as e:
+            print(f"查找键盘设备失败: {e}")
+            return []
 
-    def updateModelAngle(self):
+    def handle_event(self, event):
         """
-        根据光标位置更新模型角度、瞳孔移动和手臂旋转，加入平滑过渡和缓冲效果
-        同时实现嘴巴开闭的随机呼吸效果
+        处理一个 evdev 事件：value 1 按下，0 松开，2 自动重复
         """
-        if self.model:
-            # 获取当前鼠标位置
-            cursor_pos = QCursor.pos()
-
-            # 计算光标在窗口内的相对位置
-            window_pos = self.mapFromGlobal(cursor_pos)
-
-            # 更新光标位置
-            self.last_cursor_pos = window_pos
-
-            # 获取窗口的大小
-            window_width = self.width()
-            window_height = self.height()
-
-            # 将光标位置映射到 [-30.0, 30.0] 范围内
-            # 修复左右方向反转问题，移除target_angle_x前的负号
-            target_angle_x = round((window_pos.x() / window_width) * 60.0 - 30.0, 1)  # 映射到 [-30.0, 30.0] 范围
-            target_angle_y = round(- (window_pos.y() / window_height) * 60.0 + 30.0, 1)  # 映射到 [-30.0, 30.0] 范围
-            
-            # 计算瞳孔左右移动参数 - 将光标位置映射到瞳孔移动范围 [-1.0, 1.0]
-            # 瞳孔移动通常比头部转动更敏感，这里使用0.8的系数稍微降低敏感度
-            target_eyeball_x = round(((window_pos.x() / window_width) * 2.0 - 1.0) * 0.8, 2)
-            
-            # 根据鼠标位置计算手臂旋转角度
-            # 当鼠标向左移动时，左臂向内旋转(负角度)，右臂向外旋转(正角度)
-            # 当鼠标向右移动时，左臂向外旋转(正角度)，右臂向内旋转(负角度)
-            # 手臂旋转幅度为头部的1/4，使动作更自然
-            arm_rotation_factor = 0.25
-            target_arm_left = -target_angle_x * arm_rotation_factor  # 左臂旋转方向与头部相反
-            target_arm_right = target_angle_x * arm_rotation_factor  # 右臂旋转方向与头部相同
-
-            # 设置缓冲系数，这个值控制平滑过渡的速度
-            smoothing_factor = 0.1  # 增大此值可使动画响应更平滑
-
-            # 平滑过渡角度
-            self.target_angle_x = target_angle_x
-            self.target_angle_y = target_angle_y
-            
-            # 平滑过渡瞳孔位置（使用略大的平滑系数使瞳孔移动更自然）
-            if not hasattr(self, 'target_eyeball_x'):
-                self.target_eyeball_x = 0.0
-                self.current_eyeball_x = 0.0
-            self.target_eyeball_x = target_eyeball_x
-            
-            # 初始化手臂目标角度
-            if not hasattr(self, 'target_arm_left'):
-                self.target_arm_left = -10.0
-            if not hasattr(self, 'target_arm_right'):
-                self.target_arm_right = -10.0
-            
-            # 检查是否按住CTRL+鼠标，如果是则设置特殊效果
-            if self.is_ctrl_mouse_pressed:
-                # 设置眼睛关闭
-                self.target_eye_open = 0.0
-                # 设置手臂参数为最小值
-                self.target_arm_left = -15.0
-                self.target_arm_right = -15.0
-                # 设置嘴巴闭合并取最小值
-                self.target_mouth_open = self.min_open_value
+        if event.type != EV_KEY:
+            return
+        if event.code in (KEY_LEFTCTRL, KEY_RIGHTCTRL):
+            if event.value:
+                self._ctrl_keys.add(event.code)
             else:
-                # 正常模式下更新手臂角度
-                if abs(target_arm_left) > 0.1 or abs(target_arm_right) > 0.1:
-                    self.target_arm_left = target_arm_left
-                    self.target_arm_right = target_arm_right
-
-            # 使用插值方法（线性插值）平滑过渡角度、瞳孔位置和手臂旋转
-            self.current_angle_x += (self.target_angle_x - self.current_angle_x) * smoothing_factor
-            self.current_angle_y += (self.target_angle_y - self.current_angle_y) * smoothing_factor
-            self.current_eyeball_x += (self.target_eyeball_x - self.current_eyeball_x) * (smoothing_factor * 1.2)
-            # 手臂旋转使用略小的平滑系数，使动作更迟缓一些
-            self.current_arm_left += (self.target_arm_left - self.current_arm_left) * (smoothing_factor * 0.8)
-            self.current_arm_right += (self.target_arm_right - self.current_arm_right) * (smoothing_factor * 0.8)
-
-            # 确保模型的角度不会超过指定的范围
-            self.current_angle_x = max(min(self.current_angle_x, 30.0), -30.0)
-            self.current_angle_y = max(min(self.current_angle_y, 30.0), -30.0)
-            # 确保瞳孔移动在合理范围内
-            self.current_eyeball_x = max(min(self.current_eyeball_x, 1.0), -1.0)
-            # 确保手臂旋转在合理范围内（正方向不超过0度，负方向可以到-15.0度）
-            self.current_arm_left = max(min(self.current_arm_left, 0), -15.0)
-            self.current_arm_right = max(min(self.current_arm_right, 0), -15.0)
-            
-            # 嘴巴呼吸效果已经在非CTRL+鼠标按下状态中处理
-            
-            # 平滑过渡
-            self.current_mouth_open += (self.target_mouth_open - self.current_mouth_open) * self.mouth_smooth_speed
-            self.current_mouth_open = max(min(self.current_mouth_open, self.max_open_value), self.min_open_value)
-            
-            # 只有在非CTRL+鼠标按下状态时才执行正常眨眼和呼吸逻辑
-            if not self.is_ctrl_mouse_pressed:
-                # 眨眼效果
-                self.blink_timer += 1
-                if self.blink_timer >= self.blink_interval:
-                    self.blink_timer = 0
-                    self.target_eye_open = 0.0
-                    self.blink_interval = random.randint(120, 480)
-                
-                # 眨眼过程控制
-                if self.target_eye_open == 0.0 and self.eye_open < 0.1:
-                    if self.blink_timer < random.randint(10, 20):
-                        self.target_eye_open = 0.0
-                    else:
-                        self.target_eye_open = 1.0
-                
-                # 嘴巴呼吸效果
-                self.breath_timer += 1
-                if self.breath_timer >= self.breath_interval:
-                    self.breath_timer = 0
-                    change_amount = random.uniform(-0.15, 0.15)
-                    self.target_mouth_open += change_amount
-                    self.target_mouth_open = max(min(self.target_mouth_open, self.max_open_value), self.min_open_value)
-                    self.breath_interval = random.randint(90, 180)
-            
-            # 平滑过渡眼睛
-            self.eye_open += (self.target_eye_open - self.eye_open) * self.eye_smooth_speed
-            self.eye_open = max(min(self.eye_open, 1.0), 0.0)
-            
-
-
-def set_window_transparent_for_mouse_events(hwnd, transparent):
-    """
-    使用Win32 API设置窗口的鼠标穿透属性
-    hwnd: 窗口句柄
-    transparent: 是否启用鼠标穿透
+                self._ctrl_keys.discard(event.code)
+            self._emit_modifier(bool(self._ctrl_keys))
+        elif event.value == 1 and self._ctrl_keys and event.code in self._hotkey_codes:
+            self._emit_hotkey(self._hotkey_codes[event.code])
+
+
+class PollingBackend(InputBackend):
+    """
+    没有全局钩子可用时的后备方案：定时查询 Qt 的键盘修饰键状态，不支持全局热键
+    """
+    name = 'polling'
+
+    def __init__(self, interval_ms=50):
+        super().__init__()
+        self.timer = QTimer()
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._poll)
+        self.polls = 0
+
+    def start(self, receiver):
+        super().start(receiver)
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+        super().stop()
+
+    def pause(self):
+        self.timer.stop()
+
+    def resume(self):
+        # 挂起期间 CTRL 的状态可能已经变化，恢复时立即查询一次
+        if self.receiver is not None:
+            self.timer.start()
+            self._poll()
+
+    def add_hotkey(self, combo, callback):
+        print(f"注册热键失败: 当前输入后端不支持全局热键 {combo}")
+
+    def _poll(self):
+        self.polls += 1
+        self._emit_modifier(bool(QApplication.queryKeyboardModifiers() & Qt.ControlModifier))
+
+
+def create_input_backend():
+    """
+    按平台选择输入后端，不可用时退回到轮询
     """
     try:
-        # 获取当前窗口样式
-        style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-        
-        # 使用SetWindowLongPtr替代SetWindowLong，以支持64位系统
-        if hasattr(win32gui, 'SetWindowLongPtr'):
-            set_window_long = win32gui.SetWindowLongPtr
-        else:
-            set_window_long = win32gui.SetWindowLong
-        
-        if transparent:
-            # 添加WS_EX_TRANSPARENT样式使鼠标事件穿透到下层窗口
-            if not (style & win32con.WS_EX_TRANSPARENT):
-                style |= win32con.WS_EX_TRANSPARENT
-                set_window_long(hwnd, win32con.GWL_EXSTYLE, style)
-        
-        else:
-            # 移除WS_EX_TRANSPARENT样式
-            if style & win32con.WS_EX_TRANSPARENT:
-                style &= ~win32con.WS_EX_TRANSPARENT
-                set_window_long(hwnd, win32con.GWL_EXSTYLE, style)
-        
-        
-        # 强制重绘窗口以确保样式变更生效
-        win32gui.SetWindowPos(hwnd, None, 0, 0, 0, 0,
-                             win32con.SWP_NOMOVE | win32con.SWP_NOSIZE | 
-                             win32con.SWP_NOZORDER | win32con.SWP_FRAMECHANGED)
+        if sys.platform == 'win32':
+            return KeyboardHookBackend()
+        if sys.platform.startswith('linux'):
+            return EvdevBackend()
     except Exception as e:
-        pass
+        print(f"全局键盘钩子不可用，改为轮询: {e}")
+    return PollingBackend()
+
 
 class Live2DWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, index=0):
+        """
+        index: 多个宠物窗口时的序号，依次向左排开，只有第一个窗口创建系统托盘图标
+        """
         super().__init__()
+        self.index = index
         self.setWindowTitle("SpacervalLam")  # 设置窗口标题
         
         # 窗口大小设置
@@ -415,7 +4207,7 @@ class Live2DWindow(QMainWindow):
         screen_height = screen_rect.height()
         
         # 计算右下角位置（减去窗口宽度和高度，并向下移动一些）
-        pos_x = screen_width - window_width
+        pos_x = screen_width - window_width - index * (window_width // 2)
         pos_y = screen_height - window_height + 45
         
         # 设置窗口位置和大小（右下角）
@@ -432,42 +4224,127 @@ class Live2DWindow(QMainWindow):
         
         # 鼠标穿透状态标志
         self.is_mouse_transparent = True
-        
-        # 创建定时器来检测CTRL键状态
-        self.ctrl_timer = QTimer(self)
-        self.ctrl_timer.timeout.connect(self.check_ctrl_state)
-        self.ctrl_timer.start(50)  # 每50毫秒检查一次
+        self.is_ctrl_pressed = False
+
+        # 全局输入后端：CTRL键状态变化以事件形式送达，记录切换延迟（毫秒）
+        # 热键和系统托盘不影响宠物显示，在第一帧呈现后才初始化（见 finish_startup）
+        self.input_backend = None
+        self.input_latency = deque(maxlen=256)
+        self.tray_icon = None
+
+        # 离开动画在启动完成后于后台解码，按下再见时直接播放
+        self.leaving_loader = None
+        self.leaving_animation = None
+        self.closing = False
 
         # 创建并设置 OpenGL Widget
         self.live2d_widget = Live2DWidget(self)
+        self.live2d_widget.first_frame_presented.connect(self.schedule_finish_startup)
+        self.live2d_widget.hit_changed.connect(self.update_click_through)
         self.setCentralWidget(self.live2d_widget)
 
+        # 自动裁剪：canvas 是用户选择的窗口尺寸（模型按它布局），crop 是窗口实际覆盖的画布区域
+        self.canvas = (window_width, window_height)
+        self.crop = QRect(0, 0, window_width, window_height)
+        self.crop_controller = CropController()
+        self.crop_changes = 0
+        self.live2d_widget.set_canvas(window_width, window_height, 0, 0)
+        self.live2d_widget.mask_updated.connect(self.update_crop)
+        # 等待缩小期间内容可能不再变化（不再有新的掩码），由定时器再检查一次
+        self.crop_timer = QTimer(self)
+        self.crop_timer.setSingleShot(True)
+        self.crop_timer.setInterval(int(CROP_SETTLE * 1000))
+        self.crop_timer.timeout.connect(self.update_crop)
+
+        # 窗口隐藏或最小化、被完全遮挡、屏幕锁定时挂起宠物，挂起期间同时暂停输入轮询
+        self.lock_monitor = None  # 屏幕锁定监视，在第一帧呈现后创建
+        self.live2d_widget.suspended_changed.connect(self.on_suspended_changed)
+
         # 显示窗口
         self.show()
         
-        # 窗口显示后，应用初始的鼠标穿透设置
+        # 窗口显示后（原生窗口已创建），创建平台窗口集成并应用初始的鼠标穿透设置
+        self.window_integration = create_window_integration(self)
         self.apply_mouse_transparency(self.is_mouse_transparent)
 
-        # 注册CTRL+space热键触发再见功能
-        try:
-            # 使用lambda和Qt的信号槽机制确保在主线程执行
-            keyboard.add_hotkey('ctrl+space', lambda: QTimer.singleShot(0, self.close_program))
-        except Exception as e:
-            print(f"注册热键失败: {e}")
+        # 原生窗口的 Expose 事件反映窗口是否还有可见部分
+        self.window_handle = self.windowHandle()
+        self.window_handle.installEventFilter(self)
 
         # 用于存储鼠标点击的起始位置
         self.drag_position = QPoint()
         self.is_resizing = False  # 用于控制是否处于调整大小模式
 
+        # Ctrl+滚轮缩放：累积的滚轮位移每帧最多应用一次，停止滚动后再做真正的尺寸调整
+        self.wheel_delta = 0.0
+        self.wheel_timer = QTimer(self)
+        self.wheel_timer.setSingleShot(True)
+        self.wheel_timer.setInterval(RENDER_INTERVAL_MS)
+        self.wheel_timer.timeout.connect(self.apply_wheel_resize)
+        self.resize_settle_timer = QTimer(self)
+        self.resize_settle_timer.setSingleShot(True)
+        self.resize_settle_timer.setInterval(RESIZE_SETTLE_MS)
+        self.resize_settle_timer.timeout.connect(self.finish_wheel_resize)
+
         # 限制最大尺寸
         self.max_width = 2200
         self.max_height = 2200
 
-        # 表情状态变量，初始为expression0
-        self.current_expression = 'expression0'
-        
+        # 表情状态变量，初始不使用表情
+        self.current_expression = None
+
+        # GL 初始化失败时不会有帧呈现，超时后仍然完成剩余的初始化
+        QTimer.singleShot(DEFERRED_INIT_TIMEOUT_MS, self.finish_startup)
+        STARTUP.mark('window created')
+
+    def schedule_finish_startup(self):
+        # 让出事件循环，先完成第一帧之后排队的工作
+        QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """
+        第一帧呈现后再初始化非关键部分：全局热键/CTRL 监听和系统托盘
+        """
+        if self.input_backend is not None:
+            return
+        self.start_leaving_decode()
+
+        # 注册CTRL+space热键触发再见功能，回调通过事件在主线程执行
+        self.input_backend = create_input_backend()
+        try:
+            self.input_backend.add_hotkey('ctrl+space', self.close_program)
+            self.input_backend.start(self)
+            if self.live2d_widget.power.suspended:
+                self.input_backend.pause()
+        except Exception as e:
+            print(f"注册热键失败: {e}")
+        STARTUP.mark('input backend started')
+
+        self.lock_monitor = create_session_lock_monitor(self)
+        self.lock_monitor.locked_changed.connect(self.on_locked_changed)
+
         # 设置系统托盘图标
-        self.setup_system_tray()
+        if self.index == 0:
+            self.setup_system_tray()
+        STARTUP.mark('deferred init')
+
+    def start_leaving_decode(self):
+        """
+        在后台线程中解码离开动画
+        """
+        if self.leaving_loader is not None:
+            return
+        self.leaving_loader = LeavingAnimationLoader(LEAVING_GIF_PATH, self)
+        self.leaving_loader.loaded.connect(self.on_leaving_ready)
+        self.leaving_loader.start()
+
+    def on_leaving_ready(self, animation):
+        if animation.error is not None:
+            print(f"加载离开动画失败: {animation.error}")
+        self.leaving_animation = animation
+        STARTUP.mark('leaving animation decoded')
+        if self.closing:
+            self.play_leaving()
 
     def setup_system_tray(self):
         """
@@ -483,7 +4360,6 @@ class Live2DWindow(QMainWindow):
             self.tray_icon.setIcon(QIcon(preview_path))
         else:
             # 创建一个简单的红色图标作为默认图标
-            from PyQt5.QtGui import QPixmap
             pixmap = QPixmap(24, 24)
             pixmap.fill(QColor(255, 0, 0))
             self.tray_icon.setIcon(QIcon(pixmap))
@@ -516,11 +4392,22 @@ class Live2DWindow(QMainWindow):
         
         exit_action = QAction("再见", self)
         exit_action.triggered.connect(self.close_program)
+
+        # 帧耗时记录：打开/关闭记录，以及把当前窗口内的统计导出到文件
+        self.profile_action = QAction("记录帧耗时", self)
+        self.profile_action.setCheckable(True)
+        self.profile_action.setChecked(self.live2d_widget.profiler.enabled)
+        self.profile_action.toggled.connect(self.set_profiling)
+        dump_action = QAction("导出帧耗时", self)
+        dump_action.triggered.connect(self.dump_metrics)
         
         # 添加菜单项到菜单
         self.tray_menu.addSeparator()
         self.tray_menu.addAction(expression_action)
         self.tray_menu.addSeparator()
+        self.tray_menu.addAction(self.profile_action)
+        self.tray_menu.addAction(dump_action)
+        self.tray_menu.addSeparator()
         self.tray_menu.addAction(help_action)
         self.tray_menu.addSeparator()
         self.tray_menu.addAction(exit_action)
@@ -528,6 +4415,37 @@ class Live2DWindow(QMainWindow):
         # 设置系统托盘菜单
         self.tray_icon.setContextMenu(self.tray_menu)
     
+    def pet_windows(self):
+        return [w for w in QApplication.topLevelWidgets() if isinstance(w, Live2DWindow)]
+
+    def set_profiling(self, enabled):
+        """
+        打开或关闭所有宠物窗口的帧耗时记录
+        """
+        for window in self.pet_windows():
+            window.live2d_widget.profiler.enabled = enabled
+
+    def dump_metrics(self):
+        """
+        把所有宠物窗口的帧耗时统计以 Prometheus 文本格式写入缓存目录
+        """
+        windows = self.pet_windows()
+        if not any(window.live2d_widget.profiler.enabled for window in windows):
+            self.profile_action.setChecked(True)
+            self.tray_icon.showMessage("SpacervalLam", "已开始记录帧耗时，稍后再导出")
+            return
+        for window in windows:
+            window.live2d_widget.refresh_metrics()
+        path = os.path.join(CACHE_DIR, time.strftime('frame-metrics-%Y%m%d-%H%M%S.prom'))
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(render_metrics(metric_sources(windows)))
+        except OSError as e:
+            self.tray_icon.showMessage("SpacervalLam", f"导出失败: {e}", QSystemTrayIcon.Warning)
+            return
+        self.tray_icon.showMessage("SpacervalLam", f"帧耗时已导出到 {path}")
+
     def on_tray_activated(self, reason):
         """
         系统托盘图标被激活时的处理
@@ -535,9 +4453,11 @@ class Live2DWindow(QMainWindow):
         # 不做任何操作，移除双击显示/隐藏的功能
     
     def unregister_hotkeys(self):
-        # 注销所有注册的热键
+        # 停止输入后端并注销所有注册的热键
+        if self.input_backend is None:
+            return
         try:
-            keyboard.unhook_all_hotkeys()
+            self.input_backend.stop()
         except Exception as e:
             print(f"注销热键失败: {e}")
 
@@ -546,42 +4466,174 @@ class Live2DWindow(QMainWindow):
         关闭事件，清理资源
         """
         # 在关闭时隐藏系统托盘图标
-        if self.tray_icon.isVisible():
+        if self.tray_icon is not None and self.tray_icon.isVisible():
             self.tray_icon.hide()
         
         self.unregister_hotkeys()
-        live2d.dispose()  # 释放 Live2D 模型资源
+        if self.lock_monitor is not None:
+            self.lock_monitor.stop()
+        self.live2d_widget.release_model()
+        GL_SHARE.detach(self.live2d_widget)  # 最后一个窗口关闭时释放 Live2D 资源
         event.accept()
 
-    def check_ctrl_state(self):
+    def event(self, event):
         """
-        检测CTRL键的状态并相应地更新窗口的鼠标穿透属性
+        处理输入后端投递的CTRL键状态事件和热键事件
         """
-        # 获取当前是否按住CTRL键（使用keyboard库检测，更准确）
-        is_ctrl_pressed = keyboard.is_pressed('ctrl')
-        
-        # 检查是否需要改变穿透状态
-        if is_ctrl_pressed and self.is_mouse_transparent:
-            # 按住CTRL键，关闭穿透
-    
-            self.is_mouse_transparent = False
-            self.setAttribute(Qt.WA_TransparentForMouseEvents, False)
-            self.apply_mouse_transparency(False)
-        elif not is_ctrl_pressed and not self.is_mouse_transparent:
-            # 未按住CTRL键，开启穿透
-    
-            self.is_mouse_transparent = True
-            self.setAttribute(Qt.WA_TransparentForMouseEvents, True)
-            self.apply_mouse_transparency(True)
-    
+        if event.type() == ModifierEvent.TYPE:
+            self.set_ctrl_state(event.pressed)
+            self.input_latency.append((time.perf_counter() - event.timestamp) * 1000.0)
+            return True
+        if event.type() == HotkeyEvent.TYPE:
+            event.callback()
+            return True
+        return super().event(event)
+
+    def nativeEvent(self, event_type, message):
+        if self.lock_monitor is not None:
+            self.lock_monitor.native_event(event_type, message)
+        return super().nativeEvent(event_type, message)
+
+    def eventFilter(self, obj, event):
+        if obj is self.window_handle and event.type() == QEvent.Expose:
+            # 窗口可见但没有任何部分露出（被其他窗口完全覆盖）时视为被遮挡
+            occluded = self.isVisible() and not self.isMinimized() and not self.window_handle.isExposed()
+            self.live2d_widget.set_power_reason('occluded', occluded)
+        return super().eventFilter(obj, event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.live2d_widget.set_power_reason('hidden', self.isMinimized())
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.live2d_widget.set_power_reason('hidden', True)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            self.live2d_widget.set_power_reason('hidden', self.isMinimized() or not self.isVisible())
+        super().changeEvent(event)
+
+    def on_locked_changed(self, locked):
+        self.live2d_widget.set_power_reason('locked', locked)
+
+    def on_suspended_changed(self, suspended):
+        """
+        宠物挂起时暂停输入后端的轮询，恢复时立即重新查询
+        """
+        if self.input_backend is None:
+            return
+        if suspended:
+            self.input_backend.pause()
+        else:
+            self.input_backend.resume()
+
+    def set_ctrl_state(self, is_ctrl_pressed):
+        """
+        根据CTRL键的状态相应地更新窗口的鼠标穿透属性
+        """
+        if is_ctrl_pressed and not self.is_ctrl_pressed:
+            # 按住CTRL键，唤醒动画（同时恢复高频光标采样，及时更新命中判断）
+            self.live2d_widget.wake()
+        self.is_ctrl_pressed = is_ctrl_pressed
+        self.update_click_through()
+
+    def update_click_through(self, *args):
+        """
+        按住CTRL键且光标位于宠物实际绘制的区域上（或正在拖动）时才响应鼠标，其余情况穿透
+        """
+        widget = self.live2d_widget
+        transparent = not (self.is_ctrl_pressed and (widget.cursor_hit or widget.anim.is_ctrl_mouse_pressed))
+        if transparent != self.is_mouse_transparent:
+            self.is_mouse_transparent = transparent
+            self.apply_mouse_transparency(transparent)
+
+    def input_latency_stats(self):
+        """
+        CTRL键从检测到变化到穿透状态切换完成的延迟统计（毫秒）
+        """
+        samples = sorted(self.input_latency)
+        backend = self.input_backend.name if self.input_backend is not None else None
+        if not samples:
+            return {'backend': backend, 'count': 0}
+        return {
+            'backend': backend,
+            'count': len(samples),
+            'mean': sum(samples) / len(samples),
+            'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            'max': samples[-1],
+        }
+
+    def canvas_origin(self):
+        """
+        画布左上角的屏幕坐标
+        """
+        return self.geometry().topLeft() - self.crop.topLeft()
+
+    def set_canvas_size(self, width, height):
+        """
+        调整画布尺寸（画布左上角不动），同时取消裁剪，等新的掩码再重新裁剪
+        """
+        origin = self.canvas_origin()
+        self.canvas = (width, height)
+        self.crop = QRect(0, 0, width, height)
+        self.crop_controller.reset()
+        self.live2d_widget.set_canvas(width, height, 0, 0)
+        self.setGeometry(origin.x(), origin.y(), width, height)
+
+    def apply_crop(self, rect):
+        """
+        把窗口裁剪到画布中的 rect，宠物在屏幕上的位置不变
+        """
+        origin = self.canvas_origin()
+        self.crop = rect
+        self.crop_changes += 1
+        self.live2d_widget.set_canvas(self.canvas[0], self.canvas[1], rect.x(), rect.y())
+        self.setGeometry(origin.x() + rect.x(), origin.y() + rect.y(), rect.width(), rect.height())
+
+    def reset_crop(self):
+        """
+        恢复为整个画布
+        """
+        if self.crop != QRect(0, 0, *self.canvas):
+            self.crop_controller.reset()
+            self.apply_crop(QRect(0, 0, *self.canvas))
+
+    def update_crop(self):
+        """
+        命中掩码更新后，按模型的包围盒重新计算裁剪；拖动和缩放期间不调整
+        """
+        widget = self.live2d_widget
+        if widget.live_resize or widget.anim.is_ctrl_mouse_pressed or widget.resource is None:
+            return
+        crop = (self.crop.x(), self.crop.y(), self.crop.width(), self.crop.height())
+        target = self.crop_controller.update(widget.drawable_bounds(), crop, self.canvas[0], self.canvas[1],
+                                             widget.clock())
+        if target is not None:
+            self.apply_crop(QRect(*target))
+        if self.crop_controller.shrink_since is not None and not self.crop_timer.isActive():
+            self.crop_timer.start()
+
+    def composited_stats(self):
+        """
+        合成器需要混合的窗口面积（像素）与不裁剪时的对比
+        """
+        canvas_px = self.canvas[0] * self.canvas[1]
+        window_px = self.crop.width() * self.crop.height()
+        return {
+            'canvas_px': canvas_px,
+            'window_px': window_px,
+            'saved_ratio': 1.0 - window_px / canvas_px,
+            'crop_changes': self.crop_changes,
+        }
+
     def apply_mouse_transparency(self, transparent):
         """
-        应用鼠标穿透设置
+        应用鼠标穿透设置，状态没有变化时不做任何操作
         """
-        # 获取窗口句柄
-        hwnd = int(self.winId())
-        # 设置窗口的鼠标穿透属性
-        set_window_transparent_for_mouse_events(hwnd, transparent)
+        if self.testAttribute(Qt.WA_TransparentForMouseEvents) != transparent:
+            self.setAttribute(Qt.WA_TransparentForMouseEvents, transparent)
+        self.window_integration.set_click_through(transparent)
     
     def mousePressEvent(self, event):
         """
@@ -595,7 +4647,8 @@ class Live2DWindow(QMainWindow):
                 self.is_resizing = False  # 按下时不调整大小
                 # 通知Live2DWidget按下了CTRL+鼠标
                 if hasattr(self, 'live2d_widget'):
-                    self.live2d_widget.is_ctrl_mouse_pressed = True
+                    self.live2d_widget.anim.set_ctrl_mouse_pressed(True)
+                    self.live2d_widget.wake()
 
     def mouseMoveEvent(self, event):
         """
@@ -606,6 +4659,8 @@ class Live2DWindow(QMainWindow):
         if event.modifiers() == Qt.ControlModifier:
             if event.buttons() == Qt.LeftButton and not self.is_resizing:
                 self.move(event.globalPos() - self.drag_position)
+        # 鼠标移动事件也送入光标输入阶段
+        self.live2d_widget.feed_cursor(event.globalX(), event.globalY())
     
     def mouseReleaseEvent(self, event):
         """
@@ -614,12 +4669,12 @@ class Live2DWindow(QMainWindow):
         # 重置调整大小状态
         self.is_resizing = False
         # 通知Live2DWidget释放了鼠标
+        # 同时恢复眼睛睁开和嘴巴的正常状态
         if hasattr(self, 'live2d_widget'):
-            self.live2d_widget.is_ctrl_mouse_pressed = False
-            # 恢复眼睛睁开状态
-            self.live2d_widget.target_eye_open = 1.0
-            # 恢复嘴巴的正常状态
-            self.live2d_widget.target_mouth_open = 0.1
+            self.live2d_widget.anim.set_ctrl_mouse_pressed(False)
+            self.live2d_widget.wake()
+            # 拖动结束时光标可能已经不在宠物上
+            self.update_click_through()
 
     def wheelEvent(self, event):
         """
@@ -628,77 +4683,70 @@ class Live2DWindow(QMainWindow):
         """
         # 检查是否按住了CTRL键
         if event.modifiers() == Qt.ControlModifier:
-            if event.angleDelta().y() > 0:  # 上滚
-                self.resize(self.width() + 10, self.height() + 10)
-            elif event.angleDelta().y() < 0:  # 下滚
-                self.resize(self.width() - 10, self.height() - 10)
+            # 一格滚轮（120）对应 RESIZE_STEP 像素，上滚放大、下滚缩小；只累积，由定时器合并应用
+            self.wheel_delta += event.angleDelta().y() / 120.0 * RESIZE_STEP
+            self.live2d_widget.begin_live_resize()
+            if not self.wheel_timer.isActive():
+                self.wheel_timer.start()
+            self.resize_settle_timer.start()
+
+    def apply_wheel_resize(self):
+        """
+        把累积的滚轮位移一次性应用到窗口尺寸
+        """
+        step = int(self.wheel_delta)
+        if step == 0:
+            return
+        self.wheel_delta -= step
+
+        # 限制窗口大小在最大尺寸范围内（缩放的是画布，裁剪随之取消）
+        canvas_width, canvas_height = self.canvas
+        width = min(canvas_width + step, self.max_width)
+        height = min(canvas_height + step, self.max_height)
 
-            # 限制窗口大小在最大尺寸范围内
-            if self.width() > self.max_width:
-                self.resize(self.max_width, self.height())
-            if self.height() > self.max_height:
-                self.resize(self.width(), self.max_height)
+        # 防止窗口缩小到小于最小尺寸
+        if width < MIN_WINDOW_SIZE or height < MIN_WINDOW_SIZE:
+            width = height = MIN_WINDOW_SIZE
+        if (width, height) != self.canvas:
+            self.set_canvas_size(width, height)
 
-            # 防止窗口缩小到小于最小尺寸
-            if self.width() < 400 or self.height() < 400:
-                self.resize(400, 400)
+    def finish_wheel_resize(self):
+        """
+        滚轮停止一段时间后结束缩放手势
+        """
+        self.apply_wheel_resize()
+        self.wheel_delta = 0.0
+        self.live2d_widget.end_live_resize()
 
     def close_program(self):
         """
         关闭程序前先显示离开GIF
         """
-        # 隐藏Live2D模型
+        if self.closing:
+            return
+        self.closing = True
+
+        # 隐藏Live2D模型，恢复完整窗口以便居中显示GIF
         if hasattr(self, 'live2d_widget'):
-            self.live2d_widget.model = None
-            self.live2d_widget.update()
-            
-        # 创建QLabel显示GIF
-        from PyQt5.QtWidgets import QLabel
-        from PyQt5.QtGui import QMovie
-        from PyQt5.QtCore import QTimer
-        
-        # 创建标签并设置GIF
-        self.gif_label = QLabel(self)
-        gif_path = os.path.join(BASE_DIR, 'asset', 'leaving.gif')
-        self.movie = QMovie(gif_path)
-        self.gif_label.setMovie(self.movie)
-        
-        # 居中显示GIF
-        self.gif_label.setAlignment(Qt.AlignCenter)
-        
-        gif_height = self.height() - 50
-        
-        # 加载GIF
-        self.movie.jumpToFrame(0)  # 确保GIF已加载
-        if self.movie.frameCount() > 0:
+            self.live2d_widget.unload_model()
+            self.crop_timer.stop()
+            self.reset_crop()
 
-            orig_width = self.movie.frameRect().width()
-            orig_height = self.movie.frameRect().height()
-            
-            if orig_height > 0:
+        # 动画通常已在启动后解码完成；还没完成时等解码结束再播放
+        if self.leaving_animation is None:
+            self.start_leaving_decode()
+            return
+        self.play_leaving()
 
-                gif_width = int((orig_width / orig_height) * gif_height)
-            else:
-                gif_width = gif_height
-        else:
-            gif_width = gif_height
-        
-        self.gif_label.setGeometry(
-            (self.width() - gif_width) // 2 - 2,
-            28,  # 垂直顶部对齐
-            gif_width,
-            gif_height
-        )
-        
-        # 设置GIF自动缩放，但保持原始宽高比
-        self.gif_label.setScaledContents(True)
-        self.gif_label.show()
-        
-        # 启动GIF播放
-        self.movie.start()
-        
-        # 4650ms后关闭程序
-        QTimer.singleShot(4650, self.actual_close)
+    def play_leaving(self):
+        """
+        在 GL 窗口中播放离开动画，播放完毕后关闭程序
+        """
+        if not self.leaving_animation.frames:
+            self.actual_close()
+            return
+        self.live2d_widget.leaving_finished.connect(self.actual_close)
+        self.live2d_widget.play_leaving(self.leaving_animation)
 
     def actual_close(self):
         """
@@ -708,53 +4756,20 @@ class Live2DWindow(QMainWindow):
         self.unregister_hotkeys()
         
         # 清理资源
-        if self.tray_icon.isVisible():
+        if self.tray_icon is not None and self.tray_icon.isVisible():
             self.tray_icon.hide()
         
         try:
-            live2d.dispose()  # 释放 Live2D 模型资源
+            self.live2d_widget.release_model()
+            GL_SHARE.detach(self.live2d_widget)  # 最后一个窗口关闭时释放 Live2D 资源
         except:
             pass
         
-        # 停止GIF播放
-        if hasattr(self, 'movie'):
-            self.movie.stop()
-        
         # 关闭窗口并退出应用
         self.close()
         QApplication.quit()
         sys.exit()
     
-    def contextMenuEvent(self, event):
-        """
-        捕捉右键点击事件，显示右键菜单
-        右键菜单不需要CTRL键也能显示
-        美化后的菜单，只保留退出功能
-        """
-        # 临时禁用鼠标穿透，以显示右键菜单
-        self.setAttribute(Qt.WA_TransparentForMouseEvents, False)
-        self.apply_mouse_transparency(False)
-        
-        # 创建菜单并使用自定义的FancyMenu类
-        menu = FancyMenu(self)
-        
-        # 不再在这里设置样式，因为已经在FancyMenu的构造函数中设置了完整的样式
-
-        # 创建"再见"菜单项（退出功能）
-        exit_action = QAction("再见", self)
-        exit_action.setIconText("再见")  # 确保图标文本一致
-        exit_action.triggered.connect(self.close_program)  # 绑定关闭窗口的槽
-        menu.addAction(exit_action)
-
-        # 显示菜单时添加轻微动画效果
-        menu.exec_(event.globalPos())
-        
-        # 恢复鼠标穿透状态
-        self.setAttribute(Qt.WA_TransparentForMouseEvents, True)
-        self.apply_mouse_transparency(True)
-
-
-
     def show_help(self):
         """
         显示程序使用说明
@@ -768,13 +4783,13 @@ class Live2DWindow(QMainWindow):
         """
         切换表情
         """
-        if self.current_expression == 'expression0':
-            self.current_expression = 'expression1'
-        else:
-            self.current_expression = 'expression0'
+        # 依次切换模型定义的表情，最后回到不使用表情
+        names = [None] + self.live2d_widget.expression.names()
+        index = names.index(self.current_expression) if self.current_expression in names else 0
+        self.current_expression = names[(index + 1) % len(names)]
 
         # 设置新的表情
-        self.live2d_widget.current_expression = self.current_expression
+        self.live2d_widget.set_expression(self.current_expression)
     
     # 移除右键菜单事件处理，避免窗口上显示右键菜单
     def contextMenuEvent(self, event):
@@ -784,8 +4799,103 @@ class Live2DWindow(QMainWindow):
         pass  # 不显示右键菜单
 
 
+class MultiPetWindow(QMainWindow):
+    """
+    多宠物模式的窗口：一个透明、置顶、鼠标穿透的窗口中显示多个宠物，CTRL+space 退出
+    """
+
+    def __init__(self, count):
+        super().__init__()
+        self.setWindowTitle("SpacervalLam")
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setWindowFlags(self.windowFlags() | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents, True)
+
+        # 按屏幕宽度排列成网格，放在屏幕右下角
+        screen_rect = QApplication.desktop().availableGeometry()
+        columns = max(1, min(count, screen_rect.width() // PET_CELL_SIZE))
+        rows = -(-count // columns)
+        width = columns * PET_CELL_SIZE
+        height = min(rows * PET_CELL_SIZE, screen_rect.height())
+        self.setGeometry(screen_rect.right() - width + 1, screen_rect.bottom() - height + 1, width, height)
+
+        self.pets_widget = MultiPetWidget(count, parent=self)
+        self.setCentralWidget(self.pets_widget)
+        self.show()
+
+        self.window_integration = create_window_integration(self)
+        self.window_integration.set_click_through(True)
+
+        self.input_backend = create_input_backend()
+        try:
+            self.input_backend.add_hotkey('ctrl+space', self.close)
+            self.input_backend.start(self)
+        except Exception as e:
+            print(f"注册热键失败: {e}")
+
+    def event(self, event):
+        if event.type() == HotkeyEvent.TYPE:
+            event.callback()
+            return True
+        return super().event(event)
+
+    def closeEvent(self, event):
+        try:
+            self.input_backend.stop()
+        except Exception as e:
+            print(f"注销热键失败: {e}")
+        self.pets_widget.release_model()
+        GL_SHARE.detach(self.pets_widget)
+        event.accept()
+
+
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = Live2DWindow()
+    import argparse
+    parser = argparse.ArgumentParser(description="Live2D 桌面宠物")
+    parser.add_argument('--build-bundle', action='store_true', help="生成预编译模型包后退出")
+    parser.add_argument('--profile-startup', action='store_true', help="启动完成后打印启动时间线")
+    parser.add_argument('--pets', type=int, default=1, help="在同一个窗口中显示的宠物数量")
+    parser.add_argument('--windows', type=int, default=1, help="宠物窗口数量，各窗口共享 GL 资源")
+    parser.add_argument('--render-scale', type=float, nargs=2, metavar=('MIN', 'MAX'),
+                        default=(RENDER_SCALE_MIN, RENDER_SCALE_MAX),
+                        help="动态渲染分辨率的比例范围，两个值都为 1 时关闭")
+    parser.add_argument('--metrics-port', type=int, help="在 127.0.0.1 的该端口提供 Prometheus 格式的帧耗时指标")
+    parser.add_argument('--metrics-socket', help="在该 Unix 套接字上提供帧耗时指标（HTTP）")
+    parser.add_argument('--control-port', type=int, help="在 127.0.0.1 的该端口接受控制命令（每行一个 JSON）")
+    parser.add_argument('--control-socket', help="在该 Unix 套接字上接受控制命令")
+    args, qt_args = parser.parse_known_args()
+    if sys.platform == 'win32' and (args.metrics_socket or args.control_socket):
+        parser.error("Windows 不支持 Unix 套接字，请改用 --metrics-port / --control-port")
+    STARTUP.enabled = args.profile_startup
+    RENDER_SCALE_MIN, RENDER_SCALE_MAX = sorted(min(1.0, max(0.1, v)) for v in args.render_scale)
+
+    if args.build_bundle:
+        size = build_model_bundle()
+        print(f"已生成模型包 {BUNDLE_PATH}（{size / 1024:.1f} KB）")
+        sys.exit(0)
+
+    GLShareGroup.enable()
+    app = QApplication(sys.argv[:1] + qt_args)
+    STARTUP.mark('QApplication')
+    if args.pets > 1:
+        windows = [MultiPetWindow(args.pets)]
+    else:
+        windows = [Live2DWindow(i) for i in range(max(1, args.windows))]
+        if args.metrics_port is not None or args.metrics_socket:
+            # 打开帧耗时记录并在后台线程提供指标接口
+            for window in windows:
+                window.live2d_widget.profiler.enabled = True
+            try:
+                metrics = MetricsServer(lambda: metric_sources(windows), args.metrics_port, args.metrics_socket)
+            except OSError as e:
+                parser.error(f"无法打开指标接口: {e}")
+            print(f"帧耗时指标: {metrics.address}")
+        if args.control_port is not None or args.control_socket:
+            try:
+                control = ControlServer([window.live2d_widget.control for window in windows],
+                                        args.control_port, args.control_socket)
+            except OSError as e:
+                parser.error(f"无法打开控制接口: {e}")
+            print(f"控制接口: {control.address}")
     
     sys.exit(app.exec_())
@@ -7,7 +7,9 @@ setup(
     install_requires=[
         'PyQt5',
         'PyOpenGL',
-        'keyboard',
+        'numpy',
+        'keyboard; sys_platform == "win32"',
+        'evdev; sys_platform == "linux"',
     ],
     author="SpacervalLam",
     author_email="spacervallam@gmail.com",
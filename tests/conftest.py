@@ -0,0 +1,49 @@
+"""
+测试公共设置：无界面运行 Qt；没有 live2d.v3 时使用基准测试中的 LAppModel 替身导入 demo111
+"""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def demo():
+    try:
+        import live2d.v3  # noqa: F401
+    except ImportError:
+        import benchmark
+        benchmark.install_stub_backend()
+    import demo111
+    return demo111
+
+
+@pytest.fixture(scope='session')
+def qapp(demo):
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+class FakeClock:
+    """
+    手动推进的时钟，代替 time.perf_counter
+    """
+
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,107 @@
+"""
+AnimationState 的眨眼和呼吸节奏：按真实时间推进后应与原来 60 FPS 下按帧计数的节奏一致
+（眨眼首次 300~600 帧、之后 120~480 帧，闭眼 10~20 帧，呼吸首次 120 帧、之后 90~180 帧）
+"""
+import random
+
+import pytest
+
+DT = 1.0 / 60.0
+
+
+def record_events(anim, seconds, dt=DT):
+    """
+    逐帧推进 seconds 秒，记录闭眼、睁眼和呼吸变化的时间
+    """
+    closes, opens, breaths = [], [], []
+    t = 0.0
+    eye = anim.target_eye_open
+    breath_timer = anim.breath_timer
+    for _ in range(int(round(seconds / dt))):
+        anim.advance(dt)
+        t += dt
+        if anim.target_eye_open != eye:
+            (closes if anim.target_eye_open == 0.0 else opens).append(t)
+            eye = anim.target_eye_open
+        if anim.breath_timer < breath_timer:
+            breaths.append((t, anim.target_mouth_open))
+        breath_timer = anim.breath_timer
+    return closes, opens, breaths
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_blink_timing_matches_frame_counters(demo, seed):
+    random.seed(seed)
+    anim = demo.AnimationState()
+    closes, opens, _ = record_events(anim, 120.0)
+    assert 5.0 - DT <= closes[0] <= 10.0 + DT
+    for previous, current in zip(closes, closes[1:]):
+        assert 2.0 - DT <= current - previous <= 8.0 + DT
+    assert len(opens) >= len(closes) - 1
+    for close, reopen in zip(closes, opens):
+        # 至少闭眼 10 帧，眼睛闭合到 0.1 以下后最多再保持到 20 帧
+        assert 0.17 - DT <= reopen - close <= 0.5
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_breath_timing_matches_frame_counters(demo, seed):
+    random.seed(seed)
+    anim = demo.AnimationState()
+    _, _, breaths = record_events(anim, 60.0)
+    assert breaths[0][0] == pytest.approx(2.0, abs=DT)
+    for (previous, _), (current, _) in zip(breaths, breaths[1:]):
+        assert 1.5 - DT <= current - previous <= 3.0 + DT
+    for _, mouth in breaths:
+        assert anim.min_open_value <= mouth <= anim.max_open_value
+
+
+def test_render_rate_does_not_change_timing(demo):
+    random.seed(1)
+    fast = demo.AnimationState()
+    fast_events = record_events(fast, 30.0, DT / 2)
+    random.seed(1)
+    slow = demo.AnimationState()
+    slow_events = record_events(slow, 30.0, DT * 2)
+    for fast_times, slow_times in zip(fast_events[:2], slow_events[:2]):
+        assert fast_times == pytest.approx(slow_times, abs=DT * 2)
+    assert fast.sim_time == pytest.approx(slow.sim_time, abs=DT)
+
+
+def test_advance_caps_steps_after_stall(demo):
+    anim = demo.AnimationState()
+    assert anim.advance(DT * 3 + 1e-9) == 3
+    assert anim.advance(10.0) == demo.MAX_SIM_STEPS
+    # 积压的时间被丢弃，最多留下一步
+    assert anim.advance(0.0) <= 1
+    assert anim.advance(-1.0) == 0
+
+
+def test_fast_forward_keeps_rhythm_and_opens_eyes(demo):
+    random.seed(2)
+    anim = demo.AnimationState()
+    anim.blink_interval = 6.0
+    anim.breath_interval = 2.0
+    anim.blink_timer = 1.0
+    anim.breath_timer = 0.5
+    anim.target_eye_open = 0.0
+    anim.fast_forward(3600.0 + 0.25)
+    assert anim.target_eye_open == 1.0
+    assert anim.blink_timer == pytest.approx((1.0 + 3600.25) % 6.0)
+    assert anim.breath_timer == pytest.approx((0.5 + 3600.25) % 2.0)
+    assert anim.accumulator == 0.0
+    assert anim.required_fps() == 0.0
+
+
+def test_time_to_next_event(demo):
+    anim = demo.AnimationState()
+    anim.blink_interval = 5.0
+    anim.blink_timer = 4.0
+    anim.breath_interval = 2.0
+    anim.breath_timer = 0.5
+    assert anim.time_to_next_event() == pytest.approx(1.0)
+    anim.target_eye_open = 0.0
+    anim.blink_close_duration = 0.25
+    anim.blink_timer = 0.1
+    assert anim.time_to_next_event() == pytest.approx(0.15)
+    anim.set_ctrl_mouse_pressed(True)
+    assert anim.time_to_next_event() is None
@@ -0,0 +1,70 @@
+"""
+模型包的生成、读取和过期检查
+"""
+import os
+import shutil
+import struct
+
+import pytest
+
+MODEL_HOME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model')
+
+
+@pytest.fixture
+def model_copy(demo, qapp, tmp_path):
+    home = tmp_path / 'model'
+    shutil.copytree(MODEL_HOME, str(home), ignore=shutil.ignore_patterns('__pycache__', '*.bundle'))
+    model_json = str(home / 'sef.model3.json')
+    bundle_path = str(tmp_path / 'sef.bundle')
+    demo.build_model_bundle(model_json, bundle_path)
+    return home, model_json, bundle_path
+
+
+def test_round_trip(demo, model_copy):
+    home, model_json, bundle_path = model_copy
+    bundle = demo.open_model_bundle(bundle_path, model_json)
+    assert bundle is not None
+    refs = bundle.setting['FileReferences']
+    assert bundle.param_ids == demo.load_parameter_ids(str(home / refs['DisplayInfo']))
+    assert bundle.physics_inputs == demo.load_physics_inputs(str(home / refs['Physics']))
+    assert [texture['name'] for texture in bundle.textures] == refs['Textures']
+    for texture in bundle.textures:
+        assert texture['width'] > 0 and texture['height'] > 0
+        assert len(texture['sha1']) == 40
+
+
+def test_stale_after_source_change(demo, model_copy):
+    home, model_json, bundle_path = model_copy
+    physics = str(home / 'sef.physics3.json')
+    st = os.stat(physics)
+    os.utime(physics, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert demo.ModelBundle(bundle_path).stale_reason(str(home)) is not None
+    assert demo.open_model_bundle(bundle_path, model_json) is None
+
+    os.utime(physics, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert demo.open_model_bundle(bundle_path, model_json) is not None
+    with open(physics, 'a', encoding='utf-8') as f:
+        f.write(' ')
+    assert demo.open_model_bundle(bundle_path, model_json) is None
+
+
+def test_stale_after_source_removed(demo, model_copy):
+    home, model_json, bundle_path = model_copy
+    os.remove(str(home / 'sef.cdi3.json'))
+    assert demo.open_model_bundle(bundle_path, model_json) is None
+
+
+def test_invalid_bundles(demo, model_copy):
+    _, model_json, bundle_path = model_copy
+    assert demo.open_model_bundle(bundle_path + '.missing', model_json) is None
+    assert demo.open_model_bundle(None, model_json) is None
+
+    with open(bundle_path, 'r+b') as f:
+        f.write(demo.BUNDLE_HEADER.pack(demo.BUNDLE_MAGIC, demo.BUNDLE_VERSION + 1, 0))
+    assert demo.open_model_bundle(bundle_path, model_json) is None
+
+    with open(bundle_path, 'wb') as f:
+        f.write(b'not a bundle')
+    assert demo.open_model_bundle(bundle_path, model_json) is None
+    with pytest.raises((ValueError, struct.error)):
+        demo.ModelBundle(bundle_path)
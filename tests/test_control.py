@@ -0,0 +1,66 @@
+"""
+ControlInbox 的命令检查和合并
+"""
+import pytest
+
+
+@pytest.mark.parametrize('command', [
+    [],
+    'ping',
+    {'params': [1, 2]},
+    {'params': {'ParamAngleX': 'fast'}},
+    {'params': {'ParamAngleX': True}},
+    {'expression': 3},
+    {'motion': 5},
+    {'motion': ['Idle']},
+    {'motion': ['Idle', 1.5]},
+    {'motion': [1, 0]},
+])
+def test_parse_rejects(demo, command):
+    with pytest.raises(ValueError):
+        demo.ControlInbox.parse(command)
+
+
+def test_parse_accepts(demo):
+    parse = demo.ControlInbox.parse
+    assert parse({}) == ({}, False, None, None)
+    assert parse({'params': {'ParamAngleX': 10, 'ParamEyeLOpen': None}, 'release': True}) == \
+        ({'ParamAngleX': 10, 'ParamEyeLOpen': None}, True, None, None)
+    assert parse({'expression': None})[2] == (None,)
+    assert parse({'expression': 'smile'})[2] == ('smile',)
+    assert parse({'motion': 'Idle'})[3] == ('Idle', 0)
+    assert parse({'motion': ['TapBody', 2]})[3] == ('TapBody', 2)
+
+
+def test_post_coalesces_until_take(demo):
+    notified = []
+    inbox = demo.ControlInbox(notify=lambda: notified.append(True))
+    parse = inbox.parse
+    assert inbox.take() is None
+    for value in range(100):
+        inbox.post(parse({'params': {'ParamAngleX': value}}))
+    inbox.post(parse({'params': {'ParamAngleY': 1.5}, 'expression': 'smile'}), ack=lambda: None)
+    inbox.post(parse({'motion': 'Idle'}))
+    assert notified == [True]
+    params, release, expression, motion, acks = inbox.take()
+    assert params == {'ParamAngleX': 99, 'ParamAngleY': 1.5}
+    assert not release
+    assert expression == ('smile',)
+    assert motion == ('Idle', 0)
+    assert len(acks) == 1
+    assert inbox.take() is None
+    assert inbox.stats() == {'messages': 102, 'batches': 1}
+
+    inbox.post(parse({'params': {'ParamAngleX': 1}}))
+    assert len(notified) == 2
+
+
+def test_release_drops_earlier_params(demo):
+    inbox = demo.ControlInbox()
+    parse = inbox.parse
+    inbox.post(parse({'params': {'ParamAngleX': 5, 'ParamAngleY': 6}}))
+    inbox.post(parse({'release': True, 'params': {'ParamAngleZ': 1}}))
+    inbox.post(parse({'params': {'ParamAngleX': 7}}))
+    params, release, _, _, _ = inbox.take()
+    assert release
+    assert params == {'ParamAngleZ': 1, 'ParamAngleX': 7}
@@ -0,0 +1,96 @@
+"""
+CropController 和 RenderScaler 的滞回：扩大或降档立即生效，缩小或升档需要稳定一段时间
+"""
+import pytest
+
+CANVAS = (1000, 1000)
+
+
+def make_crop(demo):
+    return demo.CropController(margin=48, edge=8, shrink_ratio=0.85, settle=1.0)
+
+
+def test_crop_expands_immediately(demo):
+    crop = make_crop(demo)
+    current = (200, 200, 400, 400)
+    # 内容碰到右边缘：当前裁剪与内容合并后加上边距
+    target = crop.update((300, 300, 598, 500), current, *CANVAS, 0.0)
+    assert target == (152, 152, 497, 497)
+    assert crop.update((300, 300, 598, 500), target, *CANVAS, 0.1) is None
+
+
+def test_crop_ignores_small_shrink(demo):
+    crop = make_crop(demo)
+    current = (200, 200, 400, 400)
+    bounds = (260, 260, 540, 530)  # 加上边距后面积仍在 85% 以上
+    for t in range(5):
+        assert crop.update(bounds, current, *CANVAS, float(t)) is None
+
+
+def test_crop_shrinks_after_settle_with_union(demo):
+    crop = make_crop(demo)
+    current = (0, 0, 1000, 1000)
+    assert crop.update((400, 400, 500, 500), current, *CANVAS, 0.0) is None
+    assert crop.update((380, 410, 500, 520), current, *CANVAS, 0.5) is None
+    target = crop.update((400, 400, 500, 500), current, *CANVAS, 1.0)
+    assert target == (332, 352, 217, 217)
+
+
+def test_crop_shrink_cancelled_by_large_content(demo):
+    crop = make_crop(demo)
+    current = (0, 0, 1000, 1000)
+    crop.update((400, 400, 500, 500), current, *CANVAS, 0.0)
+    crop.update((0, 0, 990, 990), current, *CANVAS, 0.5)
+    assert crop.update((400, 400, 500, 500), current, *CANVAS, 1.0) is None
+    assert crop.update((400, 400, 500, 500), current, *CANVAS, 1.9) is None
+
+
+def test_crop_unknown_bounds(demo):
+    assert make_crop(demo).update(None, (0, 0, 100, 100), *CANVAS, 0.0) is None
+
+
+def make_scaler(demo):
+    return demo.RenderScaler(min_scale=0.5, max_scale=1.0, step=0.1, budget_ms=16.0, high=0.9, low=0.6,
+                             window=10, cooldown=1.0)
+
+
+def feed(scaler, ms, start, count, dt=1.0 / 60.0):
+    changed = []
+    for i in range(count):
+        if scaler.add_sample(ms, start + i * dt):
+            changed.append(scaler.scale)
+    return changed
+
+
+def test_scaler_waits_for_full_window(demo):
+    scaler = make_scaler(demo)
+    assert feed(scaler, 30.0, 0.0, 9) == []
+    assert scaler.add_sample(30.0, 0.2)
+    assert scaler.scale == pytest.approx(0.9)
+
+
+def test_scaler_cooldown(demo):
+    scaler = make_scaler(demo)
+    feed(scaler, 30.0, 0.0, 10)
+    # 冷却期间样本满了也不调整
+    assert feed(scaler, 30.0, 0.2, 30) == []
+    assert scaler.add_sample(30.0, 1.3)
+    assert scaler.scale == pytest.approx(0.8)
+    assert scaler.changes == 2
+
+
+def test_scaler_hysteresis_band(demo):
+    scaler = make_scaler(demo)
+    scaler.scale = 0.8
+    # 12 ms 不超过 0.9 预算；按像素数升一档后预估 15.2 ms 超过 0.6 预算，保持不变
+    assert feed(scaler, 12.0, 0.0, 200, dt=0.1) == []
+    # 足够快时升档
+    assert feed(scaler, 5.0, 30.0, 10) == [pytest.approx(0.9)]
+
+
+def test_scaler_bounds(demo):
+    scaler = make_scaler(demo)
+    feed(scaler, 5.0, 0.0, 50, dt=0.1)
+    assert scaler.scale == 1.0
+    feed(scaler, 100.0, 10.0, 200, dt=0.1)
+    assert scaler.scale == 0.5
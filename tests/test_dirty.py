@@ -0,0 +1,89 @@
+"""
+DirtyTracker 的跳帧判断和 PhysicsLOD 的降频阶段
+"""
+import numpy as np
+import pytest
+
+IDS = ['ParamAngleX', 'ParamEyeLOpen']
+
+
+def test_first_frame_and_epsilon(demo):
+    tracker = demo.DirtyTracker(IDS, epsilon=1e-3)
+    values = np.zeros(2)
+    assert tracker.check(values, 0.0)
+    assert not tracker.check(values + 5e-4, 0.1)
+    assert tracker.check(values + 2e-3, 0.2)
+    assert not tracker.check(values + 2e-3, 0.3)
+
+
+def test_invalidate_forces_frames(demo):
+    tracker = demo.DirtyTracker(IDS)
+    values = np.zeros(2)
+    tracker.check(values, 0.0)
+    tracker.invalidate(now=1.0)
+    assert tracker.check(values, 1.0)
+    assert not tracker.check(values, 1.1)
+    tracker.invalidate(0.5, now=2.0)
+    assert tracker.check(values, 2.1)
+    assert tracker.check(values, 2.4)
+    assert not tracker.check(values, 2.6)
+
+
+def test_physics_input_keeps_rendering_until_settled(demo):
+    tracker = demo.DirtyTracker(IDS, physics_inputs=['ParamAngleX'], physics_settle=2.0)
+    values = np.zeros(2)
+    tracker.check(values, 0.0)
+    values[1] = 1.0  # 不是物理输入，只重绘一帧
+    assert tracker.check(values, 1.0)
+    assert not tracker.check(values, 1.1)
+    values[0] = 10.0
+    assert tracker.check(values, 2.0)
+    assert tracker.pending(3.9)
+    assert tracker.check(values, 3.9)
+    assert not tracker.check(values, 4.1)
+    tracker.physics_input_changed(5.0)
+    assert tracker.check(values, 6.0)
+
+
+def test_lod_rate_stages(demo):
+    lod = demo.PhysicsLOD(max_fps=60.0, settle=2.0, full_time=0.3, rates=(30.0, 15.0))
+    assert lod.rate(0.0) == 60.0
+    assert lod.rate(0.29) == 60.0
+    assert lod.rate(0.5) == 30.0
+    assert lod.rate(1.9) == 15.0
+    assert lod.rate(2.0) == 0.0
+
+
+def test_lod_small_pet(demo):
+    lod = demo.PhysicsLOD(max_fps=60.0, settle=2.0, full_time=0.3, rates=(30.0, 15.0),
+                          small_side=500, small_settle=1.0)
+    lod.set_screen_size(400, 300)
+    assert lod.small
+    assert lod.rate(0.1) == 30.0
+    assert lod.rate(0.5) == 15.0
+    assert lod.rate(1.0) == 0.0
+    lod.set_screen_size(800, 300)
+    assert lod.rate(1.0) == 30.0
+
+
+def test_lod_due_throttles_updates(demo):
+    lod = demo.PhysicsLOD(max_fps=60.0, settle=2.0, full_time=0.3, rates=(30.0, 15.0))
+    updates = 0
+    frames = 120
+    for i in range(frames):
+        updates += lod.due(i / 60.0, i / 60.0)
+    # 0.3 秒全速 18 次，0.3~1.15 秒 30 FPS，1.15~2 秒 15 FPS，之后冻结
+    assert updates == pytest.approx(18 + 0.85 * 30 + 0.85 * 15, abs=3)
+    assert lod.stats(frames)['saved_updates'] > 0
+    assert not lod.due(2.5, 2.5)
+
+
+def test_tracker_uses_lod_while_settling(demo):
+    tracker = demo.DirtyTracker(IDS, physics_inputs=['ParamAngleX'], physics_settle=2.0)
+    tracker.physics_lod = demo.PhysicsLOD(max_fps=60.0, settle=2.0, full_time=0.3, rates=(30.0, 15.0))
+    values = np.zeros(2)
+    tracker.check(values, 0.0)
+    values[0] = 10.0
+    tracker.check(values, 0.0)
+    rendered = sum(tracker.check(values, i / 60.0) for i in range(1, 120))
+    assert 40 < rendered < 119
@@ -0,0 +1,101 @@
+"""
+ExpressionSet 的预先整理、MotionClip 的曲线采样和表情过渡权重
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def test_expression_set_load(demo, tmp_path):
+    write_json(tmp_path / 'smile.exp3.json', {
+        'FadeInTime': 0.2,
+        'Parameters': [
+            {'Id': 'ParamMouthForm', 'Value': 1.0, 'Blend': 'Add'},
+            {'Id': 'ParamEyeLOpen', 'Value': 0.5, 'Blend': 'Multiply'},
+        ],
+    })
+    write_json(tmp_path / 'angry.exp3.json', {
+        'Parameters': [{'Id': 'ParamBrowLY', 'Value': -1.0, 'Blend': 'Overwrite'}],
+    })
+    items = [{'Name': 'smile', 'File': 'smile.exp3.json'}, {'File': 'angry.exp3.json'},
+             {'Name': 'missing', 'File': 'missing.exp3.json'}]
+    expressions = demo.ExpressionSet.load(str(tmp_path), items)
+    assert expressions.names == ['smile', 'angry']
+    assert expressions.ids == ['ParamBrowLY', 'ParamEyeLOpen', 'ParamMouthForm']
+    np.testing.assert_array_equal(expressions.add, [[0, 0, 1], [0, 0, 0]])
+    np.testing.assert_array_equal(expressions.mul, [[1, 0.5, 1], [1, 1, 1]])
+    np.testing.assert_array_equal(expressions.over, [[0, 0, 0], [-1, 0, 0]])
+    np.testing.assert_array_equal(expressions.over_mask, [[0, 0, 0], [1, 0, 0]])
+    np.testing.assert_array_equal(expressions.fades, [0.2, demo.EXPRESSION_FADE])
+
+
+def test_expression_crossfade_weights(demo):
+    expressions = demo.ExpressionSet(['a', 'b'], ['ParamMouthForm'])
+    expressions.fades[:] = (0.5, 1.0)
+    mixer = demo.ExpressionMixer(expressions)
+    assert mixer.select('a', 0.0) == 0.5
+    assert mixer.weights(0.25) == [(0, 0.5)]
+    assert mixer.select('a', 1.0) is None
+    assert mixer.select('unknown', 1.0) is None
+    assert mixer.select('b', 1.0) == 1.0
+    assert mixer.weights(1.25) == [(1, 0.25), (0, 0.75)]
+    assert mixer.weights(2.0) == [(1, 1.0)]
+    assert mixer.select(None, 3.0) == 1.0
+    assert mixer.weights(3.5) == [(1, 0.5)]
+    assert mixer.transitions == 3
+
+
+def test_motion_keyframes_segments(demo):
+    # 线性到 (1, 1)，阶梯到 (2, 0)，反向阶梯到 (3, 1)
+    points = demo.motion_keyframes([0, 0, 0, 1, 1, 2, 2, 0, 3, 3, 1])
+    assert points == [(0, 0), (1, 1), (2, 1), (2, 0), (2, 1), (3, 1)]
+    bezier = demo.motion_keyframes([0, 0, 1, 0.25, 0, 0.75, 1, 1, 1])
+    assert len(bezier) == demo.BEZIER_STEPS + 1
+    assert bezier[-1] == pytest.approx((1, 1))
+    times = [t for t, _ in bezier]
+    assert times == sorted(times)
+
+
+def make_clip(demo, tmp_path, loop):
+    path = os.path.join(str(tmp_path), 'wave.motion3.json')
+    write_json(path, {
+        'Meta': {'Duration': 2.0, 'Loop': loop, 'FadeInTime': 0.5, 'FadeOutTime': 0.25},
+        'Curves': [
+            {'Target': 'Parameter', 'Id': 'ParamAngleX', 'Segments': [0, 0, 0, 1, 30, 0, 2, 0]},
+            {'Target': 'PartOpacity', 'Id': 'PartArm', 'Segments': [0, 1, 0, 2, 1]},
+            {'Target': 'Parameter', 'Id': 'ParamAngleY', 'Segments': [0, 5, 0, 2, 5]},
+        ],
+    })
+    return demo.MotionClip.load(path)
+
+
+def test_motion_clip_evaluate(demo, tmp_path):
+    clip = make_clip(demo, tmp_path, loop=False)
+    assert clip.ids == ['ParamAngleX', 'ParamAngleY']
+    assert clip.duration == 2.0
+    assert clip.samples.shape == (121, 2)
+    np.testing.assert_allclose(clip.evaluate(0.5), [15, 5])
+    np.testing.assert_allclose(clip.evaluate(1.0), [30, 5])
+    np.testing.assert_allclose(clip.evaluate(1.5 + 1 / 120), [14.75, 5])
+    np.testing.assert_allclose(clip.evaluate(10.0), [0, 5])
+    np.testing.assert_allclose(clip.evaluate(-1.0), [0, 5])
+
+
+def test_motion_clip_loop_and_weight(demo, tmp_path):
+    once = make_clip(demo, tmp_path, loop=False)
+    assert once.weight(0.0) == 0.0
+    assert once.weight(0.25) == pytest.approx(0.5)
+    assert once.weight(1.0) == 1.0
+    assert once.weight(1.875) == pytest.approx(0.5)
+    assert once.weight(2.0) == 0.0
+
+    looped = make_clip(demo, tmp_path, loop=True)
+    np.testing.assert_allclose(looped.evaluate(5.0), [30, 5])
+    assert looped.weight(10.0) == 1.0
@@ -0,0 +1,65 @@
+"""
+FrameScheduler 在模拟时钟下的空闲切换
+"""
+import pytest
+
+
+def make_scheduler(demo, clock):
+    return demo.FrameScheduler(max_fps=60.0, idle_fps=10.0, idle_delay=0.5, clock=clock)
+
+
+def test_active_until_idle_delay(demo, clock):
+    scheduler = make_scheduler(demo, clock)
+    assert scheduler.plan(0.0) == (pytest.approx(1.0 / 60.0), True)
+    clock.advance(0.49)
+    assert scheduler.plan(0.0) == (pytest.approx(1.0 / 60.0), True)
+    clock.advance(0.02)
+    interval, needs_frame = scheduler.plan(0.0)
+    assert interval == pytest.approx(1.0 / 10.0)
+    assert not needs_frame
+
+
+def test_motion_wakes_from_idle(demo, clock):
+    scheduler = make_scheduler(demo, clock)
+    scheduler.plan(0.0)
+    clock.advance(1.0)
+    assert scheduler.is_idle()
+    # 低于空闲帧率的变化只重绘，不唤醒
+    interval, needs_frame = scheduler.plan(5.0)
+    assert scheduler.is_idle() and needs_frame
+    assert interval == pytest.approx(1.0 / 10.0)
+    interval, needs_frame = scheduler.plan(30.0)
+    assert not scheduler.is_idle() and needs_frame
+    assert interval == pytest.approx(1.0 / 60.0)
+
+
+def test_external_wake(demo, clock):
+    scheduler = make_scheduler(demo, clock)
+    scheduler.plan(0.0)
+    clock.advance(2.0)
+    assert scheduler.is_idle()
+    scheduler.wake()
+    assert not scheduler.is_idle()
+    clock.advance(0.5)
+    assert scheduler.is_idle()
+
+
+def test_timed_event_shortens_interval(demo, clock):
+    scheduler = make_scheduler(demo, clock)
+    scheduler.plan(0.0)
+    clock.advance(1.0)
+    assert scheduler.plan(0.0, time_to_event=0.03)[0] == pytest.approx(0.03)
+    # 不会比最高帧率更频繁
+    assert scheduler.plan(0.0, time_to_event=0.0)[0] == pytest.approx(1.0 / 60.0)
+    assert scheduler.plan(0.0, time_to_event=5.0)[0] == pytest.approx(1.0 / 10.0)
+
+
+def test_effective_fps_counts_last_second(demo, clock):
+    scheduler = make_scheduler(demo, clock)
+    assert scheduler.effective_fps() == 0.0
+    for _ in range(90):
+        scheduler.note_frame()
+        clock.advance(1.0 / 60.0)
+    assert scheduler.effective_fps() == pytest.approx(60.0, abs=1.0)
+    clock.advance(2.0)
+    assert scheduler.effective_fps() == 0.0